@@ -1,14 +1,16 @@
 import streamlit as st
-from fpdf import FPDF
+import urllib.parse
+from app_state import parsed_addons, pdf_payload, priced_quote, warm_layouts
+from money import TAX_RULES, format_cents, format_dollars
+from pdf_cache import stable_key
+from quote_engine import QuoteInput
 from datetime import date, timedelta
-import tempfile
-import os
-from urllib.parse import quote_plus
 
 # App setup
 st.set_page_config(page_title="Cravix Quote Calculator", layout="centered")
 st.title("🧮 Cravix Quote Calculator")
 st.markdown("Easily build and download professional service quotes.")
+warm_layouts()
 
 # Form input
 with st.form("quote_form"):
@@ -21,144 +23,100 @@ with st.form("quote_form"):
     valid_until = st.date_input("Valid Until", value=date.today() + timedelta(days=30))
     job_description = st.text_area("Job Description")
     service_measurement = st.selectbox("Measurement Type", ["Square Ft", "Linear Ft", "Cubic Yards", "Hours", "Units"])
-    st.session_state.measurement = service_measurement.lower().replace(" ", " ")
     quantity = st.number_input(f"Quantity of Measurement", min_value=0, value=1, step=1)
     unit_price = st.number_input(f"Price per Measurement", min_value=0.0, value=50.0)
     material_cost = st.number_input("Material Cost ($)", min_value=0.0, value=0.0)
     labor_hours = st.number_input("Labor Hours", min_value=0.0, value=0.0)
     hourly_rate = st.number_input("Hourly Rate ($)", min_value=0.0, value=0.0)
     travel_cost = st.number_input("Travel Cost ($)", min_value=0.0, value=0.0)
-    additional_services = st.text_area("Additional Services (Format: Service - Price)")
+    additional_services = st.text_area("Additional Services (Format: Service - Price or Service - Qty x Price)")
     tax_rate = st.number_input("Tax Rate (%)", min_value=0.0, value=6.25)
+    tax_rule = st.selectbox("Tax Rule", list(TAX_RULES))
 
     submit = st.form_submit_button("📄 Generate Quote")
 
 if submit:
     # Calculations
-    service_total = quantity * unit_price
-    labor_total = labor_hours * hourly_rate
-    additional_services_total = 0
-    additional_services_list = []
-    if additional_services:
-        for line in additional_services.splitlines():
-            if "-" in line:
-                service, price = line.rsplit("-", 1)
-                additional_services_total += float(price.strip())
-                additional_services_list.append((service.strip(), float(price.strip())))
-
-    subtotal = service_total + material_cost + labor_total + travel_cost + additional_services_total
-    tax = subtotal * (tax_rate / 100)
-    total_due = subtotal + tax
+    addons, addon_issues = parsed_addons(additional_services, keep_unpriced=False)
+    for issue in addon_issues:
+        st.warning(f"Skipped additional service on line {issue.line}: {issue.message}")
+    quote = QuoteInput(
+        company_name=company_name,
+        client_name=client_name,
+        client_email=client_email,
+        quote_number=quote_number,
+        quote_date=quote_date,
+        valid_until=valid_until,
+        job_description=job_description,
+        unit_type=service_measurement,
+        units=quantity,
+        rate_per_unit=unit_price,
+        material_cost=material_cost,
+        labor_hours=labor_hours,
+        hourly_rate=hourly_rate,
+        travel_cost=travel_cost,
+        addons=addons,
+        tax_rate=tax_rate,
+        tax_rule=tax_rule,
+    )
+    result = priced_quote(quote)
+    # The PDF modules load on first use (usually already done by warm_layouts)
+    from quote_store import default_store
+
+    default_store().save_quote(quote, result, style="cravix")
+    st.session_state.cravix_quote = (quote, result)
+
+# Keep the last quote on screen across reruns (e.g. the download click)
+if "cravix_quote" in st.session_state:
+    quote, result = st.session_state.cravix_quote
+
+    total_due = format_cents(result.total_cents)
 
     st.success("Quote Ready!")
 
     # Display before PDF
     st.markdown("### 🧾 Quote Summary")
-    st.markdown(f"**Client:** {client_name}")
-    st.markdown(f"**Measurement Type:** {service_measurement}")
-    st.markdown(f"**Job Description:** {job_description}")
-    st.markdown(f"**Quantity:** {quantity} @ ${unit_price:.2f} per {service_measurement}")
-    st.markdown(f"**Material Cost:** ${material_cost:.2f}")
-    st.markdown(f"**Labor:** {labor_hours} hrs @ ${hourly_rate:.2f} = ${labor_total:.2f}")
-    st.markdown(f"**Travel Cost:** ${travel_cost:.2f}")
-    for service, price in additional_services_list:
-        st.markdown(f"**Additional Service:** {service} - ${price:.2f}")
-    st.markdown(f"**Tax ({tax_rate:.2f}%):** ${tax:.2f}")
-    st.markdown(f"### 💰 **Total Due: ${total_due:.2f}**")
+    st.markdown(f"**Client:** {quote.client_name}")
+    st.markdown(f"**Measurement Type:** {quote.unit_type}")
+    st.markdown(f"**Job Description:** {quote.job_description}")
+    st.markdown(f"**Quantity:** {quote.units} @ {format_dollars(quote.rate_per_unit)} per {quote.unit_type}")
+    st.markdown(f"**Material Cost:** {format_cents(result.materials_cents)}")
+    st.markdown(f"**Labor:** {quote.labor_hours} hrs @ {format_dollars(quote.hourly_rate)} = {format_cents(result.labor_cents)}")
+    st.markdown(f"**Travel Cost:** {format_cents(result.travel_cents)}")
+    if quote.addons:
+        st.markdown("  \n".join(f"**Additional Service:** {item.name} - {format_cents(item.cents)}" for item in quote.addons))
+    st.markdown(f"**Tax ({quote.tax_rate:.2f}%):** {format_cents(result.tax_cents)}")
+    st.markdown(f"### 💰 **Total Due: {total_due}**")
 
     # Generate PDF
-    pdf = FPDF()
-    pdf.add_page()
-    pdf.set_font("Arial", "B", 16)
-    pdf.set_text_color(0, 102, 255)
-    pdf.cell(0, 10, f"{company_name} Service Quote", ln=True, align='C')
-
-    pdf.set_font("Arial", size=12)
-    pdf.set_text_color(0)
-    pdf.ln(10)
-    
-    pdf.set_fill_color(230)
-    pdf.cell(95, 10, f"Customer Name: {client_name}", 1)
-    pdf.cell(95, 10, f"Email: {client_email}", 1, ln=True)
-    pdf.cell(95, 10, f"Quote #: {quote_number}", 1)
-    pdf.cell(95, 10, f"Quote Date: {quote_date.strftime('%m/%d/%Y')}", 1, ln=True)
-    pdf.set_fill_color(173, 216, 230)
-    pdf.cell(190, 10, f"Valid Until: {valid_until.strftime('%m/%d/%Y')}", 1, ln=True, fill=True)
-
-    pdf.ln(5)
-    pdf.multi_cell(0, 10, f"Job Description: {job_description}", border=0)
-
-    pdf.ln(5)
-    pdf.set_fill_color(230)
-    pdf.set_font("Arial", "B", 12)
-    pdf.cell(80, 10, "Description", 1, 0, 'C', True)
-    pdf.cell(40, 10, "Amount", 1, 1, 'C', True)
-
-    pdf.set_font("Arial", size=12)
-    pdf.cell(80, 10, f"Main Service ({quantity} {service_measurement} x ${unit_price:.2f})", 1)
-    pdf.cell(40, 10, f"${service_total:.2f}", 1, 1)
-
-    pdf.cell(80, 10, "Material Cost", 1)
-    pdf.cell(40, 10, f"${material_cost:.2f}", 1, 1)
-
-    pdf.cell(80, 10, f"Labor ({labor_hours} x ${hourly_rate:.2f})", 1)
-    pdf.cell(40, 10, f"${labor_total:.2f}", 1, 1)
-
-    pdf.cell(80, 10, "Travel Cost", 1)
-    pdf.cell(40, 10, f"${travel_cost:.2f}", 1, 1)
-
-    for service, price in additional_services_list:
-        pdf.cell(80, 10, f"{service}", 1)
-        pdf.cell(40, 10, f"${price:.2f}", 1, 1)
-
-    pdf.cell(80, 10, "Subtotal", 1)
-    pdf.cell(40, 10, f"${subtotal:.2f}", 1, 1)
-
-    pdf.cell(80, 10, f"Tax ({tax_rate:.2f}%)", 1)
-    pdf.cell(40, 10, f"${tax:.2f}", 1, 1)
-
-    pdf.set_fill_color(255, 255, 0)
-    pdf.set_font("Arial", "B", 12)
-    pdf.cell(80, 10, "TOTAL DUE", 1, 0, 'L', True)
-    pdf.cell(40, 10, f"${total_due:.2f}", 1, 1, 'L', True)
-
-    if pdf.get_y() > 265:
-        pdf.set_y(265)
-    else:
-        pdf.set_y(pdf.get_y() + 10)
-
-    pdf.set_font("Arial", "I", 9)
-    pdf.cell(0, 10, "Generated with Gravix", 0, 0, 'R')
-
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmpfile:
-        pdf.output(tmpfile.name)
-        with open(tmpfile.name, "rb") as f:
-            pdf_data = f.read()
+    from quote_pdf import render_quote_pdf
+
+    pdf_data = pdf_payload(stable_key("quote", "cravix", quote),
+                           lambda: render_quote_pdf(quote, result, style="cravix"), "quote", "cravix")
 
     st.download_button("📅 Download Client Quote (PDF)",
                        data=pdf_data,
-                       file_name=f"{client_name or 'client'}_quote.pdf",
+                       file_name=f"{quote.client_name or 'client'}_quote.pdf",
                        mime="application/pdf")
 
-    import urllib.parse
     # Build mailto email link (clean formatting)
-    subject = f"Service Quote from {company_name or 'Your Business'}"
-    body = f"""Hello {client_name or ''},
+    subject = f"Service Quote from {quote.company_name or 'Your Business'}"
+    body = f"""Hello {quote.client_name or ''},
 
-Here's your service quote for the job: {job_description or ''}.
-Total: ${total_due:.2f}
+Here's your service quote for the job: {quote.job_description or ''}.
+Total: {total_due}
 
 Please find the attached quote PDF and feel free to reach out with any questions!
 
 Thanks,
-{company_name or 'Your Business'}
+{quote.company_name or 'Your Business'}
 """
 
     # Encode subject/body for URL
     subject_encoded = urllib.parse.quote(subject)
     body_encoded = urllib.parse.quote(body)
 
-    mailto_link = f"mailto:{client_email}?subject={subject_encoded}&body={body_encoded}"
+    mailto_link = f"mailto:{quote.client_email}?subject={subject_encoded}&body={body_encoded}"
 
     # Display instructions + email link
     st.markdown("### ✉️ Email the Quote")
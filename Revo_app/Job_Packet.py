@@ -0,0 +1,52 @@
+import streamlit as st
+from app_state import job_progress, render_jobs, submit_render, warm_layouts
+from money import format_cents
+from pdf_cache import stable_key
+from datetime import date
+
+st.set_page_config(page_title="Job Packet", layout="centered")
+st.title("🗂️ Job Packet")
+st.markdown("Combine a client's intake and quote into one PDF to send with the job.")
+warm_layouts()
+
+# The store loads the PDF modules; warm_layouts() has usually done that already
+from quote_store import default_store
+
+store = default_store()
+intakes = store.find_intakes(limit=100)
+quotes = store.find_quotes(limit=100)
+if not intakes or not quotes:
+    st.info("Submit a client intake and a quote first; saved ones are listed here.")
+    st.stop()
+
+intake_record = st.selectbox(
+    "Client Intake", intakes,
+    format_func=lambda r: f"#{r.id} {r.client_name} - {r.preferred_date.strftime('%m/%d/%Y')} ({r.app.title()})",
+)
+# Quotes for the same client first
+same_client = [r for r in quotes if r.client_name.lower() == intake_record.client_name.lower()]
+quote_record = st.selectbox(
+    "Quote", same_client + [r for r in quotes if r not in same_client],
+    format_func=lambda r: f"#{r.id} {r.client_name} - {r.quote_number or 'no number'}, {format_cents(r.total_cents, grouping=True)}",
+)
+style = st.radio("Layout", ["cravix", "revu"], index=0 if intake_record.app == "cravix" else 1,
+                 format_func=str.title, horizontal=True)
+
+if st.button("📄 Generate Job Packet"):
+    intake, _ = store.get_intake(intake_record.id)
+    quote, _ = store.get_quote(quote_record.id)
+    # The intake header carries today's date, so it is part of the key
+    key = stable_key("packet", style, intake, quote, date.today())
+    job_id = submit_render("packet", (intake, quote), style, key)
+    st.session_state.job_packet = {"job": job_id, "client_name": intake.client_name}
+
+job = render_jobs().get(st.session_state.job_packet["job"]) if "job_packet" in st.session_state else None
+if job is not None and not job.finished:
+    job_progress(job.id)
+elif job is not None and job.data is None:
+    st.error(f"The job packet could not be generated: {job.error}")
+elif job is not None:
+    client_name = st.session_state.job_packet["client_name"]
+    st.download_button("📥 Download Job Packet PDF", data=job.data, file_name=f"{client_name}_packet.pdf",
+                       mime="application/pdf")
+    st.caption(f"{job.stats.pages} pages, {job.stats.photos} photos, {job.stats.output_bytes / 1e3:.0f} KB")
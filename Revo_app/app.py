@@ -0,0 +1,30 @@
+"""One Streamlit server for all four forms and the job packet page.
+
+    streamlit run app.py
+
+Each page is one of the standalone scripts, which still run on their own.
+Serving them from one process means fonts, templates, caches and the SQLite
+connection are loaded once instead of four times.
+"""
+
+import streamlit as st
+
+from app_state import warm_layouts
+
+# Before the first page draws, so fpdf loads while the form is on screen
+warm_layouts()
+
+pages = st.navigation({
+    "Revu": [
+        st.Page("revu_app.py", title="Quote Generator", icon="✨", url_path="quote", default=True),
+        st.Page("Client_intake_app.py", title="Client Intake", icon="📋", url_path="intake"),
+    ],
+    "Cravix": [
+        st.Page("Cravix_Quote.py", title="Quote Generator", icon="🧾", url_path="cravix-quote"),
+        st.Page("Cravix_Intake.py", title="Client Intake", icon="📋", url_path="cravix-intake"),
+    ],
+    "Jobs": [
+        st.Page("Job_Packet.py", title="Job Packet", icon="🗂️", url_path="packet"),
+    ],
+})
+pages.run()
@@ -0,0 +1,106 @@
+"""Streamlit caches shared by the apps.
+
+Everything here is computed once per process (cache_resource) or once per
+distinct input (cache_data) and reused across reruns and sessions, so a rerun
+caused by an unrelated widget only redraws widgets.
+
+Nothing here imports fpdf or Pillow. The pages import the PDF modules only
+when they render, and warm_layouts() loads them on a background thread while
+the first form is on screen.
+"""
+
+import threading
+
+import streamlit as st
+
+from metrics import count, serve_from_env, stage
+from pdf_cache import PDF_CACHE
+from quote_engine import QuoteInput, calculate_quote, parse_addons
+
+
+def _warm():
+    from intake_pdf import IntakeInput, render_intake_pdf
+    from quote_pdf import render_quote_pdf
+    import quote_store  # noqa: F401
+
+    quote = QuoteInput()
+    for style in ("revu", "cravix"):
+        render_quote_pdf(quote, style=style)
+        render_intake_pdf(IntakeInput(), style=style)
+
+
+@st.cache_resource(show_spinner=False)
+def _warmup_thread():
+    serve_from_env()
+    thread = threading.Thread(target=_warm, name="pdf-warmup", daemon=True)
+    thread.start()
+    return thread
+
+
+def warm_layouts():
+    """Start loading fonts and compiling every PDF template, once per process; returns at once.
+
+    Also starts the /metrics endpoint when REVU_METRICS_PORT is set.
+    """
+    _warmup_thread()
+
+
+def pdf_payload(key, render, kind, style):
+    """The download bytes for key from PDF_CACHE, rendering on a miss, with timing and size metrics."""
+    with stage("download_payload", kind=kind, style=style):
+        # Templates compile on first use; let the warm-up finish them rather than race it
+        _warmup_thread().join()
+        data = PDF_CACHE.get_or_render(key, render)
+    count("download_bytes_total", len(data), kind=kind, style=style)
+    return data
+
+
+def quote_preview(quote, result, style):
+    """Live preview bytes for quote; only sections changed since earlier previews are laid out."""
+    from quote_pdf import render_quote_preview
+
+    with stage("preview", kind="quote", style=style):
+        _warmup_thread().join()
+        return render_quote_preview(quote, result, style)
+
+
+@st.cache_resource(show_spinner=False)
+def render_jobs():
+    """The process-wide JobQueue, configured from REVU_JOB_WORKERS, REVU_JOB_DB and REVU_JOB_KEEP_DAYS."""
+    from render_jobs import JobQueue
+
+    return JobQueue.from_env()
+
+
+def submit_render(kind, value, style, key, document_id=None):
+    """Queue a background render (see render_jobs.JobQueue.submit) and return the job id."""
+    _warmup_thread().join()
+    return render_jobs().submit(kind, value, style, key, document_id)
+
+
+@st.fragment(run_every=0.5)
+def job_progress(job_id):
+    """Progress bar for a running job; reruns the page once the job is finished."""
+    job = render_jobs().get(job_id)
+    if job is None or job.finished:
+        st.rerun()
+    photos, photos_total, pages = job.progress
+    if job.status == "queued":
+        text = "Waiting for a free renderer..."
+    elif photos_total:
+        text = f"Preparing photos: {photos} of {photos_total}, {pages} page(s) laid out"
+    else:
+        text = f"Laying out page {max(pages, 1)}"
+    st.progress(photos / photos_total if photos_total else 0.0, text=text)
+
+
+@st.cache_data(max_entries=1024, show_spinner=False)
+def parsed_addons(text, keep_unpriced=True):
+    """(line items, parse issues) for an add-ons text box."""
+    issues = []
+    return parse_addons(text, keep_unpriced, issues), issues
+
+
+@st.cache_data(max_entries=1024, show_spinner=False)
+def priced_quote(quote):
+    return calculate_quote(quote)
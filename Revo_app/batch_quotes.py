@@ -0,0 +1,204 @@
+"""Batch quote generation from a CSV or JSONL file of quote inputs.
+
+Each row is priced with quote_engine and rendered to its own PDF across a
+process pool, since FPDF rendering is CPU-bound and single-threaded. Rows
+go to the workers as packed QuoteBatch chunks (see records.py), and only a
+few chunks are in flight at a time, so memory stays flat however long the
+input file is.
+
+    python batch_quotes.py quotes.csv out_dir/
+    python batch_quotes.py quotes.jsonl quotes.zip --workers 8
+"""
+
+import argparse
+import csv
+import json
+import math
+import os
+import re
+import shutil
+import tempfile
+import time
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, fields
+from datetime import date
+
+from money import format_cents, tax_rule
+from quote_engine import LineItem, QuoteInput, calculate_quote, parse_addons
+from quote_pdf import render_quote_pdf
+from records import QuoteBatch
+
+_TEXT_FIELDS = {"company_name", "client_name", "client_email", "quote_number", "job_description", "unit_type",
+                "tax_rule"}
+_DATE_FIELDS = {"quote_date", "valid_until"}
+_NUMBER_FIELDS = {f.name for f in fields(QuoteInput)} - _TEXT_FIELDS - _DATE_FIELDS - {"addons"}
+
+
+@dataclass
+class BatchReport:
+    quotes: int
+    seconds: float
+
+    @property
+    def quotes_per_second(self):
+        return self.quotes / self.seconds if self.seconds else 0.0
+
+
+def _amount(key, value):
+    number = float(value)
+    if not math.isfinite(number) or number < 0:
+        raise ValueError(f"{key} must be a finite number of at least 0, not {value!r}")
+    return number
+
+
+def quote_from_row(row):
+    """Build a QuoteInput from a CSV/JSONL row, ignoring unknown or blank columns.
+
+    Raises ValueError for a number that is negative, infinite or NaN, and for
+    an unknown tax rule.
+    """
+    values = {}
+    for key, value in row.items():
+        if value is None or value == "":
+            continue
+        if key in _TEXT_FIELDS:
+            values[key] = str(value)
+        elif key in _DATE_FIELDS:
+            values[key] = value if isinstance(value, date) else date.fromisoformat(str(value))
+        elif key in _NUMBER_FIELDS:
+            values[key] = _amount(key, value)
+        elif key == "addons":
+            values[key] = _parse_row_addons(value)
+    tax_rule(values.get("tax_rule"))
+    return QuoteInput(**values)
+
+
+def _parse_row_addons(value):
+    # JSONL rows may carry a list of line item objects; CSV cells use the
+    # same "Name - Amount" text as the form, one per line or ";"-separated
+    if isinstance(value, list):
+        items = [LineItem.from_dict(item) for item in value]
+        for item in items:
+            _amount(f"{item.name} quantity", item.quantity)
+            _amount(f"{item.name} unit_price", item.unit_price)
+        return items
+    return parse_addons(str(value).replace(";", "\n"))
+
+
+def read_quotes(path):
+    """Yield QuoteInput rows from a .csv or .jsonl/.json file."""
+    if path.lower().endswith(".csv"):
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                yield quote_from_row(row)
+    else:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield quote_from_row(json.loads(line))
+
+
+def _file_name(index, quote):
+    client = re.sub(r"[^A-Za-z0-9_-]+", "_", quote.client_name or "client").strip("_") or "client"
+    return f"{index:05d}_{client}_quote.pdf"
+
+
+def _render_chunk(first, packed):
+    # Runs inside the pool worker: (name, PDF, summary row) for a packed QuoteBatch
+    rendered = []
+    for index, quote in enumerate(QuoteBatch.from_bytes(packed), first):
+        result = calculate_quote(quote)
+        name = _file_name(index, quote)
+        summary_row = [name, quote.quote_number, quote.client_name,
+                       *(format_cents(cents, symbol="") for cents in (result.subtotal_cents, result.discount_cents,
+                                                                      result.tax_cents, result.total_cents))]
+        rendered.append((name, render_quote_pdf(quote, result), summary_row))
+    return rendered
+
+
+def _chunks(quotes, chunksize):
+    # (index of the first quote, packed QuoteBatch) for every chunksize quotes
+    batch, first = QuoteBatch(), 1
+    for quote in quotes:
+        batch.append(quote)
+        if len(batch) == chunksize:
+            yield first, batch.to_bytes()
+            first += len(batch)
+            batch = QuoteBatch()
+    if len(batch):
+        yield first, batch.to_bytes()
+
+
+def _rendered(quotes, workers, chunksize):
+    # (name, PDF, summary row) in input order, with at most two chunks per
+    # worker packed or rendering at any time
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for first, packed in _chunks(quotes, chunksize):
+            if len(pending) >= 2 * workers:
+                yield from pending.popleft().result()
+            pending.append(pool.submit(_render_chunk, first, packed))
+        while pending:
+            yield from pending.popleft().result()
+
+
+def run_batch(quotes, output, workers=None, chunksize=8):
+    """Render every quote to output (a directory, or a .zip path) and time it.
+
+    quotes is read lazily and the summary is spooled to a temporary file,
+    so memory does not grow with the number of quotes.
+    """
+    to_zip = output.lower().endswith(".zip")
+    if to_zip:
+        archive = zipfile.ZipFile(output, "w", zipfile.ZIP_STORED)
+    else:
+        os.makedirs(output, exist_ok=True)
+
+    written = 0
+    start = time.perf_counter()
+    try:
+        with tempfile.TemporaryFile("w+", encoding="utf-8", newline="") as summary:
+            writer = csv.writer(summary)
+            writer.writerow(["file", "quote_number", "client_name", "subtotal", "discount", "tax_due", "total_due"])
+            for name, data, summary_row in _rendered(quotes, workers, chunksize):
+                # PDF streams are already deflated, storing them again is cheaper than re-compressing
+                if to_zip:
+                    archive.writestr(name, data)
+                else:
+                    with open(os.path.join(output, name), "wb") as f:
+                        f.write(data)
+                writer.writerow(summary_row)
+                written += 1
+
+            summary.flush()
+            summary.buffer.seek(0)
+            if to_zip:
+                with archive.open("summary.csv", "w") as out:
+                    shutil.copyfileobj(summary.buffer, out)
+            else:
+                with open(os.path.join(output, "summary.csv"), "wb") as out:
+                    shutil.copyfileobj(summary.buffer, out)
+    finally:
+        if to_zip:
+            archive.close()
+    return BatchReport(quotes=written, seconds=time.perf_counter() - start)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render one quote PDF per row of a CSV or JSONL file.")
+    parser.add_argument("input", help="CSV or JSONL file with one quote per row")
+    parser.add_argument("output", help="output directory, or a .zip file")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--chunksize", type=int, default=8, help="rows handed to a worker at a time")
+    args = parser.parse_args(argv)
+
+    report = run_batch(read_quotes(args.input), args.output, args.workers, args.chunksize)
+    print(f"Rendered {report.quotes} quotes in {report.seconds:.2f}s "
+          f"({report.quotes_per_second:.1f} quotes/s)")
+
+
+if __name__ == "__main__":
+    main()
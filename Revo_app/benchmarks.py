@@ -0,0 +1,279 @@
+"""Benchmarks for pricing, PDF rendering, photo handling and full submits.
+
+Fixtures are synthetic and seeded, so two runs on the same machine measure
+the same work. Every case reports p50/p95 latency, throughput and the peak
+Python heap of one call; the run also records the process RSS. Results can
+be saved as a JSON baseline and later runs compared against it.
+
+    python benchmarks.py --save baseline.json
+    python benchmarks.py --compare baseline.json          # exit 1 on regressions
+    python benchmarks.py --filter render --min-time 0.5
+"""
+
+import argparse
+import io
+import itertools
+import json
+import platform
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass, replace
+from datetime import date
+
+import fpdf
+import PIL
+from PIL import Image, ImageDraw
+
+from image_header import probe_image
+from image_pipeline import current_rss, prepare_photo
+from intake_pdf import PDF, DocumentStats, IntakeInput, add_row, render_intake_pdf
+from packet_pdf import render_packet_pdf
+from pdf_fonts import SANS
+from photo_store import PHOTO_STORE
+from quote_engine import QuoteInput, calculate_quote, parse_addons
+from quote_pdf import render_quote_pdf, render_quote_preview
+from quote_vector import calculate_quote_arrays
+from records import QuoteBatch, pack_quote, unpack_quote
+from text_metrics import count_lines
+
+SEED = 2024
+PHOTO_SIZES = ((640, 480), (1600, 1200), (4000, 3000))
+
+
+@dataclass
+class CaseResult:
+    name: str
+    calls: int
+    p50_ms: float
+    p95_ms: float
+    mean_ms: float
+    per_second: float
+    heap_peak_kb: float
+
+
+# Fixtures
+def addon_text(count, rng):
+    lines = []
+    for i in range(count):
+        words = " ".join(rng.choice(("seal", "edge", "patch", "crack fill", "stripe", "haul away")) for _ in range(rng.randrange(1, 8)))
+        if i % 3:
+            lines.append(f"Item {i} {words} - {rng.randrange(1, 40)} ft x {rng.uniform(1, 90):.2f}")
+        else:
+            lines.append(f"Flat {i} {words} - {rng.uniform(1, 900):.2f}")
+    return "\n".join(lines)
+
+
+def make_quote(addons, rng):
+    return QuoteInput(
+        company_name="Benchmark Paving", client_name="Jordan Client", client_email="jordan@example.com",
+        quote_number="BM-0001", quote_date=date(2026, 1, 15), valid_until=date(2026, 2, 14),
+        job_description="Clean, crack fill and seal coat the main lot and both side driveways. " * 3,
+        units=2400, rate_per_unit=0.85, material_cost=310, labor_hours=14, hourly_rate=42,
+        travel_cost=35, addons=parse_addons(addon_text(addons, rng)), discount_rate=5, tax_rate=6.25,
+    )
+
+
+def make_photo(width, height, rng):
+    image = Image.new("RGB", (width, height), tuple(rng.randrange(256) for _ in range(3)))
+    draw = ImageDraw.Draw(image)
+    for _ in range(60):
+        x, y = rng.randrange(width), rng.randrange(height)
+        draw.ellipse([x, y, x + width // 6, y + height // 6], fill=tuple(rng.randrange(256) for _ in range(3)))
+    out = io.BytesIO()
+    image.save(out, "JPEG", quality=90)
+    return out.getvalue()
+
+
+def long_notes(rng, words=3000):
+    vocabulary = ("gate", "code", "dog", "side", "entrance", "please", "call", "before", "arrival",
+                  "driveway", "cracked", "near", "garage", "extra-long-compound-word-without-breaks")
+    return " ".join(rng.choice(vocabulary) for _ in range(words))
+
+
+def make_intake(photos, rng, notes_words=60):
+    return IntakeInput(
+        client_name="Jordan Client", email="jordan@example.com", phone="555-0100",
+        address="12 Example Road, Springfield, IL 62701", preferred_contact="Email",
+        service_needed="Seal coat", preferred_date=date(2026, 3, 2), notes=long_notes(rng, notes_words),
+        photos=photos,
+    )
+
+
+# Timing
+def measure(name, fn, min_time=1.0, min_calls=3, max_calls=10000):
+    fn()  # warm caches and templates, as a long-running app would have
+    latencies = []
+    start = time.perf_counter()
+    while len(latencies) < min_calls or (time.perf_counter() - start < min_time and len(latencies) < max_calls):
+        t = time.perf_counter_ns()
+        fn()
+        latencies.append((time.perf_counter_ns() - t) / 1e6)
+    latencies.sort()
+
+    tracemalloc.start()
+    fn()
+    heap_peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    total = sum(latencies)
+    return CaseResult(
+        name=name,
+        calls=len(latencies),
+        p50_ms=statistics.median(latencies),
+        p95_ms=latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))],
+        mean_ms=total / len(latencies),
+        per_second=len(latencies) / (total / 1000) if total else 0.0,
+        heap_peak_kb=heap_peak / 1024,
+    )
+
+
+def build_cases():
+    """(name, fn) pairs; fixtures are built here, outside the timed calls."""
+    rng = random.Random(SEED)
+    small = make_quote(0, rng)
+    large = make_quote(500, rng)
+    per_line = replace(large, tax_rule="per_line")
+    # Successive previews differ in one header field, as when typing a name
+    edits = itertools.cycle([replace(large, client_name=f"Client {i}") for i in range(8)])
+    # Outside Latin-1, so the Unicode font is embedded
+    small_unicode = replace(small, client_name="Zoë Łukasiewicz")
+    large_unicode = replace(large, client_name="Zoë Łukasiewicz")
+    large_text = addon_text(500, rng)
+    packed_large = pack_quote(large)
+    batch = QuoteBatch(make_quote(5, rng) for _ in range(1000))
+    columns = {name: [getattr(small, name)] * 10000 for name in ("units", "rate_per_unit", "tax_rate")}
+    photos = {size: make_photo(*size, rng) for size in PHOTO_SIZES}
+    photo_mix = [photos[PHOTO_SIZES[i % len(PHOTO_SIZES)]] for i in range(30)]
+    notes = long_notes(rng)
+    measuring = PDF()
+    measuring.add_page()
+    measuring.set_font(SANS, "", 12)
+
+    def uploads(count):
+        return [io.BytesIO(data) for data in photo_mix[:count]]
+
+    def add_row_long_notes():
+        pdf = PDF()
+        pdf.add_page()
+        add_row(pdf, "Notes", notes)
+
+    def submit_quote(text=large_text):
+        quote = replace(small, addons=parse_addons(text))
+        return render_quote_pdf(quote, calculate_quote(quote))
+
+    def submit_intake(count, notes_words=60, repeat=False):
+        # A fresh submit decodes every photo; a repeat finds them all prepared
+        if not repeat:
+            PHOTO_STORE.clear()
+        intake = make_intake(uploads(count), random.Random(SEED), notes_words)
+        return render_intake_pdf(intake, DocumentStats())
+
+    cases = [
+        ("pricing.small", lambda: calculate_quote(small)),
+        ("pricing.large_500_items", lambda: calculate_quote(large)),
+        ("pricing.large_500_items_per_line", lambda: calculate_quote(per_line)),
+        ("pricing.vector_10k", lambda: calculate_quote_arrays(**columns)),
+        ("parse.addons_500", lambda: parse_addons(large_text)),
+        ("records.pack_quote_500_items", lambda: pack_quote(large)),
+        ("records.unpack_quote_500_items", lambda: unpack_quote(packed_large)),
+        ("records.batch_1k_round_trip", lambda: list(QuoteBatch.from_bytes(batch.to_bytes()))),
+        ("render.quote_small_revu", lambda: render_quote_pdf(small)),
+        ("render.quote_small_cravix", lambda: render_quote_pdf(small, style="cravix")),
+        ("render.quote_500_items_revu", lambda: render_quote_pdf(large)),
+        ("render.quote_500_items_cravix", lambda: render_quote_pdf(large, style="cravix")),
+        ("render.quote_500_items_preview_edit", lambda: render_quote_preview(next(edits))),
+        ("render.quote_small_unicode", lambda: render_quote_pdf(small_unicode)),
+        ("render.quote_500_items_unicode", lambda: render_quote_pdf(large_unicode)),
+        ("layout.count_lines_long_notes", lambda: count_lines(measuring, notes, 130)),
+        ("layout.add_row_long_notes", add_row_long_notes),
+    ]
+    for width, height in PHOTO_SIZES:
+        data = photos[(width, height)]
+        cases.append((f"image.probe_{width}x{height}", lambda data=data: probe_image(data)))
+        cases.append((f"image.prepare_{width}x{height}", lambda data=data: prepare_photo(io.BytesIO(data))))
+        cases.append((f"image.store_repeat_{width}x{height}",
+                      lambda data=data: PHOTO_STORE.prepared(io.BytesIO(data))))
+    cases += [
+        ("submit.quote_small", lambda: submit_quote("")),
+        ("submit.quote_500_items", submit_quote),
+        ("submit.intake_0_photos", lambda: submit_intake(0)),
+        ("submit.intake_5_photos", lambda: submit_intake(5)),
+        ("submit.intake_30_photos", lambda: submit_intake(30)),
+        ("submit.intake_30_photos_repeat", lambda: submit_intake(30, repeat=True)),
+        ("submit.intake_long_notes", lambda: submit_intake(0, 3000)),
+        ("submit.packet_5_photos_500_items",
+         lambda: render_packet_pdf(make_intake(uploads(5), random.Random(SEED)), large, stats=DocumentStats())),
+    ]
+    return cases
+
+
+def environment():
+    return {
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "fpdf": fpdf.FPDF_VERSION,
+        "pillow": PIL.__version__,
+    }
+
+
+def compare(results, baseline, threshold):
+    """Print each case against the baseline; return the names that got slower than threshold x p50."""
+    previous = {case["name"]: case for case in baseline["cases"]}
+    regressions = []
+    for result in results:
+        old = previous.get(result.name)
+        if old is None:
+            print(f"{result.name:34} new case")
+            continue
+        ratio = result.p50_ms / old["p50_ms"] if old["p50_ms"] else float("inf")
+        flag = ""
+        if ratio > threshold:
+            flag = "  REGRESSION"
+            regressions.append(result.name)
+        elif ratio < 1 / threshold:
+            flag = "  faster"
+        print(f"{result.name:34} p50 {old['p50_ms']:9.3f} -> {result.p50_ms:9.3f} ms  x{ratio:5.2f}{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark quote and intake generation.")
+    parser.add_argument("--filter", default="", help="only run cases whose name contains this")
+    parser.add_argument("--min-time", type=float, default=1.0, help="seconds to spend per case (at least 3 calls)")
+    parser.add_argument("--save", help="write results to this JSON file")
+    parser.add_argument("--compare", help="compare against a JSON file written by --save")
+    parser.add_argument("--threshold", type=float, default=1.25, help="p50 ratio counted as a regression")
+    args = parser.parse_args(argv)
+
+    results = []
+    print(f"{'case':34} {'calls':>6} {'p50 ms':>10} {'p95 ms':>10} {'per s':>10} {'heap KB':>9}")
+    for name, fn in build_cases():
+        if args.filter not in name:
+            continue
+        result = measure(name, fn, args.min_time)
+        results.append(result)
+        print(f"{name:34} {result.calls:6d} {result.p50_ms:10.3f} {result.p95_ms:10.3f} "
+              f"{result.per_second:10.1f} {result.heap_peak_kb:9.0f}")
+    rss = current_rss()
+    print(f"process RSS {rss / 2**20:.0f} MB")
+
+    report = {"environment": environment(), "rss": rss, "cases": [asdict(r) for r in results]}
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Saved {args.save}")
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} regression(s): {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
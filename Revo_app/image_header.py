@@ -0,0 +1,145 @@
+"""Bounded-time image header parsing straight from an in-memory buffer.
+
+probe_image() reads the dimensions, EXIF orientation and JPEG coding of a
+PNG or JPEG upload through a memoryview, without copying it or touching
+disk. JPEG segments are skipped by their length fields, never byte by byte,
+and nothing past max_scan bytes is ever looked at, so a truncated or hostile
+file fails fast with ValueError instead of spinning.
+"""
+
+from dataclasses import dataclass
+from struct import unpack_from
+
+MAX_SCAN = 1 << 20
+
+_PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+# SOFn markers carry the frame size; C4 (DHT), C8 (JPG) and CC (DAC) do not
+_SOF_MARKERS = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+_PROGRESSIVE_MARKERS = frozenset({0xC2, 0xC6, 0xCA, 0xCE})
+# Markers without a length field
+_STANDALONE_MARKERS = frozenset({0x01, *range(0xD0, 0xD8)})
+_ORIENTATION_TAG = 0x0112
+
+
+@dataclass(frozen=True)
+class ImageInfo:
+    format: str
+    width: int
+    height: int
+    orientation: int = 1
+    frame: int = 0
+    components: int = 3
+
+    @property
+    def progressive(self):
+        return self.frame in _PROGRESSIVE_MARKERS
+
+    @property
+    def baseline(self):
+        """True for plain Huffman-coded JPEGs (SOF0/SOF1) any PDF reader can show."""
+        return self.frame in (0xC0, 0xC1)
+
+    @property
+    def upright_size(self):
+        """(width, height) once the EXIF orientation has been applied."""
+        if self.orientation in (5, 6, 7, 8):
+            return self.height, self.width
+        return self.width, self.height
+
+
+def probe_image(source, max_scan=MAX_SCAN):
+    """Return ImageInfo for PNG or JPEG data.
+
+    source may be bytes, a memoryview, or a BytesIO-like upload (anything with
+    getbuffer()), which is read through a view of its own buffer. Other file
+    objects have their first max_scan bytes read and are rewound.
+    """
+    if hasattr(source, "getbuffer"):
+        with source.getbuffer() as view:
+            return _probe(view, max_scan)
+    if hasattr(source, "read"):
+        source.seek(0)
+        head = source.read(max_scan)
+        source.seek(0)
+        return probe_image(head, max_scan)
+    with memoryview(source) as view:
+        return _probe(view, max_scan)
+
+
+def _probe(view, max_scan):
+    view = view.cast("B") if view.format != "B" else view
+    if view[:8] == _PNG_SIGNATURE:
+        return _probe_png(view)
+    if view[:2] == b"\xff\xd8":
+        return _probe_jpeg(view, min(len(view), max_scan))
+    raise ValueError("Unsupported image format")
+
+
+def _probe_png(view):
+    if len(view) < 24 or view[12:16] != b"IHDR":
+        raise ValueError("Truncated PNG header")
+    width, height = unpack_from(">II", view, 16)
+    if not width or not height:
+        raise ValueError("PNG has no size")
+    return ImageInfo("PNG", width, height)
+
+
+def _probe_jpeg(view, limit):
+    orientation = 1
+    pos = 2
+    while pos + 4 <= limit:
+        if view[pos] != 0xFF:
+            raise ValueError(f"Corrupt JPEG: expected a marker at byte {pos}")
+        marker = view[pos + 1]
+        if marker == 0xFF:
+            # Fill byte before a marker
+            pos += 1
+            continue
+        pos += 2
+        if marker in _STANDALONE_MARKERS:
+            continue
+        if marker in (0xD9, 0xDA):
+            raise ValueError("JPEG has no frame header before its image data")
+
+        (length,) = unpack_from(">H", view, pos)
+        if length < 2:
+            raise ValueError(f"Corrupt JPEG: bad segment length at byte {pos}")
+        if marker in _SOF_MARKERS:
+            if pos + 8 > len(view):
+                raise ValueError("Truncated JPEG frame header")
+            height, width, components = unpack_from(">HHB", view, pos + 3)
+            if not width or not height:
+                raise ValueError("JPEG has no size")
+            return ImageInfo("JPEG", width, height, orientation, marker, components)
+        if marker == 0xE1 and orientation == 1:
+            orientation = _exif_orientation(view[pos + 2:min(pos + length, len(view))])
+        pos += length
+    raise ValueError(f"No JPEG frame header within the first {limit} bytes")
+
+
+def _exif_orientation(segment):
+    # APP1 payload: "Exif\0\0" then a TIFF header and IFD0. Anything that does
+    # not add up is treated as "no orientation" rather than an error.
+    if len(segment) < 14 or segment[:6] != b"Exif\x00\x00":
+        return 1
+    tiff = segment[6:]
+    order = bytes(tiff[:2])
+    if order == b"II":
+        endian = "<"
+    elif order == b"MM":
+        endian = ">"
+    else:
+        return 1
+    (ifd,) = unpack_from(endian + "I", tiff, 4)
+    if ifd + 2 > len(tiff):
+        return 1
+    (count,) = unpack_from(endian + "H", tiff, ifd)
+    entry = ifd + 2
+    for _ in range(count):
+        if entry + 12 > len(tiff):
+            break
+        tag, kind, _, value = unpack_from(endian + "HHIH", tiff, entry)
+        if tag == _ORIENTATION_TAG:
+            return value if kind == 3 and 1 <= value <= 8 else 1
+        entry += 12
+    return 1
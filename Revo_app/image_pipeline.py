@@ -0,0 +1,188 @@
+"""Photo preparation for intake PDFs.
+
+Uploads are decoded straight from their in-memory buffer, scaled down to
+the size they are printed at and re-encoded as compact JPEGs. Photos are
+prepared on a small thread pool (Pillow releases the GIL while decoding,
+resizing and encoding) with a bounded window, so a 20-photo intake never
+holds more than a few full-size decodes at once. Sizes come from the file
+header, and baseline JPEGs that are already small enough are embedded as-is.
+"""
+
+import io
+import os
+import sys
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+from PIL import Image, ImageOps
+
+from image_header import probe_image
+from metrics import METRICS, count, stage
+
+MM_PER_INCH = 25.4
+LAYOUT_DPI = 96
+PRINT_DPI = 150
+JPEG_QUALITY = 80
+THUMB_PX = 160
+PHOTO_WORKERS = min(4, os.cpu_count() or 1)
+
+
+@dataclass
+class PreparedPhoto:
+    data: bytes
+    width: int
+    height: int
+    colorspace: str
+    draw_w: float
+    draw_h: float
+    source_bytes: int
+    digest: str = ""        # SHA-256 of the upload, when it came from a PhotoStore
+    reused: bool = False    # served by a PhotoStore without decoding
+
+
+def current_rss():
+    """Resident set size of this process in bytes."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return 0
+    # Without /proc, fall back to the process peak (bytes on macOS, KB elsewhere)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def draw_size(width_px, height_px, max_w=180, max_h=120, dpi=LAYOUT_DPI):
+    """Size in mm a photo is laid out at: natural size at dpi, shrunk to fit max_w x max_h."""
+    nat_w = (width_px / dpi) * MM_PER_INCH
+    nat_h = (height_px / dpi) * MM_PER_INCH
+    scale = min(max_w / nat_w, max_h / nat_h, 1)
+    return nat_w * scale, nat_h * scale
+
+
+def _flatten(image):
+    # JPEG has no alpha: composite transparent photos onto white
+    if image.mode in ("RGBA", "LA", "P", "PA"):
+        image = image.convert("RGBA")
+        background = Image.new("RGB", image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel("A"))
+        return background
+    if image.mode not in ("RGB", "L"):
+        return image.convert("RGB")
+    return image
+
+
+def prepare_photo(upload, max_w=180, max_h=120, print_dpi=PRINT_DPI, quality=JPEG_QUALITY, stats=None):
+    """Decode, orient, downsample and re-encode one uploaded photo.
+
+    upload is any binary file-like object (a Streamlit UploadedFile works);
+    it is read in place, never copied with getvalue(). Raises ValueError for
+    anything that is not a readable PNG or JPEG. When stats is given
+    its process_rss is updated while the full decode is still alive.
+    """
+    if not METRICS.enabled:
+        return _prepare_photo(upload, max_w, max_h, print_dpi, quality, stats)
+    with stage("photo_prep"):
+        photo = _prepare_photo(upload, max_w, max_h, print_dpi, quality, stats)
+    count("photos_total")
+    count("photo_source_bytes_total", photo.source_bytes)
+    count("photo_output_bytes_total", len(photo.data))
+    return photo
+
+
+def _prepare_photo(upload, max_w, max_h, print_dpi, quality, stats):
+    upload.seek(0, io.SEEK_END)
+    source_bytes = upload.tell()
+    upload.seek(0)
+
+    info = probe_image(upload)
+    upright = info.upright_size
+    turned = upright != (info.width, info.height)
+    draw_w, draw_h = draw_size(*upright, max_w=max_w, max_h=max_h)
+    target = (max(1, round(draw_w / MM_PER_INCH * print_dpi)),
+              max(1, round(draw_h / MM_PER_INCH * print_dpi)))
+
+    if (info.baseline and info.orientation == 1 and info.components in (1, 3)
+            and info.width <= target[0] and info.height <= target[1]):
+        # Already print-sized and upright: re-encoding would only lose quality
+        return PreparedPhoto(
+            data=upload.read(),
+            width=info.width,
+            height=info.height,
+            colorspace="DeviceGray" if info.components == 1 else "DeviceRGB",
+            draw_w=draw_w,
+            draw_h=draw_h,
+            source_bytes=source_bytes,
+        )
+
+    with Image.open(upload) as image:
+        if image.format == "JPEG":
+            # Let libjpeg decode at 1/2, 1/4 or 1/8 scale when that is still big enough
+            image.draft("RGB", (target[1], target[0]) if turned else target)
+
+        photo = _flatten(ImageOps.exif_transpose(image))
+        if photo.width > target[0] or photo.height > target[1]:
+            photo = photo.resize(target, Image.LANCZOS, reducing_gap=3.0)
+        if stats is not None:
+            stats.process_rss = max(stats.process_rss, current_rss())
+
+    out = io.BytesIO()
+    photo.save(out, "JPEG", quality=quality, optimize=True)
+    return PreparedPhoto(
+        data=out.getvalue(),
+        width=photo.width,
+        height=photo.height,
+        colorspace="DeviceGray" if photo.mode == "L" else "DeviceRGB",
+        draw_w=draw_w,
+        draw_h=draw_h,
+        source_bytes=source_bytes,
+    )
+
+
+def make_thumbnail(data, size=THUMB_PX, quality=70):
+    """A JPEG at most size px on its longer side, made from an upright prepared JPEG."""
+    with Image.open(io.BytesIO(data)) as image:
+        image.draft("RGB", (size, size))
+        thumb = _flatten(image)
+        thumb.thumbnail((size, size), Image.LANCZOS)
+        out = io.BytesIO()
+        thumb.save(out, "JPEG", quality=quality, optimize=True)
+    return PreparedPhoto(
+        data=out.getvalue(),
+        width=thumb.width,
+        height=thumb.height,
+        colorspace="DeviceGray" if thumb.mode == "L" else "DeviceRGB",
+        draw_w=0.0,
+        draw_h=0.0,
+        source_bytes=len(data),
+    )
+
+
+def prepare_photos(uploads, workers=PHOTO_WORKERS, stats=None, prepare=prepare_photo, **options):
+    """Prepare uploads in parallel, yielding PreparedPhotos in upload order.
+
+    At most workers photos are being decoded at any time and at most
+    2 * workers finished ones wait for the caller, which keeps memory flat
+    however many photos there are. Each upload goes through
+    prepare(upload, stats=stats, **options): prepare_photo(), or a
+    PhotoStore's prepared() to reuse earlier work.
+    """
+    uploads = iter(uploads)
+    if workers <= 1:
+        for upload in uploads:
+            yield prepare(upload, stats=stats, **options)
+        return
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="photo") as pool:
+        window = deque()
+        for upload in uploads:
+            window.append(pool.submit(prepare, upload, stats=stats, **options))
+            if len(window) >= 2 * workers:
+                yield window.popleft().result()
+        while window:
+            yield window.popleft().result()
@@ -0,0 +1,246 @@
+"""Client intake PDF layouts (Cravix, and the plainer Revu one)."""
+
+from dataclasses import dataclass, field
+from datetime import date
+
+from pdf_fonts import SANS, Document
+from pdf_layout import BlockTemplate, Cell, Ln, Style
+from image_pipeline import current_rss, prepare_photos
+from metrics import count, stage
+from photo_store import PHOTO_STORE
+from pdf_render import pdf_to_bytes, register_jpeg
+from text_metrics import count_lines
+
+
+@dataclass(slots=True)
+class IntakeInput:
+    client_name: str = ""
+    email: str = ""
+    phone: str = ""
+    address: str = ""
+    preferred_contact: str = "Phone"
+    service_needed: str = ""
+    preferred_date: date = field(default_factory=date.today)
+    notes: str = ""
+    photos: list = field(default_factory=list)
+
+
+@dataclass
+class DocumentStats:
+    """What went into a document; photos and pages are updated while it is laid out."""
+
+    photos: int = 0
+    photos_total: int = 0
+    photos_reused: int = 0      # served by the photo store without decoding
+    pages: int = 0
+    source_bytes: int = 0
+    embedded_bytes: int = 0
+    output_bytes: int = 0
+    # Highest RSS of the whole process seen during the render, so it includes
+    # renders running alongside and the long-lived caches; not this document alone
+    process_rss: int = 0
+    photo_digests: list = field(default_factory=list)
+
+
+_HEADER = BlockTemplate([
+    Style(font=(SANS, "B", 16), text_color=(79, 139, 249)),
+    Cell(0, 10, "Client Intake Summary", ln=1, align="C"),
+    Style(font=(SANS, "", 12), text_color=(0, 0, 0)),
+    Cell(0, 10, slot="generated_on", ln=1, align="C"),
+    Ln(5),
+])
+
+_FOOTER = BlockTemplate([
+    Style(font=(SANS, "I", 9), text_color=(100, 100, 100)),
+    Cell(0, 10, slot="page", align="C"),
+    Cell(0, 10, "Generated with Cravix", 0, 0, "R"),
+])
+
+# Section title bar, leaving the row style selected for add_row
+_SECTION = BlockTemplate([
+    Style(fill_color=(230, 230, 230), font=(SANS, "B", 12), text_color=(0, 0, 0)),
+    Cell(0, 10, slot="title", ln=1, fill=True),
+    Ln(5),
+    Style(draw_color=(200, 200, 200), fill_color=(245, 245, 245)),
+])
+
+
+class PDF(Document):
+    stats = None  # DocumentStats to count pages into as they start
+
+    def header(self):
+        if self.stats is not None:
+            self.stats.pages = self.page
+        _HEADER.render(self, generated_on=f"Generated on: {date.today().strftime('%m/%d/%Y')}")
+
+    def footer(self):
+        self.set_y(-15)
+        _FOOTER.render(self, page=f"Page {self.page_no()}")
+
+
+def add_row(pdf, label, value):
+    pdf.set_font(SANS, '', 12)  # Set to value font for width calculation
+    cell_width = 130
+    line_height = 6
+    # Label cell spans as many lines as multi_cell will wrap the value into
+    row_height = count_lines(pdf, value, cell_width) * line_height
+
+    pdf.set_font(SANS, 'B', 12)
+    pdf.cell(60, row_height, label, border=1, ln=0, align='L', fill=True)
+    pdf.set_font(SANS, '', 12)
+    pdf.multi_cell(130, line_height, value, border=1, align='L', fill=True)
+
+
+def _draw_photos(pdf, photos, stats):
+    page_width = 210
+    left_margin = 10
+    right_margin = 10
+    h_spacing = 10
+
+    def prepared():
+        # Decoding and resizing run ahead on the photo pool, skipped for
+        # photos the store has prepared before; placement below stays
+        # sequential. Images are named by content, so a photo attached
+        # twice is embedded once
+        for number, photo in enumerate(prepare_photos(photos, stats=stats, prepare=PHOTO_STORE.prepared), 1):
+            stats.photos += 1
+            stats.photos_reused += photo.reused
+            stats.source_bytes += photo.source_bytes
+            stats.photo_digests.append(photo.digest)
+            name = f"photo-{photo.digest}"
+            if name not in pdf.images:
+                stats.embedded_bytes += len(photo.data)
+            register_jpeg(pdf, name, photo.data, photo.width, photo.height, photo.colorspace)
+            yield number, name, photo
+
+    queue = prepared()
+    pending = next(queue, None)
+    while pending:
+        # Estimate row height: caption 5 + 2 + max_h 120 + 10 = ~140
+        if pdf.get_y() + 140 > 280:
+            pdf.add_page()
+
+        row_y = pdf.get_y()
+
+        # First photo
+        number1, name1, photo1 = pending
+        pdf.set_font(SANS, 'I', 10)
+        pdf.set_xy(left_margin, row_y)
+        pdf.cell(photo1.draw_w, 5, f"Photo {number1}", ln=0)
+
+        img_y = row_y + 7
+        pdf.image(name1, x=left_margin, y=img_y, w=photo1.draw_w, h=photo1.draw_h)
+        row_h = photo1.draw_h
+
+        # Second photo goes on the same row when both fit across the page
+        pending = next(queue, None)
+        if pending:
+            number2, name2, photo2 = pending
+            if left_margin + photo1.draw_w + h_spacing + photo2.draw_w + right_margin <= page_width:
+                x2 = left_margin + photo1.draw_w + h_spacing
+
+                # Caption for second
+                pdf.set_xy(x2, row_y)
+                pdf.cell(photo2.draw_w, 5, f"Photo {number2}", ln=0)
+
+                pdf.image(name2, x=x2, y=img_y, w=photo2.draw_w, h=photo2.draw_h)
+                row_h = max(row_h, photo2.draw_h)
+                pending = next(queue, None)
+
+        # Set next y
+        pdf.set_y(img_y + row_h + 10)
+
+
+def draw_intake(pdf, intake, stats=None):
+    """Lay out the intake summary and photos, starting on the current page."""
+    if stats is None:
+        stats = DocumentStats()
+    _SECTION.render(pdf, title="Client Info")
+
+    add_row(pdf, "Full Name", intake.client_name)
+    add_row(pdf, "Email", intake.email)
+    add_row(pdf, "Phone", intake.phone)
+    add_row(pdf, "Address", intake.address)
+    add_row(pdf, "Preferred Contact", intake.preferred_contact)
+
+    pdf.ln(10)
+    _SECTION.render(pdf, title="Service Request")
+
+    add_row(pdf, "Service Needed", intake.service_needed)
+    add_row(pdf, "Preferred Date", intake.preferred_date.strftime('%m/%d/%Y'))
+    add_row(pdf, "Notes", intake.notes)
+
+    if intake.photos:
+        pdf.ln(10)
+        _SECTION.render(pdf, title="Uploaded Photos")
+        _draw_photos(pdf, intake.photos, stats)
+
+
+def draw_revu_intake(pdf, intake):
+    """Lay out the Revu intake summary on the current page; photos are not included."""
+    pdf.set_font(SANS, 'B', 16)
+    pdf.set_text_color(79, 139, 249)
+    pdf.cell(0, 10, "Client Intake Summary", ln=True)
+
+    pdf.set_font(SANS, '', 12)
+    pdf.set_text_color(0, 0, 0)
+    pdf.set_fill_color(240)
+
+    def add_row(label, value):
+        pdf.set_font(SANS, 'B', 12)
+        pdf.cell(60, 10, label, 1, 0, 'L', 1)
+        pdf.set_font(SANS, '', 12)
+        pdf.cell(130, 10, value, 1, 1, 'L', 1)
+
+    pdf.ln(5)
+    pdf.set_fill_color(230)
+    pdf.set_font(SANS, 'B', 12)
+    pdf.cell(0, 10, "Client Info", ln=True, fill=True)
+
+    add_row("Full Name", intake.client_name)
+    add_row("Email", intake.email)
+    add_row("Phone", intake.phone)
+    add_row("Address", intake.address)
+    add_row("Preferred Contact", intake.preferred_contact)
+
+    pdf.ln(5)
+    pdf.set_fill_color(230)
+    pdf.set_font(SANS, 'B', 12)
+    pdf.cell(0, 10, "Service Request", ln=True, fill=True)
+
+    add_row("Service Needed", intake.service_needed)
+    add_row("Preferred Date", intake.preferred_date.strftime('%m/%d/%Y'))
+    add_row("Notes", intake.notes)
+
+    pdf.set_y(-20)
+    pdf.set_font(SANS, "I", 9)
+    pdf.cell(0, 10, "Generated with Revu", 0, 0, 'R')
+
+
+def build_intake_pdf(intake, stats=None, style="cravix"):
+    with stage("build_pdf", kind="intake", style=style):
+        if style == "revu":
+            pdf = Document.for_text(intake)
+            pdf.add_page()
+            draw_revu_intake(pdf, intake)
+        else:
+            pdf = PDF.for_text(intake)
+            if stats is not None:
+                stats.photos_total = len(intake.photos)
+                pdf.stats = stats
+            pdf.add_page()
+            draw_intake(pdf, intake, stats)
+    if stats is not None:
+        stats.pages = pdf.page
+    count("documents_total", kind="intake", style=style)
+    count("pages_total", pdf.page, kind="intake", style=style)
+    return pdf
+
+
+def render_intake_pdf(intake, stats=None, style="cravix"):
+    """Return the finished intake PDF as bytes, filling in stats if given."""
+    data = pdf_to_bytes(build_intake_pdf(intake, stats, style))
+    if stats is not None:
+        stats.output_bytes = len(data)
+        stats.process_rss = max(stats.process_rss, current_rss())
+    return data
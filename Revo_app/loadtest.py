@@ -0,0 +1,111 @@
+"""Load test for quote_api: many concurrent keep-alive clients against one endpoint.
+
+    python loadtest.py --url http://127.0.0.1:8080/quote/pdf --concurrency 200 --requests 5000
+
+Each client sends a quote (varied per request unless --same, so the PDF cache
+does not answer everything) and waits for the reply before sending the next.
+Reports throughput, latency percentiles and status counts.
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from collections import Counter
+from urllib.parse import urlsplit
+
+
+def _quote_body(n, same=False):
+    return {
+        "company_name": "Loadtest Co",
+        "client_name": f"Client {0 if same else n}",
+        "quote_number": str(100000 + (0 if same else n)),
+        "job_description": "Clean and seal driveway",
+        "units": 800,
+        "rate_per_unit": 1.25,
+        "labor_hours": 6,
+        "hourly_rate": 35,
+        "addons": [{"name": "Edging", "amount": 40}],
+        "tax_rate": 6.25,
+    }
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+async def _client(host, port, path, counter, total, same, latencies, statuses):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while True:
+            n = next(counter)
+            if n >= total:
+                return
+            body = json.dumps(_quote_body(n, same)).encode()
+            request = (f"POST {path} HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+                       f"Content-Length: {len(body)}\r\n\r\n").encode() + body
+            start = time.perf_counter()
+            writer.write(request)
+            await writer.drain()
+            status_line = await reader.readline()
+            if not status_line:
+                statuses["closed"] += 1
+                return
+            length = 0
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b""):
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                if name.lower() == "content-length":
+                    length = int(value)
+            await reader.readexactly(length)
+            latencies.append(time.perf_counter() - start)
+            statuses[int(status_line.split()[1])] += 1
+    finally:
+        writer.close()
+
+
+async def run(url, concurrency, total, same=False):
+    """Drive url with concurrency clients until total requests are done; returns a report dict."""
+    parts = urlsplit(url)
+    counter = iter(range(total + concurrency))
+    latencies = []
+    statuses = Counter()
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        _client(parts.hostname, parts.port or 80, parts.path or "/", counter, total, same, latencies, statuses)
+        for _ in range(concurrency)
+    ))
+    seconds = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "seconds": seconds,
+        "requests_per_second": len(latencies) / seconds if seconds else 0.0,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "statuses": dict(statuses),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Concurrent load test for quote_api.")
+    parser.add_argument("--url", default="http://127.0.0.1:8080/quote/pdf")
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--same", action="store_true", help="send one identical quote (measures the cache path)")
+    args = parser.parse_args(argv)
+
+    report = asyncio.run(run(args.url, args.concurrency, args.requests, args.same))
+    print(f"{report['requests']} requests in {report['seconds']:.2f}s "
+          f"({report['requests_per_second']:.0f} req/s), "
+          f"p50 {report['p50_ms']:.1f} ms, p95 {report['p95_ms']:.1f} ms, p99 {report['p99_ms']:.1f} ms")
+    print("status counts:", report["statuses"])
+
+
+if __name__ == "__main__":
+    main()
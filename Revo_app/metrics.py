@@ -0,0 +1,197 @@
+"""Stage timings and document counters for the generation path.
+
+Code marks its stages with `with stage("calculate"):` and its volumes with
+count("pages_total", 3, kind="quote"). Both are no-ops until metrics are
+enabled, which costs one attribute check per call. When enabled, timings
+are kept as Prometheus histograms and counters in memory, and optionally
+appended to a JSONL log, one event per line.
+
+Configured from the environment at import:
+
+    REVU_METRICS=1                   keep metrics in memory (for /metrics)
+    REVU_METRICS_JSONL=path.jsonl    also append every event to this file
+    REVU_METRICS_PORT=9108           serve /metrics on this port (Streamlit apps)
+"""
+
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class _NoStage:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NO_STAGE = _NoStage()
+
+
+class _Stage:
+    __slots__ = ("registry", "name", "labels", "start")
+
+    def __init__(self, registry, name, labels):
+        self.registry = registry
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.registry.observe(self.name, time.perf_counter() - self.start, **self.labels)
+        return False
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(pairs):
+    if not pairs:
+        return ""
+    escaped = (k + '="' + str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
+               for k, v in pairs)
+    return "{" + ",".join(escaped) + "}"
+
+
+class Metrics:
+    """Histograms of stage durations and monotonic counters. Thread-safe."""
+
+    def __init__(self, enabled=False, jsonl_path=None, prefix="revu"):
+        self.prefix = prefix
+        self.enabled = enabled or bool(jsonl_path)
+        self._lock = threading.Lock()
+        self._timings = {}
+        self._counters = {}
+        self._log = open(jsonl_path, "a", encoding="utf-8") if jsonl_path else None
+
+    def stage(self, name, **labels):
+        """Context manager timing one stage; a shared no-op when disabled."""
+        if not self.enabled:
+            return _NO_STAGE
+        return _Stage(self, name, labels)
+
+    def observe(self, name, seconds, **labels):
+        if not self.enabled:
+            return
+        key = (name, _label_key(labels))
+        with self._lock:
+            timing = self._timings.get(key)
+            if timing is None:
+                timing = self._timings[key] = [[0] * len(BUCKETS), 0, 0.0]
+            index = bisect_left(BUCKETS, seconds)
+            if index < len(BUCKETS):
+                timing[0][index] += 1
+            timing[1] += 1
+            timing[2] += seconds
+            self._write({"stage": name, "seconds": round(seconds, 6), **labels})
+
+    def count(self, name, value=1, **labels):
+        if not self.enabled:
+            return
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+            self._write({"counter": name, "value": value, **labels})
+
+    def _write(self, event):
+        # Caller holds the lock
+        if self._log is not None:
+            event["ts"] = round(time.time(), 3)
+            event["pid"] = os.getpid()
+            self._log.write(json.dumps(event, default=str) + "\n")
+            self._log.flush()
+
+    def prometheus_text(self):
+        """All metrics in the Prometheus text exposition format (0.0.4)."""
+        lines = []
+        with self._lock:
+            timings = sorted(self._timings.items())
+            counters = sorted(self._counters.items())
+        metric = f"{self.prefix}_stage_seconds"
+        lines.append(f"# HELP {metric} Time spent in each generation stage.")
+        lines.append(f"# TYPE {metric} histogram")
+        for (name, labels), (buckets, count, total) in timings:
+            pairs = (("stage", name),) + labels
+            cumulative = 0
+            for bound, hits in zip(BUCKETS, buckets):
+                cumulative += hits
+                lines.append(f"{metric}_bucket{_format_labels(pairs + (('le', repr(bound)),))} {cumulative}")
+            lines.append(f"{metric}_bucket{_format_labels(pairs + (('le', '+Inf'),))} {count}")
+            lines.append(f"{metric}_sum{_format_labels(pairs)} {total:.6f}")
+            lines.append(f"{metric}_count{_format_labels(pairs)} {count}")
+        declared = set()
+        for (name, labels), value in counters:
+            metric = f"{self.prefix}_{name}"
+            if metric not in declared:
+                declared.add(metric)
+                lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric}{_format_labels(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self):
+        """{"stages": {...}, "counters": {...}} with label tuples flattened into names."""
+        def name_of(name, labels):
+            return name + "".join(f"[{k}={v}]" for k, v in labels)
+        with self._lock:
+            return {
+                "stages": {name_of(n, l): {"count": t[1], "seconds": t[2]} for (n, l), t in self._timings.items()},
+                "counters": {name_of(n, l): v for (n, l), v in self._counters.items()},
+            }
+
+
+METRICS = Metrics(
+    enabled=os.environ.get("REVU_METRICS", "") not in ("", "0"),
+    jsonl_path=os.environ.get("REVU_METRICS_JSONL") or None,
+)
+stage = METRICS.stage
+count = METRICS.count
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def serve_metrics(port, host="0.0.0.0"):
+    """Serve METRICS at http://host:port/metrics from a daemon thread (once per process)."""
+    global _server
+    with _server_lock:
+        if _server is not None:
+            return _server
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?", 1)[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = METRICS.prometheus_text().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        _server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=_server.serve_forever, name="metrics", daemon=True).start()
+        return _server
+
+
+def serve_from_env():
+    """Start serve_metrics() when REVU_METRICS_PORT is set; returns the server or None."""
+    port = os.environ.get("REVU_METRICS_PORT")
+    if not port or not METRICS.enabled:
+        return None
+    return serve_metrics(int(port))
@@ -0,0 +1,161 @@
+"""Exact money arithmetic: integer cents, fixed-point inputs, explicit rounding.
+
+Form fields arrive as floats. Each one is converted once to an integer at a
+fixed scale: quantities and hours to 1/10000, prices to 1/1000000 of a
+dollar, percentages to 1/10000 of a percent. Everything after that is
+integer arithmetic, rounded to whole cents by round_div() at the points a
+TaxRule says, so the lines on a quote always add up to its totals.
+
+    >>> line_cents(3, 19.99)
+    5997
+    >>> percent_of(10001, 6.25)           # 625.0625 -> 625
+    625
+    >>> sorted(tax_rule("labor_exempt").taxable)
+    ['addons', 'materials', 'service', 'travel']
+"""
+
+from dataclasses import dataclass
+
+QTY_SCALE = 10_000
+PRICE_SCALE = 1_000_000
+RATE_SCALE = 10_000
+CENT = PRICE_SCALE // 100
+
+HALF_UP = "half_up"
+HALF_EVEN = "half_even"
+ROUNDING_MODES = (HALF_UP, HALF_EVEN)
+
+# Kinds of quote line a tax rule can include or leave out
+LINE_KINDS = ("service", "labor", "materials", "travel", "addons")
+
+
+def fixed(value, scale):
+    """value as an int multiple of 1/scale, rounded to the nearest step."""
+    return round(value * scale)
+
+
+def round_div(numerator, denominator, rounding=HALF_UP):
+    """numerator / denominator rounded to an int; denominator must be positive.
+
+    HALF_UP rounds halves away from zero, HALF_EVEN to the even neighbour.
+    """
+    if rounding == HALF_UP:
+        if numerator >= 0:
+            return (2 * numerator + denominator) // (2 * denominator)
+        return -((-2 * numerator + denominator) // (2 * denominator))
+    if rounding == HALF_EVEN:
+        quotient, remainder = divmod(numerator, denominator)
+        twice = 2 * remainder
+        if twice > denominator or (twice == denominator and quotient & 1):
+            quotient += 1
+        return quotient
+    raise ValueError(f"Unknown rounding mode: {rounding!r}")
+
+
+# The three helpers below inline round_div() for the usual case, a
+# non-negative amount rounded HALF_UP; the divisors are all even
+
+def to_cents(value, rounding=HALF_UP):
+    """A dollar amount as int cents; sub-cent input is rounded."""
+    n = round(value * PRICE_SCALE)
+    if n >= 0 and rounding == HALF_UP:
+        return (n + CENT // 2) // CENT
+    return round_div(n, CENT, rounding)
+
+
+def line_cents(quantity, unit_price, rounding=HALF_UP):
+    """quantity x unit_price in cents, rounded once."""
+    if quantity == 1:
+        return to_cents(unit_price, rounding)
+    n = round(quantity * QTY_SCALE) * round(unit_price * PRICE_SCALE)
+    if n >= 0 and rounding == HALF_UP:
+        return (n + _LINE_HALF) // _LINE_DIVISOR
+    return round_div(n, _LINE_DIVISOR, rounding)
+
+
+def percent_of(cents, rate, rounding=HALF_UP):
+    """rate percent of an amount in cents, rounded to cents."""
+    if not rate or not cents:
+        return 0
+    n = cents * round(rate * RATE_SCALE)
+    if n >= 0 and rounding == HALF_UP:
+        return (n + _PERCENT_HALF) // _PERCENT_DIVISOR
+    return round_div(n, _PERCENT_DIVISOR, rounding)
+
+
+_LINE_DIVISOR = QTY_SCALE * CENT
+_LINE_HALF = _LINE_DIVISOR // 2
+_PERCENT_DIVISOR = 100 * RATE_SCALE
+_PERCENT_HALF = _PERCENT_DIVISOR // 2
+
+
+def dollars(cents):
+    """Cents as a float for display and storage; exact to the cent."""
+    return cents / 100
+
+
+def format_cents(cents, symbol="$", grouping=False):
+    """Cents as "$12.34" ("-$12.34" below zero), without going through a float.
+
+    symbol="" gives the bare "12.34" a CSV column wants; grouping gives "$1,234.56".
+    """
+    whole, part = divmod(abs(cents), 100)
+    whole = f"{whole:,}" if grouping else str(whole)
+    return f"{'-' if cents < 0 else ''}{symbol}{whole}.{part:02d}"
+
+
+def format_dollars(value):
+    """A dollar amount or rate from a form, rounded to cents as to_cents() prices it."""
+    return format_cents(to_cents(value))
+
+
+@dataclass(frozen=True)
+class TaxRule:
+    """How a jurisdiction taxes a quote.
+
+    taxable lists the LINE_KINDS the tax applies to. With per_line the
+    discount and tax are rounded on every line and summed; otherwise they
+    are computed once on the totals. Line amounts themselves always round
+    HALF_UP to cents; rounding applies to the discount and the tax.
+    """
+
+    name: str
+    taxable: frozenset = frozenset(LINE_KINDS)
+    per_line: bool = False
+    rounding: str = HALF_UP
+
+    def __post_init__(self):
+        unknown = set(self.taxable) - set(LINE_KINDS)
+        if unknown:
+            raise ValueError(f"Unknown line kinds: {', '.join(sorted(unknown))}")
+        if self.rounding not in ROUNDING_MODES:
+            raise ValueError(f"Unknown rounding mode: {self.rounding!r}")
+        object.__setattr__(self, "taxable", frozenset(self.taxable))
+
+    @property
+    def taxes_everything(self):
+        return len(self.taxable) == len(LINE_KINDS)
+
+
+TAX_RULES = {}
+# Names rules were registered under before a rename, so stored quotes still price
+_RENAMED_RULES = {"materials_only": "materials_and_addons"}
+
+
+def register_tax_rule(rule):
+    """Make rule available to quotes by name (QuoteInput.tax_rule)."""
+    TAX_RULES[rule.name] = rule
+    return rule
+
+
+def tax_rule(name):
+    try:
+        return TAX_RULES[_RENAMED_RULES.get(name, name) or "default"]
+    except KeyError:
+        raise ValueError(f"Unknown tax rule: {name!r}") from None
+
+
+register_tax_rule(TaxRule("default"))
+register_tax_rule(TaxRule("per_line", per_line=True))
+register_tax_rule(TaxRule("labor_exempt", taxable=frozenset(LINE_KINDS) - {"labor"}))
+register_tax_rule(TaxRule("materials_and_addons", taxable=frozenset({"materials", "addons"})))
@@ -0,0 +1,111 @@
+"""Job packets: a client's intake and quote laid out as one PDF.
+
+The intake summary, its photos and the priced quote are drawn into a single
+document in one pass. Each part looks as it does on its own, but the
+fonts are embedded once for the whole packet, and there is no second
+document to serialise and merge.
+
+    python packet_pdf.py 12 40 packet.pdf      # stored intake 12, quote 40
+"""
+
+import argparse
+
+from intake_pdf import PDF, DocumentStats, draw_intake, draw_revu_intake
+from metrics import count, stage
+from pdf_fonts import Document
+from pdf_render import pdf_to_bytes
+from quote_engine import calculate_quote
+from quote_pdf import draw_cravix_quote, draw_quote
+
+
+class PacketPDF(PDF):
+    """Intake pages keep the intake header and footer; quote pages draw their own."""
+
+    part = "intake"
+    _next_part = "intake"
+
+    def start(self, part):
+        """Begin part ("intake" or "quote") on a new page."""
+        # The footer of the page being closed still belongs to the old part
+        self._next_part = part
+        self.add_page()
+
+    def header(self):
+        self.part = self._next_part
+        if self.part == "intake":
+            super().header()
+
+    def footer(self):
+        if self.part == "intake":
+            super().footer()
+
+
+def _new_part(pdf):
+    # add_page() carries the font and colours over to the next page; a part
+    # starts from FPDF's initial state instead, as it would on its own
+    pdf.font_family = ""
+    pdf.draw_color = "0 G"
+    pdf.fill_color = pdf.text_color = "0 g"
+    pdf.color_flag = 0
+
+
+def build_packet_pdf(intake, quote, result=None, stats=None, style="cravix"):
+    """Return one FPDF document with the intake, its photos and the quote, pricing it if needed."""
+    if result is None:
+        result = calculate_quote(quote)
+    with stage("build_pdf", kind="packet", style=style):
+        if style == "revu":
+            pdf = Document.for_text(intake, quote)
+            pdf.add_page()
+            draw_revu_intake(pdf, intake)
+            _new_part(pdf)
+            pdf.add_page()
+            draw_quote(pdf, quote, result)
+        else:
+            pdf = PacketPDF.for_text(intake, quote)
+            if stats is not None:
+                stats.photos_total = len(intake.photos)
+                pdf.stats = stats
+            pdf.start("intake")
+            draw_intake(pdf, intake, stats)
+            _new_part(pdf)
+            pdf.start("quote")
+            draw_cravix_quote(pdf, quote, result)
+    if stats is not None:
+        stats.pages = pdf.page
+    count("documents_total", kind="packet", style=style)
+    count("pages_total", pdf.page, kind="packet", style=style)
+    return pdf
+
+
+def render_packet_pdf(intake, quote, result=None, stats=None, style="cravix"):
+    """Return the finished packet PDF as bytes, filling in stats if given."""
+    data = pdf_to_bytes(build_packet_pdf(intake, quote, result, stats, style))
+    if stats is not None:
+        stats.output_bytes = len(data)
+    return data
+
+
+def main(argv=None):
+    from quote_store import QuoteStore
+
+    parser = argparse.ArgumentParser(description="Write a stored intake and quote as one PDF.")
+    parser.add_argument("intake", type=int, help="stored intake id")
+    parser.add_argument("quote", type=int, help="stored quote id")
+    parser.add_argument("output")
+    parser.add_argument("--db", help="database file (default $REVU_DB_PATH or revu.db)")
+    parser.add_argument("--style", choices=("cravix", "revu"), help="layout (default: the app that took the intake)")
+    args = parser.parse_args(argv)
+
+    store = QuoteStore(args.db)
+    intake, app = store.get_intake(args.intake)
+    quote, _ = store.get_quote(args.quote)
+    stats = DocumentStats()
+    data = render_packet_pdf(intake, quote, stats=stats, style=args.style or app)
+    with open(args.output, "wb") as f:
+        f.write(data)
+    print(f"Wrote {args.output}: {stats.pages} pages, {len(data) / 1e3:.0f} KB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+"""Content-addressed cache for rendered PDFs.
+
+Entries are keyed by stable_key(), a SHA-256 of the normalised inputs a
+document is rendered from, so a rerun with unchanged inputs gets the same
+bytes back without touching FPDF. The in-memory tier is an LRU bounded by
+total bytes; an optional directory tier keeps PDFs across restarts. The
+directory tier files PDFs under a fingerprint of the layout modules and the
+font settings, so an upgrade that changes how documents look never serves
+a PDF rendered before it.
+"""
+
+import dataclasses
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from datetime import date
+
+DEFAULT_MAX_BYTES = 64 * 2**20
+
+# Part of every stable_key. quote_store also keys stored inputs by it, so
+# bumping this re-keys those too; layout changes are covered by
+# LAYOUT_FINGERPRINT instead
+LAYOUT_VERSION = 1
+
+# Modules whose code decides the bytes of a rendered PDF
+_LAYOUT_MODULES = (
+    "image_header.py", "image_pipeline.py", "intake_pdf.py", "money.py", "packet_pdf.py", "pdf_fonts.py",
+    "pdf_layout.py", "pdf_render.py", "pdf_table.py", "photo_store.py", "quote_engine.py", "quote_pdf.py",
+    "text_metrics.py",
+)
+
+
+def source_fingerprint(modules, env_prefix=None):
+    """Short hex digest of the named app modules' source, plus any env_prefix* settings."""
+    digest = hashlib.sha256()
+    here = os.path.dirname(os.path.abspath(__file__))
+    for name in modules:
+        try:
+            with open(os.path.join(here, name), "rb") as f:
+                digest.update(name.encode() + b"\0" + f.read())
+        except OSError:
+            digest.update(name.encode() + b"\0missing")
+    if env_prefix:
+        for name, value in sorted(os.environ.items()):
+            if name.startswith(env_prefix):
+                digest.update(f"{name}={value}".encode())
+    return digest.hexdigest()[:16]
+
+
+def _layout_fingerprint():
+    return source_fingerprint(_LAYOUT_MODULES, "REVU_FONT")
+
+
+LAYOUT_FINGERPRINT = _layout_fingerprint()
+
+
+def _normalise(value):
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        return {f.name: _normalise(getattr(value, f.name)) for f in dataclasses.fields(value)}
+    if isinstance(value, dict):
+        return {str(k): _normalise(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_normalise(v) for v in value]
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, float):
+        # repr round-trips exactly, so 0.1 + 0.2 and 0.3 stay different keys
+        return repr(value)
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return "sha256:" + hashlib.sha256(value).hexdigest()
+    if hasattr(value, "getbuffer"):
+        # Uploaded files are hashed by content, not by name or identity
+        with value.getbuffer() as view:
+            return "sha256:" + hashlib.sha256(view).hexdigest()
+    if value is None or isinstance(value, (str, int, bool)):
+        return value
+    raise TypeError(f"Cannot build a cache key from {type(value).__name__}")
+
+
+def stable_key(*parts):
+    """Hex digest identifying a document rendered from parts."""
+    payload = json.dumps([LAYOUT_VERSION, _normalise(parts)], sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class PdfCache:
+    """LRU of PDF bytes bounded by max_bytes, backed by disk_dir if given. Thread-safe."""
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, disk_dir=None):
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def size(self):
+        return self._size
+
+    def get(self, key):
+        """Cached bytes for key, or None."""
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return data
+        data = self._read_disk(key)
+        with self._lock:
+            if data is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._remember(key, data)
+        return data
+
+    def put(self, key, data):
+        data = bytes(data)
+        with self._lock:
+            self._remember(key, data)
+        self._write_disk(key, data)
+
+    def get_or_render(self, key, render):
+        """Cached bytes for key, calling render() to produce and store them on a miss."""
+        data = self.get(key)
+        if data is None:
+            data = render()
+            self.put(key, data)
+        return data
+
+    def clear(self):
+        """Drop the in-memory tier and reset the counters; files on disk are kept."""
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+            self.hits = self.disk_hits = self.misses = 0
+
+    def stats(self):
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._size,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+        }
+
+    def _remember(self, key, data):
+        # Caller holds the lock. A document bigger than the whole budget is
+        # still served from disk, just never kept in memory
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._size -= len(old)
+        if len(data) > self.max_bytes:
+            return
+        self._entries[key] = data
+        self._size += len(data)
+        while self._size > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._size -= len(evicted)
+
+    def _path(self, key):
+        # PDFs from an older layout sit in another directory and are never read
+        return os.path.join(self.disk_dir, LAYOUT_FINGERPRINT, key[:2], key + ".pdf")
+
+    def _read_disk(self, key):
+        if not self.disk_dir:
+            return None
+        try:
+            with open(self._path(key), "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _write_disk(self, key, data):
+        if not self.disk_dir:
+            return
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write then rename, so a reader never sees half a PDF
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except OSError:
+            # The disk tier is best effort; the PDF is still cached in memory
+            pass
+
+
+PDF_CACHE = PdfCache(
+    max_bytes=int(os.environ.get("REVU_PDF_CACHE_MB", DEFAULT_MAX_BYTES // 2**20)) * 2**20,
+    disk_dir=os.environ.get("REVU_PDF_CACHE_DIR") or None,
+)
@@ -0,0 +1,321 @@
+"""Export stored quote and intake PDFs into one zip or tar archive, in flat memory.
+
+Documents are listed from the store a page of ids at a time, rendered on
+demand (across a process pool unless workers is 0) and written to the
+archive one by one, so memory does not grow with the number of documents.
+At most `window` rendered PDFs wait for the archive at any time: when the
+archive's destination falls behind, rendering and listing wait for it.
+
+Every document written is appended to a checkpoint log next to the
+archive. Running the same export again with --resume cuts the archive back
+to the last logged document and carries on after it. The log is removed
+once the archive is finished with its manifest.csv.
+
+    python pdf_export.py month.zip --since 2026-09-01 --until 2026-09-30
+    python pdf_export.py month.tar --since 2026-09-01 --workers 4 --resume
+    python pdf_export.py - --format tar | ssh backup 'cat > month.tar'
+"""
+
+import argparse
+import csv
+import io
+import json
+import os
+import re
+import shutil
+import sys
+import tarfile
+import tempfile
+import time
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import date
+
+from metrics import count, stage
+from money import format_cents
+from quote_store import QuoteStore
+
+KINDS = ("quote", "intake")
+FORMATS = ("zip", "tar")
+MANIFEST = "manifest.csv"
+
+
+@dataclass(frozen=True, slots=True)
+class ExportDocument:
+    kind: str
+    id: int
+    client_name: str
+    date: str
+    total_cents: int = None
+
+    @property
+    def file_name(self):
+        client = re.sub(r"[^A-Za-z0-9_-]+", "_", self.client_name or "client").strip("_") or "client"
+        return f"{self.kind}s/{self.id:06d}_{client}_{self.kind}.pdf"
+
+
+@dataclass
+class ExportReport:
+    documents: int
+    bytes: int
+    seconds: float
+    resumed: int = 0    # documents already in the archive from an interrupted run
+
+    @property
+    def documents_per_second(self):
+        return self.documents / self.seconds if self.seconds else 0.0
+
+
+def iter_documents(store, since=None, until=None, after=None):
+    """Yield every matching quote, then every intake, in id order.
+
+    after=(kind, id) starts just past that document, as a resume does.
+    """
+    first = KINDS.index(after[0]) if after else 0
+    for kind in KINDS[first:]:
+        start = after[1] if after and kind == after[0] else 0
+        for row in store.document_rows(kind, since, until, after=start):
+            yield ExportDocument(kind, *row)
+
+
+# Rendering
+_worker_store = None
+
+
+def _open_worker_store(path):
+    global _worker_store
+    _worker_store = QuoteStore(path)
+
+
+def _render(kind, document_id, store=None):
+    store = store or _worker_store
+    return store.render_quote(document_id) if kind == "quote" else store.render_intake(document_id)
+
+
+def render_documents(documents, store, workers=None, window=16):
+    """Yield (document, PDF bytes) in the order of documents, rendering lazily.
+
+    workers=0 renders in this process; otherwise a pool of that many
+    processes (default: CPU count) renders at most window documents ahead
+    of the consumer.
+    """
+    if workers == 0:
+        for document in documents:
+            yield document, _render(document.kind, document.id, store)
+        return
+    with ProcessPoolExecutor(workers, initializer=_open_worker_store, initargs=(store.path,)) as pool:
+        pending = deque()
+        for document in documents:
+            if len(pending) >= window:
+                done, future = pending.popleft()
+                yield done, future.result()
+            pending.append((document, pool.submit(_render, document.kind, document.id)))
+        while pending:
+            done, future = pending.popleft()
+            yield done, future.result()
+
+
+# Archives
+def _zip_info(name, date_time):
+    info = zipfile.ZipInfo(name, tuple(date_time))
+    info.compress_type = zipfile.ZIP_STORED
+    info.external_attr = 0o644 << 16
+    return info
+
+
+class _ZipArchive:
+    # PDF streams are already deflated, so members are stored as they are
+
+    def __init__(self, fileobj, members=()):
+        self.archive = zipfile.ZipFile(fileobj, "w", zipfile.ZIP_STORED)
+        # Members kept from an interrupted run go back into the central
+        # directory, which is only written on close
+        for member in members:
+            info = _zip_info(member["name"], member["date_time"])
+            info.header_offset = member["header_offset"]
+            info.CRC = member["crc"]
+            info.file_size = info.compress_size = member["bytes"]
+            self.archive.filelist.append(info)
+            self.archive.NameToInfo[info.filename] = info
+
+    def add(self, name, data):
+        """Write one member; returns what a resume needs to list it again."""
+        info = _zip_info(name, time.localtime()[:6])
+        self.archive.writestr(info, data)
+        return {"date_time": info.date_time, "header_offset": info.header_offset, "crc": info.CRC}
+
+    def add_file(self, name, fileobj, size):
+        with self.archive.open(_zip_info(name, time.localtime()[:6]), "w") as out:
+            shutil.copyfileobj(fileobj, out)
+
+    def close(self):
+        self.archive.close()
+
+
+class _TarArchive:
+    def __init__(self, fileobj, stream=False):
+        # Writing starts at fileobj's position, which is how a resume appends
+        self.archive = tarfile.open(fileobj=fileobj, mode="w|" if stream else "w")
+
+    def _info(self, name, size):
+        info = tarfile.TarInfo(name)
+        info.size = size
+        info.mtime = time.time()
+        info.mode = 0o644
+        return info
+
+    def add(self, name, data):
+        self.archive.addfile(self._info(name, len(data)), io.BytesIO(data))
+        # TarFile remembers every member it wrote; nothing here reads them back
+        self.archive.members.clear()
+        return {}
+
+    def add_file(self, name, fileobj, size):
+        self.archive.addfile(self._info(name, size), fileobj)
+
+    def close(self):
+        self.archive.close()
+
+
+# Checkpoint log: one JSON object per document written, in archive order
+def _read_checkpoint(path, archive_size, keep):
+    """(last entry, entry count, log length, entries if keep) for the usable prefix of a log.
+
+    A torn last line, or entries past the end of the archive, end the prefix.
+    """
+    last, entries, written, length = None, [], 0, 0
+    with open(path, "rb") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                break
+            if not line.endswith(b"\n") or entry["offset"] > archive_size:
+                break
+            last = entry
+            written += 1
+            length += len(line)
+            if keep:
+                entries.append(entry)
+    return last, written, length, entries
+
+
+def _write_manifest(checkpoint, out):
+    writer = csv.writer(out)
+    writer.writerow(["kind", "id", "file", "client_name", "date", "total_due", "bytes"])
+    with open(checkpoint, encoding="utf-8") as log:
+        for line in log:
+            entry = json.loads(line)
+            total = "" if entry["total_cents"] is None else format_cents(entry["total_cents"], symbol="")
+            writer.writerow([entry["kind"], entry["id"], entry["name"], entry["client_name"], entry["date"],
+                             total, entry["bytes"]])
+
+
+def export_documents(output, store=None, since=None, until=None, archive_format=None, workers=None, window=16,
+                     resume=False, sync_every=100):
+    """Write every stored quote and intake PDF in the date range to one archive.
+
+    output is a .zip or .tar path, or "-" for stdout (archive_format
+    required, no resume). With resume, an archive left by an interrupted
+    export with the same arguments is continued rather than started again.
+    A zip keeps one directory entry per document in memory until it is
+    closed, as the format requires; a tar keeps nothing.
+    """
+    store = store or QuoteStore()
+    archive_format = archive_format or ("tar" if output.lower().endswith(".tar") else "zip")
+    if archive_format not in FORMATS:
+        raise ValueError(f"Unknown archive format: {archive_format!r}")
+    streaming = output == "-"
+    if streaming and resume:
+        raise ValueError("An export to stdout cannot be resumed")
+
+    if streaming:
+        fd, checkpoint = tempfile.mkstemp(suffix=".checkpoint")
+        os.close(fd)
+    else:
+        checkpoint = output + ".checkpoint"
+    after, members, resumed = None, [], 0
+    if resume and os.path.exists(checkpoint) and os.path.exists(output):
+        last, resumed, length, members = _read_checkpoint(checkpoint, os.path.getsize(output),
+                                                          keep=archive_format == "zip")
+        if last is not None:
+            after = (last["kind"], last["id"])
+        with open(checkpoint, "r+b") as log:
+            log.truncate(length)
+        fileobj = open(output, "r+b")
+        fileobj.truncate(last["offset"] if last else 0)
+        fileobj.seek(0, os.SEEK_END)
+    else:
+        open(checkpoint, "wb").close()
+        fileobj = sys.stdout.buffer if streaming else open(output, "wb")
+
+    if archive_format == "zip":
+        archive = _ZipArchive(fileobj, members)
+    else:
+        archive = _TarArchive(fileobj, stream=streaming)
+
+    written = size = 0
+    start = time.perf_counter()
+    try:
+        with open(checkpoint, "a", encoding="utf-8") as log:
+            documents = iter_documents(store, since, until, after)
+            for document, data in render_documents(documents, store, workers, window):
+                with stage("export_write", format=archive_format):
+                    member = archive.add(document.file_name, data)
+                    fileobj.flush()
+                entry = {"kind": document.kind, "id": document.id, "name": document.file_name,
+                         "client_name": document.client_name, "date": document.date,
+                         "total_cents": document.total_cents, "bytes": len(data),
+                         "offset": 0 if streaming else fileobj.tell(), **member}
+                log.write(json.dumps(entry, separators=(",", ":")) + "\n")
+                log.flush()
+                written += 1
+                size += len(data)
+                count("export_documents_total", kind=document.kind, format=archive_format)
+                count("export_bytes_total", len(data), format=archive_format)
+                if not streaming and written % sync_every == 0:
+                    # Archive first, so a synced log never points past synced data
+                    os.fsync(fileobj.fileno())
+                    os.fsync(log.fileno())
+
+        # Built from the log, so it lists documents written before a resume too
+        with tempfile.TemporaryFile("w+", encoding="utf-8", newline="") as manifest:
+            _write_manifest(checkpoint, manifest)
+            manifest.flush()
+            raw = manifest.buffer
+            length = raw.seek(0, os.SEEK_END)
+            raw.seek(0)
+            archive.add_file(MANIFEST, raw, length)
+        archive.close()
+    finally:
+        if not streaming:
+            fileobj.close()
+    os.remove(checkpoint)
+    return ExportReport(documents=written, bytes=size, seconds=time.perf_counter() - start, resumed=resumed)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export stored quote and intake PDFs to a zip or tar archive.")
+    parser.add_argument("output", help="archive path (.zip or .tar), or - for stdout")
+    parser.add_argument("--db", help="database file (default $REVU_DB_PATH or revu.db)")
+    parser.add_argument("--since", type=date.fromisoformat, help="first quote or preferred date to include")
+    parser.add_argument("--until", type=date.fromisoformat, help="last quote or preferred date to include")
+    parser.add_argument("--format", choices=FORMATS, help="archive format (default: from the file name)")
+    parser.add_argument("--workers", type=int, default=None, help="render processes, 0 for none (default: CPU count)")
+    parser.add_argument("--window", type=int, default=16, help="rendered documents allowed to wait for the archive")
+    parser.add_argument("--resume", action="store_true", help="continue an interrupted export of the same archive")
+    args = parser.parse_args(argv)
+    if args.output == "-" and not args.format:
+        parser.error("--format is required when writing to stdout")
+
+    report = export_documents(args.output, QuoteStore(args.db), args.since, args.until, args.format,
+                              args.workers, args.window, args.resume)
+    resumed = f", {report.resumed} kept from the interrupted run" if report.resumed else ""
+    print(f"Exported {report.documents} documents ({report.bytes / 2**20:.1f} MB) in {report.seconds:.2f}s "
+          f"({report.documents_per_second:.1f}/s){resumed}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
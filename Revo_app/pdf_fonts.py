@@ -0,0 +1,479 @@
+"""Unicode fonts for our PDFs, parsed once and embedded as per-document subsets.
+
+FPDF's core Arial only has Latin-1 glyphs, so names such as "Zoë Łukasiewicz"
+or "Nguyễn Văn An" cannot be written with it. Layouts use the SANS family
+instead. A Document made with unicode=True resolves SANS to a TrueType face
+(DejaVu Sans unless REVU_FONT points elsewhere) and embeds only the glyphs
+it drew; otherwise SANS is core Arial and nothing is embedded. for_text()
+picks the cheaper of the two for a document's inputs, so Latin-1 documents
+stay as small as they were.
+
+Faces are parsed once per process and shared by every document. The
+subset for one set of glyphs is built, trimmed and compressed once, and
+reused while it stays in the cache, so a repeat document costs no more to
+write than a Latin-1 one.
+
+    REVU_FONT=/fonts/Sans.ttf        regular face; -Bold, -Oblique and
+                                     -BoldOblique files next to it are used too
+    REVU_FONT_BOLD=/fonts/SansB.ttf  faces can also be named one by one
+    REVU_FONT=core                   always core Arial; other text shows as "?"
+    REVU_FONT_EMBED=always           the TrueType face for every document
+
+    python pdf_fonts.py "Zoë Łukasiewicz"     show the faces and what a subset costs
+"""
+
+import argparse
+import dataclasses
+import hashlib
+import os
+import re
+import struct
+import threading
+import time
+import warnings
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from fpdf import FPDF
+from fpdf.ttfonts import TTFontFile
+
+from metrics import count
+from text_metrics import font_metrics
+
+SANS = "Sans"
+FONT_DIRS = ("/usr/share/fonts/truetype/dejavu", "/usr/share/fonts/dejavu", "/usr/share/fonts/TTF",
+             "/usr/local/share/fonts", os.path.expanduser("~/.fonts"))
+DEFAULT_FONT = "DejaVuSans.ttf"
+DEFAULT_SUBSETS = 256
+
+# Style letters, the file suffix of the matching face and the variable naming it
+_FACES = {"": ("", "REVU_FONT"), "B": ("-Bold", "REVU_FONT_BOLD"), "I": ("-Oblique", "REVU_FONT_ITALIC"),
+          "BI": ("-BoldOblique", "REVU_FONT_BOLD_ITALIC")}
+# Name records kept in subsets: family, subfamily, unique id, full name,
+# version and PostScript name. The rest (licence text mostly) is about half
+# of a typical subset and no viewer reads it
+_NAME_IDS = frozenset((1, 2, 3, 4, 5, 6))
+# TrueType hinting. Viewers scale glyphs their own way, and the bytecode
+# (these tables plus instructions in every glyph) is over half a subset
+_HINTING = ("cvt ", "fpgm", "prep")
+_OUTSIDE_BMP = re.compile("[\U00010000-\U0010ffff]")
+# Character codes are Unicode code points, so text maps back one to one
+_TO_UNICODE = zlib.compress(
+    b"/CIDInit /ProcSet findresource begin\n12 dict begin\nbegincmap\n"
+    b"/CIDSystemInfo\n<</Registry (Adobe)\n/Ordering (UCS)\n/Supplement 0\n>> def\n"
+    b"/CMapName /Adobe-Identity-UCS def\n/CMapType 2 def\n"
+    b"1 begincodespacerange\n<0000> <FFFF>\nendcodespacerange\n"
+    b"1 beginbfrange\n<0000> <FFFF> <0000>\nendbfrange\n"
+    b"endcmap\nCMapName currentdict /CMap defineresource pop\nend\nend", 9)
+
+# makeSubset() cannot pack the cmap delta of code points far above their
+# glyph ids (U+FFFD, for one) and says so on every subset. Only the font's
+# own cmap is affected; PDF text goes through the CIDToGIDMap instead
+warnings.filterwarnings("ignore", "cmap value too big/small", UserWarning, "fpdf.ttfonts")
+
+
+def find_faces(environ=os.environ):
+    """{style: TrueType file} for the SANS family, or {} for core Arial.
+
+    Styles without a face of their own use the regular (or bold) one.
+    """
+    regular = environ.get("REVU_FONT")
+    if regular == "core":
+        return {}
+    if not regular:
+        found = [os.path.join(folder, DEFAULT_FONT) for folder in FONT_DIRS]
+        regular = next((path for path in found if os.path.isfile(path)), None)
+        if regular is None:
+            return {}
+    elif not os.path.isfile(regular):
+        raise ValueError(f"REVU_FONT {regular!r} is not a file")
+    stem, ext = os.path.splitext(regular)
+    faces = {}
+    for style, (suffix, variable) in _FACES.items():
+        path = environ.get(variable) or stem + suffix + ext
+        if os.path.isfile(path):
+            faces[style] = path
+    faces.setdefault("B", faces[""])
+    faces.setdefault("I", faces[""])
+    faces.setdefault("BI", faces["B"])
+    return faces
+
+
+def needs_unicode(*values):
+    """True if any text in values (strings, dataclasses, lists of them) is outside Latin-1."""
+    for value in values:
+        if isinstance(value, str):
+            if not value.isascii():
+                try:
+                    value.encode("latin-1")
+                except UnicodeEncodeError:
+                    return True
+        elif dataclasses.is_dataclass(value) and not isinstance(value, type):
+            if needs_unicode(*(getattr(value, f.name) for f in dataclasses.fields(value))):
+                return True
+        elif isinstance(value, (list, tuple)):
+            if needs_unicode(*value):
+                return True
+    return False
+
+
+@dataclass(frozen=True, slots=True)
+class FontSubset:
+    """One face cut down to a set of code points, ready to embed."""
+
+    tag: str            # six letters that tell subsets of a face apart
+    widths: str         # the CIDFont /W array
+    cid_to_gid: bytes   # compressed CIDToGIDMap
+    font_file: bytes    # compressed TrueType subset
+    length1: int        # its uncompressed size
+
+
+class _Subsetter(TTFontFile):
+    """TTFontFile that keeps the tables it parses in `tables`, shared by every subset of one file."""
+
+    def __init__(self, tables):
+        super().__init__()
+        self._tables = tables
+
+    def _cmap(self, parse, offset, glyphToChar, charToGlyph):
+        cached = self._tables.get(("cmap", offset))
+        if cached is None:
+            parse(offset, glyphToChar, charToGlyph)
+            cached = self._tables[("cmap", offset)] = (dict(glyphToChar), dict(charToGlyph), self.maxUniChar)
+        else:
+            glyphToChar.update(cached[0])
+            charToGlyph.update(cached[1])
+            self.maxUniChar = cached[2]
+
+    def getCMAP4(self, unicode_cmap_offset, glyphToChar, charToGlyph):
+        self._cmap(super().getCMAP4, unicode_cmap_offset, glyphToChar, charToGlyph)
+
+    def getCMAP12(self, unicode_cmap_offset, glyphToChar, charToGlyph):
+        self._cmap(super().getCMAP12, unicode_cmap_offset, glyphToChar, charToGlyph)
+
+    def getHMTX(self, numberOfHMetrics, numGlyphs, glyphToChar, scale):
+        cached = self._tables.get(("hmtx", scale))
+        if cached is None:
+            super().getHMTX(numberOfHMetrics, numGlyphs, glyphToChar, scale)
+            cached = self._tables[("hmtx", scale)] = (self.charWidths, self.defaultWidth)
+        self.charWidths, self.defaultWidth = cached
+
+    def getLOCA(self, indexToLocFormat, numGlyphs):
+        cached = self._tables.get("loca")
+        if cached is None:
+            super().getLOCA(indexToLocFormat, numGlyphs)
+            cached = self._tables["loca"] = self.glyphPos
+        self.glyphPos = cached
+
+    def add(self, tag, data):
+        if tag == "name":
+            data = _short_names(data)
+        if tag not in _HINTING:
+            super().add(tag, data)
+
+    def endTTFile(self, stm):
+        for tag, data in _without_instructions(self.otables).items():
+            self.add(tag, data)
+        return super().endTTFile(stm)
+
+
+def _short_names(data):
+    # Rebuild a name table with only the records in _NAME_IDS
+    _, total, strings = struct.unpack_from(">HHH", data)
+    records, text = [], b""
+    for i in range(total):
+        platform, encoding, language, name_id, length, offset = struct.unpack_from(">6H", data, 6 + 12 * i)
+        if name_id in _NAME_IDS:
+            records.append((platform, encoding, language, name_id, length, len(text)))
+            text += data[strings + offset:strings + offset + length]
+    head = struct.pack(">HHH", 0, len(records), 6 + 12 * len(records))
+    return head + b"".join(struct.pack(">6H", *record) for record in records) + text
+
+
+def _without_instructions(tables):
+    # glyf, loca, head and maxp of a subset with every glyph's instructions cut out
+    head, glyf, loca = tables["head"], tables["glyf"], tables["loca"]
+    if struct.unpack_from(">h", head, 50)[0]:
+        offsets = struct.unpack(f">{len(loca) // 4}L", loca)
+    else:
+        offsets = [2 * offset for offset in struct.unpack(f">{len(loca) // 2}H", loca)]
+    out = bytearray()
+    starts = [0]
+    for start, end in zip(offsets, offsets[1:]):
+        out += _strip_glyph(glyf[start:end])
+        out += bytes(-len(out) % 4)
+        starts.append(len(out))
+    long_loca = starts[-1] > 2 * 0xFFFF
+    if long_loca:
+        loca = struct.pack(f">{len(starts)}L", *starts)
+    else:
+        loca = struct.pack(f">{len(starts)}H", *(start // 2 for start in starts))
+    maxp = tables["maxp"]
+    if len(maxp) >= 28:  # version 1.0: maxSizeOfInstructions
+        maxp = maxp[:26] + bytes(2) + maxp[28:]
+    return {"glyf": bytes(out), "loca": loca, "head": head[:50] + struct.pack(">h", long_loca) + head[52:],
+            "maxp": maxp}
+
+
+def _strip_glyph(data):
+    if len(data) < 10:
+        return data
+    contours = struct.unpack_from(">h", data)[0]
+    if contours >= 0:
+        # Simple glyph: end points, then the instruction length and bytes
+        at = 10 + 2 * contours
+        (length,) = struct.unpack_from(">H", data, at)
+        return data[:at] + bytes(2) + data[at + 2 + length:]
+    # Composite: components run until one lacks MORE_COMPONENTS; the last one
+    # may carry WE_HAVE_INSTRUCTIONS, with the instructions after it
+    at = 10
+    while True:
+        last = at
+        (flags,) = struct.unpack_from(">H", data, at)
+        at += 4 + (4 if flags & 0x0001 else 2)
+        at += 2 if flags & 0x0008 else 4 if flags & 0x0040 else 8 if flags & 0x0080 else 0
+        if not flags & 0x0020:
+            break
+    return data[:last] + struct.pack(">H", flags & ~0x0100) + data[last + 2:at]
+
+
+def _widths(cw, codes):
+    # Consecutive codes share one run: /W [32 [318 401] 65 [684]]
+    runs = []
+    for code in codes:
+        width = cw[code] if code < len(cw) else 0
+        if width == 65535:  # TTFontFile's marker for zero width
+            width = 0
+        if runs and code == runs[-1][0] + len(runs[-1][1]):
+            runs[-1][1].append(width)
+        else:
+            runs.append((code, [width]))
+    return "/W [" + " ".join(f"{start} [{' '.join(map(str, widths))}]" for start, widths in runs) + "]"
+
+
+class FontCache:
+    """Parsed faces and finished subsets, shared by every Document. Thread-safe."""
+
+    def __init__(self, faces, max_subsets=DEFAULT_SUBSETS, embed="auto"):
+        self.faces = dict(faces)
+        # Styles sharing a file (italic without a face of its own) are drawn
+        # as the first style using it, so the file is embedded once
+        self.styles = {style: next(s for s in self.faces if self.faces[s] == path)
+                       for style, path in self.faces.items()}
+        self.max_subsets = max_subsets
+        self.embed = embed
+        self.hits = self.misses = 0
+        self._fonts = {}
+        self._tables = {}
+        self._subsets = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        size = os.environ.get("REVU_FONT_SUBSETS")
+        return cls(find_faces(), int(size) if size else DEFAULT_SUBSETS, os.environ.get("REVU_FONT_EMBED") or "auto")
+
+    def font(self, style):
+        """FPDF font entry for one style of SANS; parsed on first use, then shared."""
+        path = self.faces[style]
+        with self._lock:
+            font = self._fonts.get(path)
+            if font is None:
+                font = self._fonts[path] = self._parse(path)
+        return font
+
+    def subset(self, font):
+        """The FontSubset for the glyphs a document drew with font."""
+        key = (font["ttffile"], frozenset(font["subset"]))
+        with self._lock:
+            subset = self._subsets.get(key)
+            if subset is not None:
+                self._subsets.move_to_end(key)
+                self.hits += 1
+            else:
+                self.misses += 1
+        count("font_subsets_total", result="miss" if subset is None else "hit")
+        if subset is None:
+            subset = self._build(font, key[1])
+            with self._lock:
+                self._subsets[key] = subset
+                while len(self._subsets) > self.max_subsets:
+                    self._subsets.popitem(last=False)
+        return subset
+
+    def stats(self):
+        with self._lock:
+            return {"faces": len(set(self.faces.values())), "parsed": len(self._fonts),
+                    "subsets": len(self._subsets), "hits": self.hits, "misses": self.misses}
+
+    def _tables_for(self, path):
+        with self._lock:
+            return self._tables.setdefault(path, {})
+
+    def _parse(self, path):
+        # Caller holds the lock. The same entry FPDF.add_font() builds, minus
+        # the per-document number and subset
+        ttf = _Subsetter(self._tables.setdefault(path, {}))
+        ttf.getMetrics(path)
+        return {
+            "type": "TTF",
+            "name": re.sub("[ ()]", "", ttf.fullName),
+            "desc": {
+                "Ascent": int(round(ttf.ascent)),
+                "Descent": int(round(ttf.descent)),
+                "CapHeight": int(round(ttf.capHeight)),
+                "Flags": ttf.flags,
+                "FontBBox": "[%d %d %d %d]" % tuple(int(round(v)) for v in ttf.bbox),
+                "ItalicAngle": int(ttf.italicAngle),
+                "StemV": int(round(ttf.stemV)),
+                "MissingWidth": int(round(ttf.defaultWidth)),
+            },
+            "up": round(ttf.underlinePosition),
+            "ut": round(ttf.underlineThickness),
+            "cw": ttf.charWidths,
+            "ttffile": path,
+            "originalsize": os.stat(path).st_size,
+        }
+
+    def _build(self, font, codes):
+        ttf = _Subsetter(self._tables_for(font["ttffile"]))
+        data = ttf.makeSubset(font["ttffile"], sorted(codes - {0}))
+        glyphs = ttf.codeToGlyph
+        cid_to_gid = bytearray(2 * 65536)
+        for code, glyph in glyphs.items():
+            if code < 65536:
+                struct.pack_into(">H", cid_to_gid, 2 * code, glyph)
+        digest = hashlib.sha1(repr(sorted(codes)).encode()).digest()
+        return FontSubset(
+            tag="".join(chr(65 + byte % 26) for byte in digest[:6]),
+            widths=_widths(font["cw"], sorted(glyphs)),
+            cid_to_gid=zlib.compress(cid_to_gid, 9),
+            font_file=zlib.compress(data, 9),
+            length1=len(data),
+        )
+
+
+FONTS = FontCache.from_env()
+
+
+class Document(FPDF):
+    """FPDF that knows the SANS family: a subset TrueType face with unicode=True, core Arial otherwise."""
+
+    def __init__(self, *args, unicode=False, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.unicode = bool(unicode and FONTS.faces)
+
+    @classmethod
+    def for_text(cls, *values, **kwargs):
+        """A document for laying out values, embedding a font only if their text needs one."""
+        return cls(unicode=FONTS.embed == "always" or needs_unicode(*values), **kwargs)
+
+    def set_font(self, family, style="", size=0):
+        if family.lower() == "sans":
+            if not self.unicode:
+                family = "Arial"
+            else:
+                style = style.upper()
+                face = FONTS.styles[("B" if "B" in style else "") + ("I" if "I" in style else "")]
+                style = face + ("U" if "U" in style else "")
+                if "sans" + face not in self.fonts:
+                    self.fonts["sans" + face] = dict(FONTS.font(face), i=len(self.fonts) + 1, fontkey="sans" + face,
+                                                     subset=list(range(32)), unifilename=None)
+        super().set_font(family, style, size)
+
+    def normalize_text(self, txt):
+        if not isinstance(txt, str) or txt.isascii():
+            return txt
+        if self.unifontsubset:
+            # Identity-H codes stop at U+FFFF
+            return _OUTSIDE_BMP.sub("\ufffd", txt)
+        return txt.encode("latin-1", "replace").decode("latin-1")
+
+    def get_string_width(self, s):
+        if not self.unifontsubset:
+            return super().get_string_width(s)
+        # multi_cell() measures Unicode text a character at a time; the
+        # shared per-font width tables make each call a dict lookup
+        if not s.isascii():
+            s = _OUTSIDE_BMP.sub("\ufffd", s)
+        return font_metrics(self).word_width(s) * self.font_size / 1000.0
+
+    # Output
+    def _putfonts(self):
+        if any(font["type"] not in ("core", "TTF") for font in self.fonts.values()):
+            return super()._putfonts()
+        for _, key in sorted((font["i"], key) for key, font in self.fonts.items()):
+            font = self.fonts[key]
+            font["n"] = self.n + 1
+            if font["type"] == "TTF":
+                self._put_subset(font, FONTS.subset(font))
+                continue
+            self._newobj()
+            self._out("<</Type /Font")
+            self._out("/BaseFont /" + font["name"])
+            self._out("/Subtype /Type1")
+            if font["name"] not in ("Symbol", "ZapfDingbats"):
+                self._out("/Encoding /WinAnsiEncoding")
+            self._out(">>")
+            self._out("endobj")
+
+    def _put_subset(self, font, subset):
+        # Type0 font, CIDFont, ToUnicode, CIDSystemInfo, descriptor,
+        # CIDToGIDMap and font file, in that order from font["n"]
+        n = font["n"]
+        name = f"{subset.tag}+{font['name']}"
+        desc = font["desc"]
+        self._newobj()
+        self._out(f"<</Type /Font /Subtype /Type0 /BaseFont /{name} /Encoding /Identity-H"
+                  f" /DescendantFonts [{n + 1} 0 R] /ToUnicode {n + 2} 0 R>>")
+        self._out("endobj")
+        self._newobj()
+        self._out(f"<</Type /Font /Subtype /CIDFontType2 /BaseFont /{name} /CIDSystemInfo {n + 3} 0 R"
+                  f" /FontDescriptor {n + 4} 0 R /DW {desc['MissingWidth']} {subset.widths}"
+                  f" /CIDToGIDMap {n + 5} 0 R>>")
+        self._out("endobj")
+        self._put_flate(_TO_UNICODE)
+        self._newobj()
+        self._out("<</Registry (Adobe) /Ordering (UCS) /Supplement 0>>")
+        self._out("endobj")
+        self._newobj()
+        # Non-symbolic, so viewers map text through the cmap we wrote
+        flags = (desc["Flags"] | 4) & ~32
+        self._out(f"<</Type /FontDescriptor /FontName /{name} /Ascent {desc['Ascent']} /Descent {desc['Descent']}"
+                  f" /CapHeight {desc['CapHeight']} /Flags {flags} /FontBBox {desc['FontBBox']}"
+                  f" /ItalicAngle {desc['ItalicAngle']} /StemV {desc['StemV']}"
+                  f" /MissingWidth {desc['MissingWidth']} /FontFile2 {n + 6} 0 R>>")
+        self._out("endobj")
+        self._put_flate(subset.cid_to_gid)
+        self._put_flate(subset.font_file, f" /Length1 {subset.length1}")
+
+    def _put_flate(self, data, extra=""):
+        self._newobj()
+        self._out(f"<</Length {len(data)} /Filter /FlateDecode{extra}>>")
+        self._putstream(data)
+        self._out("endobj")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Show the PDF font in use and what embedding it costs.")
+    parser.add_argument("text", nargs="?", default="Zoë Łukasiewicz, Nguyễn Văn An")
+    args = parser.parse_args(argv)
+    if not FONTS.faces:
+        print(f"{SANS} is core Arial: Latin-1 only, nothing embedded")
+        return
+    for style, path in sorted(FONTS.faces.items()):
+        print(f"{style or 'regular':8} {path}")
+    for attempt in ("first", "repeat"):
+        start = time.perf_counter()
+        pdf = Document.for_text(args.text)
+        pdf.add_page()
+        pdf.set_font(SANS, "", 12)
+        pdf.cell(0, 10, args.text)
+        data = pdf.output(dest="S")
+        print(f"{attempt}: {(time.perf_counter() - start) * 1e3:.1f} ms, {len(data) / 1e3:.1f} KB"
+              f"{'' if pdf.unicode else ' (core Arial)'}")
+
+
+if __name__ == "__main__":
+    main()
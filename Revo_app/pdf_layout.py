@@ -0,0 +1,360 @@
+"""Pre-compiled layout blocks for the static chrome of our PDFs.
+
+A BlockTemplate is a list of Style/Cell/Ln items describing part of a page,
+for example the services table header or the summary grid. The first time
+it is rendered it is drawn once on a scratch page and the PDF operators for
+everything static (borders, fills, fonts, fixed labels) are kept. Every
+later render pastes those operators at the current y position and only
+runs FPDF's cell() for the Cell items marked with a slot name.
+
+Blocks always start at the left margin and from FPDF's default colors, so
+they must set the font and any colors they rely on. They never split across
+pages; a block that does not fit moves to a new page as a whole, and the
+document is left with the block's final style selected. Unicode documents,
+where SANS is an embedded font, get their own compiled copy, and pasted
+text adds its glyphs to the document's font subsets.
+
+A SectionCache applies the same capture to whole sections of a document,
+dynamic text included: a section drawn again with the same inputs from the
+same position replays its recorded operators, across any pages it added,
+instead of being laid out again. Live previews use it to re-lay out only
+the sections an edit touched.
+"""
+
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+from pdf_fonts import Document
+
+_FONT_OP = re.compile(r"/F(\d+)( [\d.]+ Tf)")
+
+
+@dataclass(frozen=True)
+class Style:
+    font: tuple = None
+    fill_color: tuple = None
+    text_color: tuple = None
+    draw_color: tuple = None
+
+
+@dataclass(frozen=True)
+class Cell:
+    w: float
+    h: float
+    text: str = ""
+    border: object = 0
+    ln: int = 0
+    align: str = ""
+    fill: bool = False
+    slot: str = ""
+
+
+@dataclass(frozen=True)
+class Ln:
+    h: float = None
+
+
+@dataclass
+class _Slot:
+    name: str
+    x: float
+    dy: float
+    w: float
+    h: float
+    align: str
+    state: tuple
+
+
+@dataclass
+class _Compiled:
+    parts: list
+    fonts: list
+    slots: list
+    extent: float
+    end_x: float
+    end_dy: float
+    lasth: float
+    end_state: tuple
+    glyphs: dict
+    resolved: dict = field(default_factory=dict)
+
+
+def _geometry(pdf):
+    return (pdf.k, pdf.w, pdf.h, pdf.l_margin, pdf.r_margin, pdf.c_margin, getattr(pdf, "unicode", False))
+
+
+def _state(pdf):
+    font = (pdf.font_family, pdf.font_style + ("U" if pdf.underline else ""), pdf.font_size_pt)
+    return font, pdf.draw_color, pdf.fill_color, pdf.text_color
+
+
+def _font_keys(pdf, ops):
+    # Swap pdf's font numbers in ops for font keys, so the operators can be
+    # pasted into a document that numbers fonts differently
+    numbers = {font["i"]: key for key, font in pdf.fonts.items()}
+    parts = _FONT_OP.split(ops)
+    fonts = []
+    for i in range(1, len(parts), 3):
+        parts[i] = numbers[int(parts[i])]
+        if parts[i] not in fonts:
+            fonts.append(parts[i])
+    return parts, fonts
+
+
+_FONT_STATE = ("font_family", "font_style", "underline", "font_size_pt", "font_size", "current_font")
+
+
+def _register_fonts(pdf, fonts):
+    for key in fonts:
+        if key not in pdf.fonts:
+            # Register the font with pdf, leaving its page and selected font
+            # as they were; keys are the lower-case family plus style letters
+            family = key.rstrip("BI")
+            previous = [getattr(pdf, name, None) for name in _FONT_STATE]
+            mark = len(pdf.pages[pdf.page]) if pdf.page else 0
+            pdf.set_font(family, key[len(family):])
+            for name, value in zip(_FONT_STATE, previous):
+                setattr(pdf, name, value)
+            if pdf.page:
+                pdf.pages[pdf.page] = pdf.pages[pdf.page][:mark]
+
+
+def _add_glyphs(pdf, glyphs):
+    # Text pasted as operators never went through cell(), so the code points
+    # it draws are added to the subsets embedded for its fonts here
+    for key, codes in glyphs.items():
+        pdf.fonts[key]["subset"].extend(codes)
+
+
+def _font_numbers(pdf, parts):
+    parts = list(parts)
+    for i in range(1, len(parts), 3):
+        parts[i] = f"/F{pdf.fonts[parts[i]]['i']}"
+    return "".join(parts)
+
+
+def _apply_state(pdf, state):
+    # Bring pdf's style in line with a recorded state, emitting only what changed
+    font, draw_color, fill_color, text_color = state
+    if font[0]:
+        pdf.set_font(*font)
+    if pdf.draw_color != draw_color:
+        pdf.draw_color = draw_color
+        pdf._out(draw_color)
+    if pdf.fill_color != fill_color:
+        pdf.fill_color = fill_color
+        pdf._out(fill_color)
+    pdf.text_color = text_color
+    pdf.color_flag = pdf.fill_color != pdf.text_color
+
+
+class BlockTemplate:
+    def __init__(self, items):
+        self.items = tuple(items)
+        self._compiled = {}
+
+    def compile(self, pdf):
+        """Lay the block out once for pdf's page geometry and cache it."""
+        key = _geometry(pdf)
+        compiled = self._compiled.get(key)
+        if compiled is None:
+            compiled = self._compiled[key] = self._compile(pdf)
+        return compiled
+
+    def _compile(self, pdf):
+        scratch = Document(unicode=getattr(pdf, "unicode", False))
+        scratch.set_auto_page_break(False)
+        scratch.add_page()
+        scratch.k, scratch.w, scratch.h = pdf.k, pdf.w, pdf.h
+        scratch.l_margin, scratch.r_margin, scratch.c_margin = pdf.l_margin, pdf.r_margin, pdf.c_margin
+        scratch.set_y(0)
+        mark = len(scratch.pages[scratch.page])
+        # Blocks start from FPDF's default black-on-black style, whatever the
+        # target document had selected before them
+        scratch._out(scratch.draw_color)
+        scratch._out(scratch.fill_color)
+
+        slots = []
+        extent = 0.0
+        for item in self.items:
+            if isinstance(item, Style):
+                if item.font:
+                    scratch.set_font(*item.font)
+                if item.draw_color:
+                    scratch.set_draw_color(*item.draw_color)
+                if item.fill_color:
+                    scratch.set_fill_color(*item.fill_color)
+                if item.text_color:
+                    scratch.set_text_color(*item.text_color)
+            elif isinstance(item, Cell):
+                extent = max(extent, scratch.y + item.h)
+                if item.slot:
+                    w = item.w or scratch.w - scratch.r_margin - scratch.x
+                    slots.append(_Slot(item.slot, scratch.x, scratch.y, w, item.h, item.align, _state(scratch)))
+                    scratch.cell(item.w, item.h, "", item.border, item.ln, item.align, item.fill)
+                else:
+                    scratch.cell(item.w, item.h, item.text, item.border, item.ln, item.align, item.fill)
+            elif isinstance(item, Ln):
+                if item.h is None:
+                    scratch.ln()
+                else:
+                    scratch.ln(item.h)
+                extent = max(extent, scratch.y)
+
+        parts, fonts = _font_keys(scratch, scratch.pages[scratch.page][mark:].rstrip("\n"))
+        glyphs = {key: frozenset(scratch.fonts[key]["subset"]) for key in fonts if "subset" in scratch.fonts[key]}
+        return _Compiled(
+            parts=parts,
+            fonts=fonts,
+            slots=slots,
+            extent=extent,
+            end_x=scratch.x,
+            end_dy=scratch.y,
+            lasth=scratch.lasth,
+            end_state=_state(scratch),
+            glyphs=glyphs,
+        )
+
+    def _resolve(self, pdf, compiled):
+        _register_fonts(pdf, compiled.fonts)
+        _add_glyphs(pdf, compiled.glyphs)
+        numbers = tuple(pdf.fonts[key]["i"] for key in compiled.fonts)
+        body = compiled.resolved.get(numbers)
+        if body is None:
+            body = compiled.resolved[numbers] = _font_numbers(pdf, compiled.parts)
+        return body
+
+    def render(self, pdf, **values):
+        """Draw the block at pdf's current position, filling slots from values."""
+        compiled = self.compile(pdf)
+        if pdf.y + compiled.extent > pdf.page_break_trigger and not pdf.in_footer and pdf.accept_page_break():
+            pdf.add_page(pdf.cur_orientation)
+        y = pdf.y
+        body = self._resolve(pdf, compiled)
+
+        pdf._out(f"q 1 0 0 1 0 {-y * pdf.k:.2f} cm")
+        pdf._out(body)
+        pdf._out("Q")
+
+        for slot in compiled.slots:
+            text = str(values[slot.name])
+            if text:
+                _apply_state(pdf, slot.state)
+                pdf.set_xy(slot.x, y + slot.dy)
+                pdf.cell(slot.w, slot.h, text, 0, 0, slot.align)
+
+        _apply_state(pdf, compiled.end_state)
+        pdf.x = compiled.end_x
+        pdf.y = y + compiled.end_dy
+        pdf.lasth = compiled.lasth
+
+
+# Sections
+_END_STATE = ("x", "y", "lasth", "line_width", "font_family", "font_style", "underline", "font_size_pt",
+              "font_size", "draw_color", "fill_color", "text_color", "color_flag", "ws")
+
+
+@dataclass
+class _Recording:
+    pages: list        # operators added to the first page, then one entry per new page
+    fonts: list
+    end: tuple         # values of _END_STATE after the section
+    current_font: str
+    glyphs: dict       # code points the section drew, by font key
+    resolved: dict = field(default_factory=dict)
+
+
+def _position(pdf):
+    # Everything a section's output depends on besides its own inputs
+    return (pdf.x, pdf.y, pdf.lasth, pdf.line_width, _state(pdf), pdf.auto_page_break,
+            pdf.page_break_trigger, pdf.cur_orientation, _geometry(pdf))
+
+
+class SectionCache:
+    """Recorded output of document sections, keyed by inputs and start position.
+
+    A section is a (name, inputs, draw) triple: draw(pdf, *inputs) lays it
+    out, and inputs must be hashable and cover everything draw reads apart
+    from pdf's position and style. Sections may add pages, but must not
+    embed images or links. Thread-safe; least recently used entries are
+    dropped past max_entries.
+    """
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    def draw(self, pdf, name, inputs, draw):
+        key = (name, inputs, _position(pdf))
+        with self._lock:
+            recording = self._entries.get(key)
+            if recording is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            else:
+                self.misses += 1
+        if recording is not None:
+            self._replay(pdf, recording)
+            return
+        recording = self._record(pdf, draw, inputs)
+        with self._lock:
+            self._entries[key] = recording
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    @staticmethod
+    def _record(pdf, draw, inputs):
+        page = pdf.page
+        mark = len(pdf.pages[page])
+        drawn = {key: len(font["subset"]) for key, font in pdf.fonts.items() if "subset" in font}
+        draw(pdf, *inputs)
+        # Page by page: text in a Unicode font can hold any byte, so no
+        # separator would be safe
+        pages, fonts = [], []
+        for content in [pdf.pages[page][mark:]] + [pdf.pages[n] for n in range(page + 1, pdf.page + 1)]:
+            parts, used = _font_keys(pdf, content)
+            pages.append(parts)
+            fonts += [key for key in used if key not in fonts]
+        current = next((key for key, font in pdf.fonts.items() if font is pdf.current_font), "")
+        # Subsets only grow, so the section drew what it appended to them,
+        # also in a font it inherited selected and never named
+        glyphs = {key: frozenset(font["subset"][drawn.get(key, 0):]) for key, font in pdf.fonts.items()
+                  if len(font.get("subset", ())) > drawn.get(key, 0)}
+        return _Recording(pages, fonts, tuple(getattr(pdf, name) for name in _END_STATE), current, glyphs)
+
+    @staticmethod
+    def _replay(pdf, recording):
+        _register_fonts(pdf, recording.fonts)
+        _add_glyphs(pdf, recording.glyphs)
+        numbers = tuple(pdf.fonts[key]["i"] for key in recording.fonts)
+        pages = recording.resolved.get(numbers)
+        if pages is None:
+            pages = recording.resolved[numbers] = [_font_numbers(pdf, parts) for parts in recording.pages]
+        pdf.pages[pdf.page] += pages[0]
+        for content in pages[1:]:
+            # What add_page() would do; the recorded content already holds
+            # the footer, header and style operators it wrote
+            pdf._endpage()
+            pdf._beginpage(pdf.cur_orientation)
+            pdf.pages[pdf.page] = content
+        for name, value in zip(_END_STATE, recording.end):
+            setattr(pdf, name, value)
+        if recording.current_font:
+            pdf.current_font = pdf.fonts[recording.current_font]
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+def draw_sections(pdf, sections, cache=None):
+    """Draw (name, inputs, draw) sections in order, through cache when given."""
+    for name, inputs, draw in sections:
+        if cache is None:
+            draw(pdf, *inputs)
+        else:
+            cache.draw(pdf, name, inputs, draw)
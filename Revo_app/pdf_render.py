@@ -0,0 +1,31 @@
+"""Shared helpers for turning an FPDF document into downloadable bytes."""
+
+from metrics import count, stage
+
+
+def pdf_to_bytes(pdf):
+    """Render the document straight from memory, no temp file involved."""
+    with stage("pdf_output"):
+        # fpdf 1.7 (pinned in requirements.txt) hands back a latin-1 str
+        data = pdf.output(dest="S").encode("latin-1")
+    count("pdf_bytes_total", len(data))
+    return data
+
+
+def register_jpeg(pdf, name, data, width, height, colorspace="DeviceRGB"):
+    """Make in-memory JPEG data available to pdf.image(name, ...).
+
+    FPDF only reads images from disk; seeding its image table directly skips
+    the temp file. Registering the same name twice embeds the data once.
+    """
+    if name not in pdf.images:
+        pdf.images[name] = {
+            "i": len(pdf.images) + 1,
+            "w": width,
+            "h": height,
+            "cs": colorspace,
+            "bpc": 8,
+            "f": "DCTDecode",
+            "data": data,
+        }
+    return name
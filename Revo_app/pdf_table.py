@@ -0,0 +1,107 @@
+"""Tables that flow across pages, for quotes with hundreds of line items.
+
+A PagedTable draws its rows from the left margin down. When the next row
+would not fit above the page break it closes the page with a "continued"
+row carrying the running total, starts a new page, repeats the column
+headers and brings the total forward. Fixed rows are BlockTemplates; the
+first column wraps at line_h per line, the others are single cells.
+Amounts are integer cents, so the running and final totals are exact.
+"""
+
+from dataclasses import dataclass
+
+from money import format_cents
+from pdf_fonts import SANS
+from pdf_layout import BlockTemplate, Cell, Style
+from text_metrics import count_lines
+
+
+@dataclass(frozen=True)
+class Column:
+    title: str
+    w: float
+    align: str = "L"
+
+
+class PagedTable:
+    def __init__(self, columns, total_label, row_h=7, line_h=5, font=(SANS, "", 10), fill_color=(230,)):
+        self.columns = tuple(columns)
+        self.row_h = row_h
+        self.line_h = line_h
+        self.font = font
+        label_w = sum(column.w for column in self.columns[:-1])
+        amount_w = self.columns[-1].w
+        bold = (font[0], "B", font[2])
+        italic = (font[0], "I", font[2])
+
+        def summary_row(label, style_font, fill):
+            return [
+                Style(font=style_font, fill_color=fill_color, text_color=(0,)),
+                Cell(label_w, row_h, label, 1, 0, "R", fill),
+                Cell(amount_w, row_h, slot="amount", border=1, ln=1, align="R", fill=fill),
+                Style(font=font),
+            ]
+
+        self.header = BlockTemplate([
+            Style(font=bold, fill_color=fill_color, text_color=(0,)),
+            *(Cell(column.w, row_h, column.title, 1, 0, "C", True) for column in self.columns[:-1]),
+            Cell(amount_w, row_h, self.columns[-1].title, 1, 1, "C", True),
+            Style(font=font),
+        ])
+        self.carried = BlockTemplate(summary_row("Brought forward", italic, False))
+        self.continued = BlockTemplate(summary_row("Continued on next page - running total", italic, False))
+        self.total = BlockTemplate(summary_row(total_label, bold, True))
+
+    def draw(self, pdf, rows):
+        """Draw rows, each a (cell texts, amount in cents) pair, then the total row. Returns the total in cents."""
+        widths = [column.w for column in self.columns]
+        aligns = [column.align for column in self.columns]
+        first_w = widths[0]
+        row_h = self.row_h
+        line_h = self.line_h
+        # Keep room for the "continued" row under the last row of a page
+        bottom = pdf.page_break_trigger - row_h
+        running = 0
+
+        rows = iter(rows)
+        row = next(rows, None)
+        # The header must not be left alone at the foot of a page, so the
+        # first row is measured too, in the font the rows are drawn in; a
+        # wrapped one may need the next page
+        pdf.set_font(*self.font)
+        if row is not None and pdf.get_y() + 2 * row_h + self._measure(pdf, row[0][0], first_w)[1] > bottom:
+            pdf.add_page(pdf.cur_orientation)
+        self.header.render(pdf)
+        on_page = 0
+        while row is not None:
+            texts, amount = row
+            lines, height = self._measure(pdf, texts[0], first_w)
+            # A row taller than a whole page is drawn where it starts, not chased across pages
+            if on_page and pdf.y + height > bottom:
+                self.continued.render(pdf, amount=format_cents(running))
+                pdf.add_page(pdf.cur_orientation)
+                self.header.render(pdf)
+                self.carried.render(pdf, amount=format_cents(running))
+                on_page = 0
+
+            x, y = pdf.l_margin, pdf.y
+            if lines == 1:
+                pdf.cell(first_w, row_h, texts[0], 1, 0, aligns[0])
+            else:
+                pdf.multi_cell(first_w, line_h, texts[0], 1, aligns[0])
+                pdf.set_xy(x + first_w, y)
+            for text, w, align in zip(texts[1:], widths[1:], aligns[1:]):
+                pdf.cell(w, height, text, 1, 0, align)
+            pdf.set_xy(x, y + height)
+
+            running += amount
+            on_page += 1
+            row = next(rows, None)
+
+        self.total.render(pdf, amount=format_cents(running))
+        return running
+
+    def _measure(self, pdf, text, w):
+        # (lines, height) of a row whose first cell holds text
+        lines = count_lines(pdf, text, w)
+        return lines, self.row_h if lines == 1 else lines * self.line_h
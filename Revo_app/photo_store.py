@@ -0,0 +1,265 @@
+"""Content-addressed store of prepared intake photos.
+
+Uploads are identified by the SHA-256 of their bytes. The first time a
+photo is seen it is decoded once into its print-sized JPEG, and a thumbnail
+is cut from that; every later upload of the same image, in this intake or a
+repeat one, gets the stored PreparedPhoto back without decoding or resizing
+anything. Intake PDFs name embedded photos by digest, so a photo attached
+twice is also embedded once.
+
+Variants are kept in an LRU bounded by total bytes. With a database path
+they also go into SQLite, next to one copy of each original, and survive
+restarts. Pointing REVU_PHOTO_DB at the QuoteStore database shares its
+photos table, so originals kept for stored intakes are not stored twice.
+
+    REVU_PHOTO_CACHE_MB=128     in-memory budget for prepared photos
+    REVU_PHOTO_DB=revu.db       also keep originals and variants in SQLite
+
+    python photo_store.py stats --db revu.db
+"""
+
+import argparse
+import hashlib
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from dataclasses import replace
+
+from image_pipeline import (JPEG_QUALITY, LAYOUT_DPI, PRINT_DPI, THUMB_PX, PreparedPhoto, make_thumbnail,
+                            prepare_photo)
+from metrics import count
+from pdf_cache import source_fingerprint
+
+DEFAULT_MAX_BYTES = 128 * 2**20
+
+# Part of every variant name, so stored variants stop matching as soon as the
+# code that prepares them changes; stale ones are dropped when a store opens
+VARIANT_FINGERPRINT = source_fingerprint(("image_header.py", "image_pipeline.py"))
+THUMBNAIL = f"thumb-{VARIANT_FINGERPRINT}-{THUMB_PX}"
+
+PHOTO_SCHEMA = """
+CREATE TABLE IF NOT EXISTS photos (
+    sha256 TEXT PRIMARY KEY,
+    data BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS photo_variants (
+    sha256 TEXT NOT NULL,
+    variant TEXT NOT NULL,
+    data BLOB NOT NULL,
+    width INTEGER NOT NULL,
+    height INTEGER NOT NULL,
+    colorspace TEXT NOT NULL,
+    draw_w REAL NOT NULL,
+    draw_h REAL NOT NULL,
+    source_bytes INTEGER NOT NULL,
+    PRIMARY KEY (sha256, variant)
+);
+"""
+
+
+def photo_digest(upload):
+    """SHA-256 hex digest of an upload's content, read in place."""
+    if isinstance(upload, (bytes, bytearray, memoryview)):
+        return hashlib.sha256(upload).hexdigest()
+    if hasattr(upload, "getbuffer"):
+        with upload.getbuffer() as view:
+            return hashlib.sha256(view).hexdigest()
+    digest = hashlib.sha256()
+    upload.seek(0)
+    for chunk in iter(lambda: upload.read(2**20), b""):
+        digest.update(chunk)
+    upload.seek(0)
+    return digest.hexdigest()
+
+
+def print_variant(max_w=180, max_h=120, print_dpi=PRINT_DPI, quality=JPEG_QUALITY):
+    """Name of the prepared variant for one set of prepare_photo() options."""
+    return f"print-{VARIANT_FINGERPRINT}-{max_w}x{max_h}mm@{LAYOUT_DPI}dpi-{print_dpi}dpi-q{quality}"
+
+
+def _read(upload):
+    if hasattr(upload, "getvalue"):
+        return upload.getvalue()
+    upload.seek(0)
+    data = upload.read()
+    upload.seek(0)
+    return data
+
+
+class PhotoStore:
+    """Prepared photos keyed by (digest, variant), bounded by max_bytes, backed by path if given. Thread-safe."""
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, path=None):
+        self.max_bytes = max_bytes
+        self.path = path
+        self.hits = 0
+        self.db_hits = 0
+        self.misses = 0
+        self.skipped_bytes = 0  # upload bytes that did not need decoding
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self._preparing = {}
+        self._local = threading.local()
+        if path:
+            with self._connect() as db:
+                db.executescript(PHOTO_SCHEMA)
+                db.execute("DELETE FROM photo_variants WHERE variant NOT LIKE ?", (f"%-{VARIANT_FINGERPRINT}-%",))
+
+    @classmethod
+    def from_env(cls):
+        budget = os.environ.get("REVU_PHOTO_CACHE_MB")
+        return cls(int(budget) * 2**20 if budget else DEFAULT_MAX_BYTES, os.environ.get("REVU_PHOTO_DB") or None)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def prepared(self, upload, stats=None, **options):
+        """The print-sized PreparedPhoto for upload, preparing it only if it is new.
+
+        Takes the same options as prepare_photo() and can stand in for it,
+        e.g. as prepare_photos(..., prepare=store.prepared). The result
+        carries the upload's digest; reused is set when nothing was decoded.
+        """
+        digest = photo_digest(upload)
+        variant = print_variant(**options)
+        photo, tier = self._get(digest, variant)
+        if photo is None:
+            # The same photo twice in one intake is prepared by one thread
+            # while the other waits for its result
+            with self._lock:
+                lock = self._preparing.setdefault((digest, variant), threading.Lock())
+            with lock:
+                photo, tier = self._get(digest, variant)
+                if photo is None:
+                    try:
+                        photo = self._prepare(upload, digest, variant, stats, options)
+                    finally:
+                        with self._lock:
+                            self._preparing.pop((digest, variant), None)
+        with self._lock:
+            if tier is None:
+                self.misses += 1
+            elif tier == "hit":
+                self.hits += 1
+            else:
+                self.db_hits += 1
+            if tier is not None:
+                self.skipped_bytes += photo.source_bytes
+        count("photo_store_lookups_total", result=tier or "miss")
+        return photo if tier is None else replace(photo, reused=True)
+
+    def thumbnail(self, digest):
+        """Thumbnail JPEG bytes for a photo prepared earlier, or None."""
+        photo, _ = self._get(digest, THUMBNAIL)
+        return photo.data if photo else None
+
+    def clear(self):
+        """Drop the in-memory tier and reset the counters; the database is kept."""
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+            self.hits = self.db_hits = self.misses = self.skipped_bytes = 0
+
+    def stats(self):
+        lookups = self.hits + self.db_hits + self.misses
+        stats = {
+            "entries": len(self._entries),
+            "bytes": self._size,
+            "hits": self.hits,
+            "db_hits": self.db_hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits + self.db_hits) / lookups if lookups else 0.0,
+            "skipped_bytes": self.skipped_bytes,
+        }
+        if self.path:
+            db = self._connect()
+            stats["originals"], stats["original_bytes"] = db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(LENGTH(data)), 0) FROM photos").fetchone()
+            stats["variants"], stats["variant_bytes"] = db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(LENGTH(data)), 0) FROM photo_variants").fetchone()
+        return stats
+
+    # Lookups
+    def _get(self, digest, variant):
+        """(photo, "hit" or "db_hit"), or (None, None) when neither tier has it."""
+        with self._lock:
+            photo = self._entries.get((digest, variant))
+            if photo is not None:
+                self._entries.move_to_end((digest, variant))
+                return photo, "hit"
+        if not self.path:
+            return None, None
+        row = self._connect().execute(
+            "SELECT data, width, height, colorspace, draw_w, draw_h, source_bytes FROM photo_variants"
+            " WHERE sha256 = ? AND variant = ?",
+            (digest, variant),
+        ).fetchone()
+        if row is None:
+            return None, None
+        photo = PreparedPhoto(*row, digest=digest)
+        with self._lock:
+            self._remember((digest, variant), photo)
+        return photo, "db_hit"
+
+    def _prepare(self, upload, digest, variant, stats, options):
+        photo = replace(prepare_photo(upload, stats=stats, **options), digest=digest)
+        thumb = replace(make_thumbnail(photo.data), digest=digest)
+        with self._lock:
+            self._remember((digest, variant), photo)
+            self._remember((digest, THUMBNAIL), thumb)
+        if self.path:
+            with self._connect() as db:
+                db.execute("INSERT OR IGNORE INTO photos (sha256, data) VALUES (?, ?)", (digest, _read(upload)))
+                for name, prepared in ((variant, photo), (THUMBNAIL, thumb)):
+                    db.execute(
+                        "INSERT OR REPLACE INTO photo_variants (sha256, variant, data, width, height, colorspace,"
+                        " draw_w, draw_h, source_bytes) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        (digest, name, prepared.data, prepared.width, prepared.height, prepared.colorspace,
+                         prepared.draw_w, prepared.draw_h, prepared.source_bytes),
+                    )
+        return photo
+
+    def _remember(self, key, photo):
+        # Caller holds the lock
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._size -= len(old.data)
+        if len(photo.data) > self.max_bytes:
+            return
+        self._entries[key] = photo
+        self._size += len(photo.data)
+        while self._size > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._size -= len(evicted.data)
+
+    # SQLite
+    def _connect(self):
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=10)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            self._local.db = db
+        return db
+
+
+PHOTO_STORE = PhotoStore.from_env()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect the prepared photo store.")
+    parser.add_argument("command", choices=("stats",))
+    parser.add_argument("--db", default=os.environ.get("REVU_PHOTO_DB"), help="database file (default $REVU_PHOTO_DB)")
+    args = parser.parse_args(argv)
+    if not args.db:
+        parser.error("--db or $REVU_PHOTO_DB is required")
+
+    stats = PhotoStore(path=args.db).stats()
+    print(f"{stats['originals']} originals ({stats['original_bytes'] / 2**20:.1f} MB), "
+          f"{stats['variants']} prepared variants ({stats['variant_bytes'] / 2**20:.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,357 @@
+"""Asyncio HTTP API for pricing quotes and rendering quote and intake PDFs.
+
+Runs next to the Streamlit apps for callers that are not people: the CRM and
+the field app. Connections are served by one event loop; FPDF rendering runs
+on a process pool with two jobs per worker in flight. Renders beyond that
+wait on the loop, and once max_pending are waiting or running further ones
+are turned away with 503 instead of queueing without bound.
+
+    python quote_api.py --port 8080 --workers 4
+
+    GET  /health        liveness and load counters
+    GET  /metrics       Prometheus text: request timings, plus stage timings
+                        when REVU_METRICS is set (see metrics.py)
+    POST /quote         quote JSON in, priced quote JSON out
+    POST /quote/pdf     quote JSON in ("style": "revu" | "cravix"), PDF out
+    POST /intake/pdf    intake JSON in (photos as base64 strings), PDF out
+
+Quote JSON uses the QuoteInput field names with ISO dates, the same shape as a
+batch_quotes JSONL row. Add "save": true to also record it in quote_store.
+"""
+
+import argparse
+import asyncio
+import base64
+import binascii
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict
+from datetime import date
+from http import HTTPStatus
+
+from batch_quotes import quote_from_row
+from image_header import probe_image
+from intake_pdf import IntakeInput, render_intake_pdf
+from metrics import METRICS
+from pdf_cache import PDF_CACHE, stable_key
+from quote_engine import calculate_quote
+from quote_pdf import render_quote_pdf
+from quote_store import default_store
+from records import pack_intake, pack_quote, unpack_intake, unpack_quote
+
+MAX_BODY = 32 * 2**20
+MAX_HEADERS = 100
+KEEPALIVE_TIMEOUT = 15
+DEFAULT_MAX_PENDING = 1024
+_STYLES = {"revu", "cravix"}
+_INTAKE_TEXT_FIELDS = {"client_name", "email", "phone", "address", "preferred_contact", "service_needed", "notes"}
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message=None):
+        super().__init__(message or status.phrase)
+        self.status = status
+
+
+def _json_default(value):
+    if isinstance(value, date):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serialisable")
+
+
+def _parse_json(body):
+    try:
+        data = json.loads(body or b"{}")
+    except (UnicodeDecodeError, json.JSONDecodeError) as e:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, f"Invalid JSON: {e}")
+    if not isinstance(data, dict):
+        raise HTTPError(HTTPStatus.BAD_REQUEST, "Expected a JSON object")
+    return data
+
+
+def _style(data, default):
+    style = data.pop("style", default)
+    if style not in _STYLES:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, f"Unknown style {style!r}")
+    return style
+
+
+def _quote(data):
+    try:
+        return quote_from_row(data)
+    except (KeyError, TypeError, ValueError) as e:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, f"Invalid quote: {e}")
+
+
+def intake_from_row(row):
+    """Build an IntakeInput from API JSON; photos are base64 strings.
+
+    Each photo's header is probed, so one that is not a readable PNG or JPEG
+    raises ValueError here rather than failing the render.
+    """
+    values = {}
+    for key, value in row.items():
+        if value is None or value == "":
+            continue
+        if key in _INTAKE_TEXT_FIELDS:
+            values[key] = str(value)
+        elif key == "preferred_date":
+            values[key] = date.fromisoformat(str(value))
+        elif key == "photos":
+            values[key] = [_photo(number, photo) for number, photo in enumerate(value, 1)]
+    return IntakeInput(**values)
+
+
+def _photo(number, encoded):
+    data = base64.b64decode(encoded, validate=True)
+    try:
+        probe_image(data)
+    except ValueError as e:
+        raise ValueError(f"photo {number}: {e}") from None
+    return data
+
+
+# Pool workers
+def _warm():
+    # Import the layouts and compile their templates before the first request
+    quote = quote_from_row({})
+    for style in _STYLES:
+        render_quote_pdf(quote, style=style)
+    return os.getpid()
+
+
+# Inputs cross to the workers as packed records (records.py), not pickles
+def _render_quote(packed, style):
+    return render_quote_pdf(unpack_quote(packed), style=style)
+
+
+def _render_intake(packed, style):
+    return render_intake_pdf(unpack_intake(packed), style=style)
+
+
+class QuoteService:
+    """The HTTP front end. Call serve() from a running event loop."""
+
+    def __init__(self, host="127.0.0.1", port=8080, workers=None, max_pending=None):
+        self.host = host
+        self.port = port
+        self.workers = workers or os.cpu_count() or 1
+        self.max_pending = max_pending or DEFAULT_MAX_PENDING
+        self.pool = None
+        self._slots = None
+        self.server = None
+        self.pending = 0
+        self.requests = 0
+        self.rejected = 0
+
+    async def start(self):
+        loop = asyncio.get_running_loop()
+        self.pool = ProcessPoolExecutor(max_workers=self.workers)
+        self._slots = asyncio.Semaphore(self.workers * 2)
+        await asyncio.gather(*(loop.run_in_executor(self.pool, _warm) for _ in range(self.workers)))
+        self.server = await asyncio.start_server(self._connection, self.host, self.port, backlog=1024)
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    async def serve(self):
+        await self.start()
+        try:
+            async with self.server:
+                await self.server.serve_forever()
+        finally:
+            self.pool.shutdown(cancel_futures=True)
+
+    async def close(self):
+        self.server.close()
+        await self.server.wait_closed()
+        self.pool.shutdown(cancel_futures=True)
+
+    async def _offload(self, fn, *args):
+        # Bounded hand-off to the process pool; the event loop only waits
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise HTTPError(HTTPStatus.SERVICE_UNAVAILABLE, "Renderer is busy, retry shortly")
+        self.pending += 1
+        try:
+            async with self._slots:
+                return await asyncio.get_running_loop().run_in_executor(self.pool, fn, *args)
+        finally:
+            self.pending -= 1
+
+    async def _render(self, key, fn, *args):
+        # The cache's disk tier does file I/O, so it is read and written off the loop
+        loop = asyncio.get_running_loop()
+        data = await loop.run_in_executor(None, PDF_CACHE.get, key)
+        if data is None:
+            data = await self._offload(fn, *args)
+            await loop.run_in_executor(None, PDF_CACHE.put, key, data)
+        return data
+
+    # Endpoints
+    async def health(self, body):
+        return HTTPStatus.OK, "application/json", {
+            "status": "ok",
+            "workers": self.workers,
+            "pending": self.pending,
+            "requests": self.requests,
+            "rejected": self.rejected,
+            "pdf_cache": PDF_CACHE.stats(),
+        }
+
+    async def metrics(self, body):
+        # Stages that run in pool workers only reach the JSONL log (REVU_METRICS_JSONL)
+        return HTTPStatus.OK, "text/plain; version=0.0.4", METRICS.prometheus_text().encode("utf-8")
+
+    async def price_quote(self, body):
+        data = _parse_json(body)
+        save = bool(data.pop("save", False))
+        style = _style(data, "revu")
+        quote = _quote(data)
+        result = calculate_quote(quote)
+        response = {"quote": asdict(quote), "result": asdict(result)}
+        if save:
+            loop = asyncio.get_running_loop()
+            response["id"] = await loop.run_in_executor(None, default_store().save_quote, quote, result, style)
+        return HTTPStatus.OK, "application/json", response
+
+    async def quote_pdf(self, body):
+        data = _parse_json(body)
+        save = bool(data.pop("save", False))
+        style = _style(data, "revu")
+        quote = _quote(data)
+        if save:
+            await asyncio.get_running_loop().run_in_executor(None, default_store().save_quote, quote, None, style)
+        return HTTPStatus.OK, "application/pdf", await self._render(
+            stable_key("quote", style, quote), _render_quote, pack_quote(quote), style)
+
+    async def intake_pdf(self, body):
+        data = _parse_json(body)
+        save = bool(data.pop("save", False))
+        style = _style(data, "cravix")
+        try:
+            intake = intake_from_row(data)
+        except (TypeError, ValueError, binascii.Error) as e:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, f"Invalid intake: {e}")
+        loop = asyncio.get_running_loop()
+        # Hashing photos is real work; keep it off the loop too (hashlib drops the GIL)
+        key = await loop.run_in_executor(None, stable_key, "intake", style, intake, date.today())
+        if save:
+            await loop.run_in_executor(None, default_store().save_intake, intake, style)
+        return HTTPStatus.OK, "application/pdf", await self._render(key, _render_intake, pack_intake(intake), style)
+
+    _ROUTES = {
+        ("GET", "/health"): health,
+        ("GET", "/metrics"): metrics,
+        ("POST", "/quote"): price_quote,
+        ("POST", "/quote/pdf"): quote_pdf,
+        ("POST", "/intake/pdf"): intake_pdf,
+    }
+
+    async def _dispatch(self, method, path, body):
+        handler = self._ROUTES.get((method, path))
+        if handler is None:
+            if any(route_path == path for _, route_path in self._ROUTES):
+                raise HTTPError(HTTPStatus.METHOD_NOT_ALLOWED)
+            raise HTTPError(HTTPStatus.NOT_FOUND)
+        return await handler(self, body)
+
+    # HTTP/1.1 plumbing
+    @staticmethod
+    async def _readline(reader):
+        try:
+            return await reader.readline()
+        except ValueError:
+            # Longer than the StreamReader limit (64 KiB)
+            raise HTTPError(HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE)
+
+    async def _read_request(self, reader):
+        line = await asyncio.wait_for(self._readline(reader), KEEPALIVE_TIMEOUT)
+        if not line:
+            return None
+        try:
+            method, target, version = line.decode("latin-1").split()
+        except ValueError:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Malformed request line")
+        headers = {}
+        while True:
+            line = await self._readline(reader)
+            if line in (b"\r\n", b"\n", b""):
+                break
+            if len(headers) >= MAX_HEADERS:
+                raise HTTPError(HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE)
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        if "transfer-encoding" in headers:
+            raise HTTPError(HTTPStatus.NOT_IMPLEMENTED, "Chunked request bodies are not supported")
+        try:
+            length = int(headers.get("content-length", 0))
+        except ValueError:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Bad Content-Length")
+        if length > MAX_BODY:
+            raise HTTPError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE)
+        body = await reader.readexactly(length) if length > 0 else b""
+        keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+        return method, target.split("?", 1)[0], body, keep_alive
+
+    async def _connection(self, reader, writer):
+        try:
+            while True:
+                keep_alive = False
+                route = "invalid"
+                try:
+                    request = await self._read_request(reader)
+                    if request is None:
+                        break
+                    method, path, body, keep_alive = request
+                    started = time.perf_counter()
+                    route = path if (method, path) in self._ROUTES else "other"
+                    self.requests += 1
+                    status, content_type, payload = await self._dispatch(method, path, body)
+                except HTTPError as e:
+                    status, content_type, payload = e.status, "application/json", {"error": str(e)}
+                except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError):
+                    break
+                except Exception as e:
+                    status, content_type, payload = HTTPStatus.INTERNAL_SERVER_ERROR, "application/json", {"error": repr(e)}
+
+                if content_type == "application/json":
+                    payload = json.dumps(payload, default=_json_default).encode("utf-8")
+                head = [f"HTTP/1.1 {status.value} {status.phrase}",
+                        f"Content-Type: {content_type}",
+                        f"Content-Length: {len(payload)}",
+                        "Connection: " + ("keep-alive" if keep_alive else "close")]
+                if status == HTTPStatus.SERVICE_UNAVAILABLE:
+                    head.append("Retry-After: 1")
+                if METRICS.enabled and route != "invalid":
+                    METRICS.observe("request", time.perf_counter() - started, route=route)
+                    METRICS.count("responses_total", route=route, status=status.value)
+                    METRICS.count("response_bytes_total", len(payload), route=route)
+                writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + payload)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve quote pricing and PDF rendering over HTTP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--workers", type=int, default=None, help="render processes (default: CPU count)")
+    parser.add_argument("--max-pending", type=int, default=None, help=f"renders queued or running before 503 (default: {DEFAULT_MAX_PENDING})")
+    args = parser.parse_args(argv)
+
+    service = QuoteService(args.host, args.port, args.workers, args.max_pending)
+    print(f"Serving on http://{args.host}:{args.port} with {service.workers} render workers")
+    try:
+        asyncio.run(service.serve())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+"""Quote pricing shared by the Revu and Cravix quote apps.
+
+Nothing in here touches Streamlit or FPDF, so it can be imported from a
+worker, an API or a benchmark without starting the UI.
+"""
+
+import math
+import re
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+
+from metrics import count, stage
+from money import line_cents, percent_of, tax_rule, to_cents
+
+
+class _CentsSlot:
+    # A slot for LineItem's cached amount that is not a dataclass field, so
+    # it stays out of fields(), asdict(), equality and cache keys
+    __slots__ = ("_cents",)
+
+
+@dataclass(slots=True)
+class LineItem(_CentsSlot):
+    """One priced line of a quote: quantity x unit_price, e.g. 12 ft x $3.50.
+
+    The amount, in cents, is computed once on first use; treat items as immutable.
+    """
+
+    name: str
+    quantity: float = 1.0
+    unit: str = ""
+    unit_price: float = 0.0
+
+    @property
+    def cents(self):
+        try:
+            return self._cents
+        except AttributeError:
+            self._cents = line_cents(self.quantity, self.unit_price)
+            return self._cents
+
+    @classmethod
+    def from_dict(cls, values):
+        """Build from a JSON object; the older {"name", "amount"} shape is still accepted."""
+        if "unit_price" not in values and "amount" in values:
+            return cls(str(values["name"]), 1.0, "", float(values["amount"]))
+        return cls(
+            str(values["name"]),
+            float(values.get("quantity", 1.0)),
+            str(values.get("unit", "")),
+            float(values.get("unit_price", 0.0)),
+        )
+
+
+@dataclass(slots=True)
+class ParseIssue:
+    line: int
+    text: str
+    message: str
+
+
+@dataclass(slots=True)
+class QuoteInput:
+    company_name: str = ""
+    client_name: str = ""
+    client_email: str = ""
+    quote_number: str = ""
+    quote_date: date = field(default_factory=date.today)
+    valid_until: date = field(default_factory=lambda: date.today() + timedelta(days=30))
+    job_description: str = ""
+    unit_type: str = "Square Ft"
+    units: float = 0.0
+    rate_per_unit: float = 0.0
+    material_cost: float = 0.0
+    labor_hours: float = 0.0
+    hourly_rate: float = 0.0
+    travel_cost: float = 0.0
+    addons: list[LineItem] = field(default_factory=list)
+    discount_rate: float = 0.0
+    tax_rate: float = 0.0
+    tax_rule: str = "default"
+
+
+@dataclass(slots=True)
+class QuoteResult:
+    """A priced quote. Every amount is int cents; display them with money.format_cents()."""
+
+    service_cents: int
+    labor_cents: int
+    materials_cents: int
+    travel_cents: int
+    addon_cents: int
+    subtotal_cents: int
+    discount_cents: int
+    taxable_cents: int      # subtotal after discount
+    tax_cents: int
+    total_cents: int
+
+
+# "x", "×", "@" or "*" standing alone, or fused between a number and a price
+# ("12x15"); an "x" inside a word such as "boxes" is never a separator
+_QUANTITY_SEPARATOR = re.compile(r"\s+[x×@*]\s+|(?<=\d)[x×@*](?=\s*\$?\d)", re.IGNORECASE)
+
+
+def _number(text, what="a number"):
+    try:
+        value = float(text.replace("$", "").replace(",", "").strip())
+    except ValueError:
+        raise ValueError(f"{text.strip()!r} is not {what}") from None
+    if not math.isfinite(value) or value < 0:
+        raise ValueError(f"{text.strip()!r} is not a usable amount")
+    return value
+
+
+def _split_quantity(text):
+    # "12.5 sq ft" -> (12.5, "sq ft"); a leading number is required
+    text = text.strip()
+    end = 0
+    while end < len(text) and (text[end].isdigit() or text[end] in ".,"):
+        end += 1
+    if not end:
+        raise ValueError(f"{text!r} does not start with a quantity")
+    return _number(text[:end]), text[end:].strip()
+
+
+def parse_line_item(price_text):
+    """(quantity, unit, unit_price) from the part after the last " - " of a line.
+
+    Accepts "120", "$1,200.00", "12 x 15", "12x15", "2 boxes x 30",
+    "12 ft @ 3.50" or "3 hrs * 45". Raises ValueError for anything else.
+    """
+    text = price_text.strip()
+    separator = None
+    for separator in _QUANTITY_SEPARATOR.finditer(text):
+        pass
+    if separator is None:
+        return 1.0, "", _number(text, "a price")
+    quantity, unit = _split_quantity(text[:separator.start()])
+    return quantity, unit, _number(text[separator.end():], "a price")
+
+
+def parse_addons(text, keep_unpriced=True, issues=None):
+    """Parse add-on lines ("Name - Price" or "Name - Qty [unit] x Price") into LineItems.
+
+    Lines without a " - " price are kept as $0.00 items unless keep_unpriced
+    is False. Lines whose price does not parse are treated the same way and
+    also reported in issues (a list of ParseIssue) when one is passed. Each
+    line is scanned a constant number of times, so this is linear in text.
+    """
+    items = []
+    if not text:
+        return items
+    with stage("parse"):
+        for number, line in enumerate(text.splitlines(), 1):
+            if not line.strip():
+                continue
+            # Only a spaced dash separates the price, so "Re-seal" and "cu-yd" stay whole
+            name, separator, price_text = line.rpartition(" - ")
+            if separator:
+                try:
+                    quantity, unit, unit_price = parse_line_item(price_text)
+                    items.append(LineItem(name.strip(), quantity, unit, unit_price))
+                    continue
+                except ValueError as e:
+                    if issues is not None:
+                        issues.append(ParseIssue(number, line, str(e)))
+            if keep_unpriced:
+                items.append(LineItem(line.strip()))
+    count("line_items_total", len(items))
+    return items
+
+
+def calculate_quote(quote):
+    """Price a QuoteInput and return the QuoteResult breakdown.
+
+    Every amount is computed in integer cents (see money.py) under the
+    quote's tax rule, so the lines always add up to the totals exactly.
+    """
+    with stage("calculate"):
+        rule = tax_rule(quote.tax_rule)
+        rounding = rule.rounding
+        service = line_cents(quote.units, quote.rate_per_unit)
+        labor = line_cents(quote.labor_hours, quote.hourly_rate)
+        materials = to_cents(quote.material_cost)
+        travel = to_cents(quote.travel_cost)
+        addon_total = sum([addon.cents for addon in quote.addons]) if quote.addons else 0
+        subtotal = service + labor + materials + travel + addon_total
+
+        if rule.per_line:
+            lines = {"service": (service,), "labor": (labor,), "materials": (materials,), "travel": (travel,),
+                     "addons": [addon.cents for addon in quote.addons]}
+            discount = tax_due = 0
+            for kind, amounts in lines.items():
+                taxed = kind in rule.taxable
+                for amount in amounts:
+                    line_discount = percent_of(amount, quote.discount_rate, rounding)
+                    discount += line_discount
+                    if taxed:
+                        tax_due += percent_of(amount - line_discount, quote.tax_rate, rounding)
+        else:
+            discount = percent_of(subtotal, quote.discount_rate, rounding)
+            if rule.taxes_everything:
+                base = subtotal - discount
+            else:
+                lines = {"service": service, "labor": labor, "materials": materials, "travel": travel,
+                         "addons": addon_total}
+                taxed = sum(amount for kind, amount in lines.items() if kind in rule.taxable)
+                base = taxed - percent_of(taxed, quote.discount_rate, rounding)
+            tax_due = percent_of(base, quote.tax_rate, rounding)
+        taxable_amount = subtotal - discount
+
+    return QuoteResult(
+        service_cents=service,
+        labor_cents=labor,
+        materials_cents=materials,
+        travel_cents=travel,
+        addon_cents=addon_total,
+        subtotal_cents=subtotal,
+        discount_cents=discount,
+        taxable_cents=taxable_amount,
+        tax_cents=tax_due,
+        total_cents=taxable_amount + tax_due,
+    )
@@ -0,0 +1,318 @@
+"""Quote PDF layouts shared by the quote apps and the batch exporter.
+
+The fixed parts of each layout are BlockTemplates, compiled once per process,
+so a render only lays out the values that change from quote to quote.
+
+Each layout is a list of sections (header, job, services, add-ons, summary,
+footer) keyed by the text they print. render_quote_preview() draws them
+through a shared SectionCache, so while a form is being edited only the
+sections whose text changed are laid out again.
+"""
+
+from metrics import count, stage
+from money import format_cents, format_dollars
+from pdf_fonts import SANS, Document
+from pdf_layout import BlockTemplate, Cell, Ln, SectionCache, Style, draw_sections
+from pdf_render import pdf_to_bytes
+from pdf_table import Column, PagedTable
+from quote_engine import calculate_quote
+
+# Revu layout
+_REVU_HEADER = BlockTemplate([
+    Style(font=(SANS, "B", 16), text_color=(79, 139, 249)),
+    Cell(0, 10, slot="title", ln=1),
+    Style(font=(SANS, "", 12), text_color=(0, 0, 0)),
+    Ln(2),
+    # Quote Grid
+    Style(fill_color=(240,)),
+    Cell(60, 10, slot="quote_date", border=1, align="L", fill=True),
+    Cell(60, 10, slot="quote_number", border=1, align="L", fill=True),
+    Cell(60, 10, slot="valid_until", border=1, ln=1, align="L", fill=True),
+    Ln(2),
+    # Client Info
+    Style(font=(SANS, "B", 12)),
+    Cell(0, 10, "Customer Info", border=1, ln=1, fill=True),
+    Style(font=(SANS, "", 12)),
+    Cell(0, 10, slot="client_name", border=1, ln=1),
+])
+
+_REVU_SERVICES = BlockTemplate([
+    Style(font=(SANS, "B", 12), fill_color=(230,), text_color=(0, 0, 0)),
+    Cell(70, 10, "Description", 1, 0, "C", True),
+    Cell(30, 10, "Unit Price", 1, 0, "C", True),
+    Cell(30, 10, "Qty", 1, 0, "C", True),
+    Cell(30, 10, "Amount", 1, 1, "C", True),
+    Style(font=(SANS, "", 12)),
+    Cell(70, 10, slot="service", border=1),
+    Cell(30, 10, slot="rate_per_unit", border=1),
+    Cell(30, 10, slot="units", border=1),
+    Cell(30, 10, slot="service_amount", border=1, ln=1),
+])
+
+
+def _summary_rows(rows):
+    # Summary Table with alternating fill; a row label of None is a slot
+    items = [Style(font=(SANS, "", 12), text_color=(0, 0, 0))]
+    fill = False
+    for label, slot in rows:
+        items.append(Style(fill_color=(245,) if fill else (255,)))
+        if label is None:
+            items.append(Cell(60, 10, slot=slot + "_label", border=1, align="L", fill=True))
+        else:
+            items.append(Cell(60, 10, label + ":", 1, 0, "L", True))
+        items.append(Cell(100, 10, slot=slot, border=1, ln=1, align="L", fill=True))
+        fill = not fill
+    return items
+
+
+_REVU_SUMMARY = BlockTemplate(_summary_rows([
+    ("Material Cost", "material_cost"),
+    ("Labor", "labor"),
+    ("Travel Cost", "travel_cost"),
+    ("Subtotal", "subtotal"),
+    ("Discount", "discount"),
+    (None, "tax"),
+]) + [
+    # Total Due highlighted
+    Style(fill_color=(255, 255, 0), font=(SANS, "B", 12)),
+    Cell(60, 10, "Total Due:", 1, 0, "L", True),
+    Cell(100, 10, slot="total_due", border=1, ln=1, align="L", fill=True),
+])
+
+_REVU_ITEMS = PagedTable([
+    Column("Add-on", 70),
+    Column("Qty", 20, "R"),
+    Column("Unit", 20, "C"),
+    Column("Unit Price", 25, "R"),
+    Column("Amount", 25, "R"),
+], total_label="Add-ons Total")
+
+_REVU_FOOTER = BlockTemplate([
+    Style(font=(SANS, "I", 9)),
+    Cell(0, 10, "Generated with Revu", 0, 0, "R"),
+])
+
+# Cravix layout
+_CRAVIX_HEADER = BlockTemplate([
+    Style(font=(SANS, "B", 16), text_color=(0, 102, 255)),
+    Cell(0, 10, slot="title", ln=1, align="C"),
+    Style(font=(SANS, "", 12), text_color=(0,)),
+    Ln(10),
+    Style(fill_color=(230,)),
+    Cell(95, 10, slot="client_name", border=1),
+    Cell(95, 10, slot="client_email", border=1, ln=1),
+    Cell(95, 10, slot="quote_number", border=1),
+    Cell(95, 10, slot="quote_date", border=1, ln=1),
+    Style(fill_color=(173, 216, 230)),
+    Cell(190, 10, slot="valid_until", border=1, ln=1, fill=True),
+    Ln(5),
+])
+
+_CRAVIX_SERVICES = BlockTemplate([
+    Style(fill_color=(230,), font=(SANS, "B", 12), text_color=(0,)),
+    Cell(80, 10, "Description", 1, 0, "C", True),
+    Cell(40, 10, "Amount", 1, 1, "C", True),
+    Style(font=(SANS, "", 12)),
+    Cell(80, 10, slot="service", border=1),
+    Cell(40, 10, slot="service_amount", border=1, ln=1),
+    Cell(80, 10, "Material Cost", 1),
+    Cell(40, 10, slot="material_cost", border=1, ln=1),
+    Cell(80, 10, slot="labor_label", border=1),
+    Cell(40, 10, slot="labor", border=1, ln=1),
+    Cell(80, 10, "Travel Cost", 1),
+    Cell(40, 10, slot="travel_cost", border=1, ln=1),
+])
+
+_CRAVIX_TOTALS = BlockTemplate([
+    Style(fill_color=(230,), font=(SANS, "", 12), text_color=(0,)),
+    Cell(80, 10, "Subtotal", 1),
+    Cell(40, 10, slot="subtotal", border=1, ln=1),
+    Cell(80, 10, slot="tax_label", border=1),
+    Cell(40, 10, slot="tax", border=1, ln=1),
+    Style(fill_color=(255, 255, 0), font=(SANS, "B", 12)),
+    Cell(80, 10, "TOTAL DUE", 1, 0, "L", True),
+    Cell(40, 10, slot="total_due", border=1, ln=1, align="L", fill=True),
+])
+
+_CRAVIX_ITEMS = PagedTable([
+    Column("Additional Service", 42),
+    Column("Qty", 16, "R"),
+    Column("Unit", 18, "C"),
+    Column("Unit Price", 22, "R"),
+    Column("Amount", 22, "R"),
+], total_label="Additional Services Total")
+
+_CRAVIX_FOOTER = BlockTemplate([
+    Style(font=(SANS, "I", 9)),
+    Cell(0, 10, "Generated with Gravix", 0, 0, "R"),
+])
+
+
+def _quantity(value):
+    # 12.0 -> "12", 2.5 -> "2.5"
+    return f"{value:.2f}".rstrip("0").rstrip(".")
+
+
+def _footer_y(pdf):
+    # Footer branding sits 10mm under the content, but no lower than 265mm
+    if pdf.get_y() > 265:
+        pdf.set_y(265)
+    else:
+        pdf.set_y(pdf.get_y() + 10)
+
+
+def _render_block(pdf, template, *items):
+    template.render(pdf, **dict(items))
+
+
+def _block(name, template, **values):
+    # A section that renders template with values
+    return name, (template,) + tuple(values.items()), _render_block
+
+
+def _job_section(pdf, text, border, space):
+    pdf.multi_cell(0, 10, text, border=border)
+    pdf.ln(space)
+
+
+def _items_section(pdf, table, space_after, *rows):
+    pdf.ln(2)
+    table.draw(pdf, rows)
+    if space_after:
+        pdf.ln(space_after)
+
+
+def _footer_section(pdf, template):
+    _footer_y(pdf)
+    template.render(pdf)
+
+
+def quote_sections(quote, result):
+    """(name, inputs, draw) sections of the Revu layout, for pdf_layout.draw_sections()."""
+    sections = [
+        _block(
+            "header", _REVU_HEADER,
+            title=f"{quote.company_name or 'Service Provider'} - Service Quote",
+            quote_date=f"Date: {quote.quote_date.strftime('%m/%d/%Y')}",
+            quote_number=f"Quote #: {quote.quote_number}",
+            valid_until=f"Valid Until: {quote.valid_until.strftime('%m/%d/%Y')}",
+            client_name=f"Name: {quote.client_name}",
+        ),
+        ("job", (f"Job: {quote.job_description}", 1, 2), _job_section),
+        _block(
+            "services", _REVU_SERVICES,
+            service=f"{quote.unit_type} Work",
+            rate_per_unit=format_dollars(quote.rate_per_unit),
+            units=f"{quote.units}",
+            service_amount=format_cents(result.service_cents),
+        ),
+    ]
+    if quote.addons:
+        sections.append(("addons", (_REVU_ITEMS, 0) + tuple(
+            ((item.name, _quantity(item.quantity), item.unit, format_dollars(item.unit_price), format_cents(item.cents)),
+             item.cents)
+            for item in quote.addons
+        ), _items_section))
+    sections += [
+        # The total shares the summary grid's alternating fill, so the two
+        # are one section
+        _block(
+            "summary", _REVU_SUMMARY,
+            material_cost=format_cents(result.materials_cents),
+            labor=f"{quote.labor_hours} hrs @ {format_dollars(quote.hourly_rate)}/hr = {format_cents(result.labor_cents)}",
+            travel_cost=format_cents(result.travel_cents),
+            subtotal=format_cents(result.subtotal_cents),
+            discount=f"-{format_cents(result.discount_cents)}",
+            tax_label=f"Tax ({quote.tax_rate:.2f}%):",
+            tax=format_cents(result.tax_cents),
+            total_due=format_cents(result.total_cents),
+        ),
+        ("footer", (_REVU_FOOTER,), _footer_section),
+    ]
+    return sections
+
+
+def cravix_quote_sections(quote, result):
+    """(name, inputs, draw) sections of the Cravix layout."""
+    sections = [
+        _block(
+            "header", _CRAVIX_HEADER,
+            title=f"{quote.company_name} Service Quote",
+            client_name=f"Customer Name: {quote.client_name}",
+            client_email=f"Email: {quote.client_email}",
+            quote_number=f"Quote #: {quote.quote_number}",
+            quote_date=f"Quote Date: {quote.quote_date.strftime('%m/%d/%Y')}",
+            valid_until=f"Valid Until: {quote.valid_until.strftime('%m/%d/%Y')}",
+        ),
+        ("job", (f"Job Description: {quote.job_description}", 0, 5), _job_section),
+        _block(
+            "services", _CRAVIX_SERVICES,
+            service=f"Main Service ({quote.units} {quote.unit_type} x {format_dollars(quote.rate_per_unit)})",
+            service_amount=format_cents(result.service_cents),
+            material_cost=format_cents(result.materials_cents),
+            labor_label=f"Labor ({quote.labor_hours} x {format_dollars(quote.hourly_rate)})",
+            labor=format_cents(result.labor_cents),
+            travel_cost=format_cents(result.travel_cents),
+        ),
+    ]
+    if quote.addons:
+        sections.append(("addons", (_CRAVIX_ITEMS, 2) + tuple(
+            ((item.name, _quantity(item.quantity), item.unit, format_dollars(item.unit_price), format_cents(item.cents)),
+             item.cents)
+            for item in quote.addons
+        ), _items_section))
+    sections += [
+        _block(
+            "totals", _CRAVIX_TOTALS,
+            subtotal=format_cents(result.subtotal_cents),
+            tax_label=f"Tax ({quote.tax_rate:.2f}%)",
+            tax=format_cents(result.tax_cents),
+            total_due=format_cents(result.total_cents),
+        ),
+        ("footer", (_CRAVIX_FOOTER,), _footer_section),
+    ]
+    return sections
+
+
+def draw_quote(pdf, quote, result, cache=None):
+    """Lay out a priced quote in the Revu style on the current page of pdf."""
+    draw_sections(pdf, quote_sections(quote, result), cache)
+
+
+def draw_cravix_quote(pdf, quote, result, cache=None):
+    """Lay out a priced quote in the Cravix style on the current page of pdf."""
+    draw_sections(pdf, cravix_quote_sections(quote, result), cache)
+
+
+# Sections recorded by live previews, shared by every session in the process
+PREVIEW_SECTIONS = SectionCache()
+
+
+def build_quote_pdf(quote, result=None, style="revu", cache=None):
+    """Return an FPDF document for quote, pricing it first if needed.
+
+    With a SectionCache, sections drawn before with the same text are
+    replayed instead of laid out.
+    """
+    if result is None:
+        result = calculate_quote(quote)
+    with stage("build_pdf", kind="quote", style=style):
+        pdf = Document.for_text(quote)
+        pdf.add_page()
+        if style == "cravix":
+            draw_cravix_quote(pdf, quote, result, cache)
+        else:
+            draw_quote(pdf, quote, result, cache)
+    count("documents_total", kind="quote", style=style)
+    count("pages_total", pdf.page, kind="quote", style=style)
+    return pdf
+
+
+def render_quote_pdf(quote, result=None, style="revu"):
+    """Return the finished quote PDF as bytes."""
+    return pdf_to_bytes(build_quote_pdf(quote, result, style))
+
+
+def render_quote_preview(quote, result=None, style="revu"):
+    """Quote PDF bytes for a live preview; only changed sections are laid out."""
+    return pdf_to_bytes(build_quote_pdf(quote, result, style, PREVIEW_SECTIONS))
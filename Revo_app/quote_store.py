@@ -0,0 +1,390 @@
+"""SQLite store for submitted quotes and intakes.
+
+Every submission is kept as a structured row, with the columns people search
+by indexed and the full input kept as JSON. Totals are integer cents. PDFs
+are not stored; they are rendered again from the stored input when asked
+for. Intake photos are kept once per distinct content, keyed by SHA-256, in
+the photos table photo_store also uses.
+
+    python quote_store.py quotes --client "Jane Doe" --since 2026-07-01
+    python quote_store.py totals --since 2026-07-01 --until 2026-09-30
+    python quote_store.py pdf 42 quote.pdf
+"""
+
+import argparse
+import hashlib
+import io
+import json
+import os
+import sqlite3
+import threading
+from dataclasses import asdict, dataclass, replace
+from datetime import date, datetime
+
+from intake_pdf import IntakeInput, render_intake_pdf
+from money import format_cents, round_div
+from pdf_cache import stable_key
+from photo_store import PHOTO_SCHEMA
+from quote_engine import LineItem, QuoteInput, calculate_quote
+from quote_pdf import render_quote_pdf
+
+DEFAULT_PATH = "revu.db"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS quotes (
+    id INTEGER PRIMARY KEY,
+    input_key TEXT NOT NULL UNIQUE,
+    created_at TEXT NOT NULL,
+    style TEXT NOT NULL,
+    client_name TEXT NOT NULL COLLATE NOCASE,
+    quote_number TEXT NOT NULL,
+    quote_date TEXT NOT NULL,
+    total_due_cents INTEGER NOT NULL,
+    input TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS quotes_client ON quotes (client_name, quote_date, total_due_cents);
+CREATE INDEX IF NOT EXISTS quotes_number ON quotes (quote_number);
+CREATE INDEX IF NOT EXISTS quotes_date ON quotes (quote_date, total_due_cents);
+CREATE INDEX IF NOT EXISTS quotes_total ON quotes (total_due_cents);
+
+CREATE TABLE IF NOT EXISTS intakes (
+    id INTEGER PRIMARY KEY,
+    input_key TEXT NOT NULL UNIQUE,
+    created_at TEXT NOT NULL,
+    app TEXT NOT NULL,
+    client_name TEXT NOT NULL COLLATE NOCASE,
+    preferred_date TEXT NOT NULL,
+    input TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS intakes_client ON intakes (client_name, preferred_date);
+CREATE INDEX IF NOT EXISTS intakes_date ON intakes (preferred_date);
+
+CREATE TABLE IF NOT EXISTS intake_photos (
+    intake_id INTEGER NOT NULL REFERENCES intakes (id),
+    position INTEGER NOT NULL,
+    sha256 TEXT NOT NULL REFERENCES photos (sha256),
+    PRIMARY KEY (intake_id, position)
+);
+"""
+
+# Stores written before totals were kept in cents had a REAL total_due
+_MIGRATE_TOTALS = (
+    "DROP INDEX IF EXISTS quotes_client",
+    "DROP INDEX IF EXISTS quotes_date",
+    "DROP INDEX IF EXISTS quotes_total",
+    "ALTER TABLE quotes ADD COLUMN total_due_cents INTEGER NOT NULL DEFAULT 0",
+    "UPDATE quotes SET total_due_cents = CAST(ROUND(total_due * 100) AS INTEGER)",
+    "ALTER TABLE quotes DROP COLUMN total_due",
+)
+
+
+def _has_real_totals(db):
+    return "total_due" in {row[1] for row in db.execute("PRAGMA table_info(quotes)")}
+
+
+def _migrate(db):
+    # Converts an old store in place, once, before _SCHEMA builds indexes on
+    # the new column. The write lock is taken before checking again, so two
+    # processes opening the same old file migrate it only once
+    if not _has_real_totals(db):
+        return
+    db.execute("BEGIN IMMEDIATE")
+    try:
+        if _has_real_totals(db):
+            for statement in _MIGRATE_TOTALS:
+                db.execute(statement)
+    except BaseException:
+        db.rollback()
+        raise
+    db.commit()
+
+
+@dataclass(slots=True)
+class QuoteRecord:
+    id: int
+    created_at: str
+    style: str
+    client_name: str
+    quote_number: str
+    quote_date: date
+    total_cents: int
+
+
+@dataclass(slots=True)
+class IntakeRecord:
+    id: int
+    created_at: str
+    app: str
+    client_name: str
+    preferred_date: date
+
+
+def _to_json(value):
+    return json.dumps(asdict(value), default=date.isoformat, separators=(",", ":"))
+
+
+def _quote_from_json(text):
+    values = json.loads(text)
+    values["quote_date"] = date.fromisoformat(values["quote_date"])
+    values["valid_until"] = date.fromisoformat(values["valid_until"])
+    values["addons"] = [LineItem.from_dict(item) for item in values["addons"]]
+    return QuoteInput(**values)
+
+
+def _intake_from_json(text):
+    values = json.loads(text)
+    values["preferred_date"] = date.fromisoformat(values["preferred_date"])
+    return IntakeInput(**values)
+
+
+def _read_upload(upload):
+    if isinstance(upload, (bytes, bytearray, memoryview)):
+        return bytes(upload)
+    if hasattr(upload, "getvalue"):
+        return upload.getvalue()
+    upload.seek(0)
+    data = upload.read()
+    upload.seek(0)
+    return data
+
+
+# kind -> (table, date column, total column) for document_rows()
+_DOCUMENT_TABLES = {
+    "quote": ("quotes", "quote_date", "total_due_cents"),
+    "intake": ("intakes", "preferred_date", "NULL"),
+}
+
+
+def _date_range(column, since, until):
+    clauses, params = [], []
+    if since is not None:
+        clauses.append(f"{column} >= ?")
+        params.append(since.isoformat())
+    if until is not None:
+        clauses.append(f"{column} <= ?")
+        params.append(until.isoformat())
+    return clauses, params
+
+
+class QuoteStore:
+    """Quotes and intakes in one SQLite file (WAL mode, one connection per thread)."""
+
+    def __init__(self, path=None):
+        self.path = path or os.environ.get("REVU_DB_PATH") or DEFAULT_PATH
+        self._local = threading.local()
+        with self._connect() as db:
+            _migrate(db)
+            db.executescript(PHOTO_SCHEMA + _SCHEMA)
+
+    def _connect(self):
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=10)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.execute("PRAGMA foreign_keys=ON")
+            self._local.db = db
+        return db
+
+    def close(self):
+        db = getattr(self._local, "db", None)
+        if db is not None:
+            db.close()
+            self._local.db = None
+
+    # Quotes
+    def save_quote(self, quote, result=None, style="revu"):
+        """Record a quote and return its id; resubmitting identical input returns the existing id."""
+        if result is None:
+            result = calculate_quote(quote)
+        key = stable_key("quote", style, quote)
+        with self._connect() as db:
+            db.execute(
+                "INSERT OR IGNORE INTO quotes (input_key, created_at, style, client_name, quote_number,"
+                " quote_date, total_due_cents, input) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, datetime.now().isoformat(timespec="seconds"), style, quote.client_name,
+                 quote.quote_number, quote.quote_date.isoformat(), result.total_cents, _to_json(quote)),
+            )
+            return db.execute("SELECT id FROM quotes WHERE input_key = ?", (key,)).fetchone()[0]
+
+    def get_quote(self, quote_id):
+        """(QuoteInput, style) for a stored quote."""
+        row = self._connect().execute("SELECT input, style FROM quotes WHERE id = ?", (quote_id,)).fetchone()
+        if row is None:
+            raise KeyError(f"No quote with id {quote_id}")
+        return _quote_from_json(row[0]), row[1]
+
+    def find_quotes(self, client=None, quote_number=None, since=None, until=None,
+                    min_cents=None, max_cents=None, limit=100):
+        """Newest-first QuoteRecords matching every filter given. client matches case-insensitively.
+
+        min_cents and max_cents bound the total due, in cents.
+        """
+        clauses, params = _date_range("quote_date", since, until)
+        if client is not None:
+            clauses.append("client_name = ?")
+            params.append(client)
+        if quote_number is not None:
+            clauses.append("quote_number = ?")
+            params.append(quote_number)
+        if min_cents is not None:
+            clauses.append("total_due_cents >= ?")
+            params.append(min_cents)
+        if max_cents is not None:
+            clauses.append("total_due_cents <= ?")
+            params.append(max_cents)
+        where = " WHERE " + " AND ".join(clauses) if clauses else ""
+        rows = self._connect().execute(
+            "SELECT id, created_at, style, client_name, quote_number, quote_date, total_due_cents FROM quotes"
+            f"{where} ORDER BY quote_date DESC, id DESC LIMIT ?",
+            params + [limit],
+        )
+        return [QuoteRecord(*row[:5], date.fromisoformat(row[5]), row[6]) for row in rows]
+
+    def quote_totals(self, client=None, since=None, until=None):
+        """(count, sum, average) of the total due over the matching quotes, in int cents.
+
+        The average is rounded half up to the cent.
+        """
+        clauses, params = _date_range("quote_date", since, until)
+        if client is not None:
+            clauses.append("client_name = ?")
+            params.append(client)
+        where = " WHERE " + " AND ".join(clauses) if clauses else ""
+        count, cents = self._connect().execute(
+            f"SELECT COUNT(*), COALESCE(SUM(total_due_cents), 0) FROM quotes{where}",
+            params,
+        ).fetchone()
+        return count, cents, round_div(cents, count) if count else 0
+
+    def render_quote(self, quote_id):
+        """Regenerate the PDF for a stored quote."""
+        quote, style = self.get_quote(quote_id)
+        return render_quote_pdf(quote, style=style)
+
+    # Both
+    def document_rows(self, kind, since=None, until=None, after=0, page=500):
+        """Yield (id, client_name, date, total_cents) for stored quotes or intakes, in id order.
+
+        kind is "quote" or "intake"; intakes have no total. Rows are fetched a
+        page at a time, each page starting after the last id seen, so no
+        cursor stays open and a caller can resume from any id.
+        """
+        table, date_column, total = _DOCUMENT_TABLES[kind]
+        clauses, params = _date_range(date_column, since, until)
+        where = "".join(f" AND {clause}" for clause in clauses)
+        while True:
+            rows = self._connect().execute(
+                f"SELECT id, client_name, {date_column}, {total} FROM {table} WHERE id > ?{where} ORDER BY id LIMIT ?",
+                [after] + params + [page],
+            ).fetchall()
+            yield from rows
+            if len(rows) < page:
+                return
+            after = rows[-1][0]
+
+    # Intakes
+    def save_intake(self, intake, app="cravix"):
+        """Record an intake and its photos and return its id."""
+        key = stable_key("intake", app, intake)
+        photos = [_read_upload(upload) for upload in intake.photos]
+        with self._connect() as db:
+            cursor = db.execute(
+                "INSERT OR IGNORE INTO intakes (input_key, created_at, app, client_name, preferred_date, input)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (key, datetime.now().isoformat(timespec="seconds"), app, intake.client_name,
+                 intake.preferred_date.isoformat(), _to_json(replace(intake, photos=[]))),
+            )
+            intake_id = db.execute("SELECT id FROM intakes WHERE input_key = ?", (key,)).fetchone()[0]
+            if cursor.rowcount:
+                for position, data in enumerate(photos):
+                    digest = hashlib.sha256(data).hexdigest()
+                    db.execute("INSERT OR IGNORE INTO photos (sha256, data) VALUES (?, ?)", (digest, data))
+                    db.execute("INSERT INTO intake_photos (intake_id, position, sha256) VALUES (?, ?, ?)",
+                               (intake_id, position, digest))
+            return intake_id
+
+    def get_intake(self, intake_id):
+        """(IntakeInput, app) for a stored intake, with its photos as in-memory files."""
+        db = self._connect()
+        row = db.execute("SELECT input, app FROM intakes WHERE id = ?", (intake_id,)).fetchone()
+        if row is None:
+            raise KeyError(f"No intake with id {intake_id}")
+        intake = _intake_from_json(row[0])
+        intake.photos = [io.BytesIO(data) for (data,) in db.execute(
+            "SELECT data FROM intake_photos JOIN photos USING (sha256) WHERE intake_id = ? ORDER BY position",
+            (intake_id,),
+        )]
+        return intake, row[1]
+
+    def find_intakes(self, client=None, since=None, until=None, limit=100):
+        """Newest-first IntakeRecords, filtered on client name and preferred date."""
+        clauses, params = _date_range("preferred_date", since, until)
+        if client is not None:
+            clauses.append("client_name = ?")
+            params.append(client)
+        where = " WHERE " + " AND ".join(clauses) if clauses else ""
+        rows = self._connect().execute(
+            "SELECT id, created_at, app, client_name, preferred_date FROM intakes"
+            f"{where} ORDER BY preferred_date DESC, id DESC LIMIT ?",
+            params + [limit],
+        )
+        return [IntakeRecord(*row[:4], date.fromisoformat(row[4])) for row in rows]
+
+    def render_intake(self, intake_id):
+        """Regenerate the PDF for a stored intake in the layout of the app that took it."""
+        intake, app = self.get_intake(intake_id)
+        return render_intake_pdf(intake, style=app)
+
+
+_default = None
+_default_lock = threading.Lock()
+
+
+def default_store():
+    """The process-wide QuoteStore at $REVU_DB_PATH, opened on first use."""
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = QuoteStore()
+        return _default
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Look up stored quotes and intakes.")
+    parser.add_argument("--db", help=f"database file (default $REVU_DB_PATH or {DEFAULT_PATH})")
+    commands = parser.add_subparsers(dest="command", required=True)
+    for name in ("quotes", "intakes", "totals"):
+        command = commands.add_parser(name)
+        command.add_argument("--client")
+        command.add_argument("--since", type=date.fromisoformat)
+        command.add_argument("--until", type=date.fromisoformat)
+        if name == "quotes":
+            command.add_argument("--number")
+        if name != "totals":
+            command.add_argument("--limit", type=int, default=50)
+    pdf = commands.add_parser("pdf", help="regenerate a stored PDF")
+    pdf.add_argument("id", type=int)
+    pdf.add_argument("output")
+    pdf.add_argument("--intake", action="store_true", help="id is an intake, not a quote")
+    args = parser.parse_args(argv)
+
+    store = QuoteStore(args.db)
+    if args.command == "quotes":
+        for record in store.find_quotes(args.client, args.number, args.since, args.until, limit=args.limit):
+            print(f"{record.id}\t{record.quote_date}\t{record.quote_number}\t{record.client_name}\t{format_cents(record.total_cents)}")
+    elif args.command == "intakes":
+        for record in store.find_intakes(args.client, args.since, args.until, limit=args.limit):
+            print(f"{record.id}\t{record.preferred_date}\t{record.app}\t{record.client_name}")
+    elif args.command == "totals":
+        count, total, average = store.quote_totals(args.client, args.since, args.until)
+        print(f"{count} quotes, {format_cents(total)} total, {format_cents(average)} average")
+    else:
+        data = store.render_intake(args.id) if args.intake else store.render_quote(args.id)
+        with open(args.output, "wb") as f:
+            f.write(data)
+        print(f"Wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+"""NumPy pricing for whole columns of quotes at once.
+
+calculate_quote_arrays() runs the same integer-cent arithmetic as
+quote_engine.calculate_quote(), on int64 columns, so every element matches
+the scalar path exactly; results are int64 cents, like QuoteResult's
+fields. sweep_totals() builds on it for what-if runs such
+as "what does moving the rate from $0.90 to $1.20 do to revenue across the
+whole client book".
+
+Per-line tax rules round on every add-on, which needs the individual lines;
+price those with calculate_quote(). Lines are limited to $400 million so
+the fixed-point products fit in int64; below $900,000 they are computed in
+float64, where whole numbers under 2**53 are exact.
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+
+from money import CENT, HALF_UP, PRICE_SCALE, QTY_SCALE, RATE_SCALE, tax_rule
+
+_INPUT_COLUMNS = ("units", "rate_per_unit", "material_cost", "labor_hours", "hourly_rate",
+                  "travel_cost", "addon_total", "discount_rate", "tax_rate")
+_MAX_LINE = 4e8
+_MAX_FLOAT_LINE = 9e5
+
+
+@dataclass
+class QuoteArrays:
+    """QuoteResult's fields as int64 columns of cents."""
+
+    service_cents: np.ndarray
+    labor_cents: np.ndarray
+    materials_cents: np.ndarray
+    travel_cents: np.ndarray
+    addon_cents: np.ndarray
+    subtotal_cents: np.ndarray
+    discount_cents: np.ndarray
+    taxable_cents: np.ndarray
+    tax_cents: np.ndarray
+    total_cents: np.ndarray
+
+
+def quote_columns(quotes):
+    """Turn a sequence of QuoteInput into a dict of float64 input columns."""
+    quotes = list(quotes)
+    columns = {}
+    for name in _INPUT_COLUMNS:
+        if name == "addon_total":
+            values = [sum(addon.cents for addon in q.addons) / 100 for q in quotes]
+        else:
+            values = [getattr(q, name) for q in quotes]
+        columns[name] = np.asarray(values, dtype=np.float64)
+    return columns
+
+
+def _fixed(values, scale, dtype):
+    scaled = np.rint(values * scale)
+    return scaled if dtype is np.float64 else scaled.astype(np.int64)
+
+
+def _floor_div(numerator, denominator):
+    # Overwrites numerator, which is always a temporary here
+    if numerator.dtype.kind == "i":
+        return numerator // denominator
+    if numerator.ndim:
+        numerator /= denominator
+        return np.floor(numerator, out=numerator)
+    return np.floor(numerator / denominator)
+
+
+def _round_div(numerator, denominator, rounding, signed):
+    # money.round_div() for whole-number arrays; denominator is a positive even int
+    if rounding == HALF_UP:
+        if not signed:
+            return _floor_div(numerator + denominator // 2, denominator)
+        return np.sign(numerator) * _floor_div(np.abs(numerator) + denominator // 2, denominator)
+    quotient = _floor_div(numerator.copy(), denominator)
+    twice = 2 * (numerator - quotient * denominator)
+    return quotient + ((twice > denominator) | ((twice == denominator) & (quotient % 2 == 1)))
+
+
+def _price_cents(rule, units, rate_per_unit, material_cost=0.0, labor_hours=0.0, hourly_rate=0.0,
+                 travel_cost=0.0, addon_total=0.0, discount_rate=0.0, tax_rate=0.0):
+    inputs = [np.asarray(values, dtype=np.float64) for values in (
+        units, rate_per_unit, material_cost, labor_hours, hourly_rate, travel_cost, addon_total,
+        discount_rate, tax_rate)]
+    units, rate_per_unit, material_cost, labor_hours, hourly_rate, travel_cost, addon_total, \
+        discount_rate, tax_rate = inputs
+
+    def largest(values):
+        return max(-values.min(initial=0.0), values.max(initial=0.0))
+
+    # Typical books are all non-negative with discounts up to 100%; every
+    # numerator below is then non-negative and rounding is one add and divide
+    signed = any(values.min(initial=0.0) < 0 for values in inputs[:-2]) or largest(discount_rate) > 100
+    line = max(largest(units) * largest(rate_per_unit), largest(labor_hours) * largest(hourly_rate),
+               largest(material_cost), largest(travel_cost), largest(addon_total))
+    if line >= _MAX_LINE:
+        raise OverflowError("Line amount too large for int64 pricing; use calculate_quote()")
+    # Whole numbers below 2**53 are exact in float64 and its division is
+    # much faster than int64's; bigger books fall back to int64
+    exact_in_float = line < _MAX_FLOAT_LINE and max(largest(discount_rate), largest(tax_rate)) <= 1000
+    dtype = np.float64 if exact_in_float else np.int64
+
+    # Line amounts always round HALF_UP, as in money.line_cents()
+    line_divisor = QTY_SCALE * CENT
+    service = _round_div(_fixed(units, QTY_SCALE, dtype) * _fixed(rate_per_unit, PRICE_SCALE, dtype),
+                         line_divisor, HALF_UP, signed)
+    labor = _round_div(_fixed(labor_hours, QTY_SCALE, dtype) * _fixed(hourly_rate, PRICE_SCALE, dtype),
+                       line_divisor, HALF_UP, signed)
+    materials = _round_div(_fixed(material_cost, PRICE_SCALE, dtype), CENT, HALF_UP, signed)
+    travel = _round_div(_fixed(travel_cost, PRICE_SCALE, dtype), CENT, HALF_UP, signed)
+    addons = _round_div(_fixed(addon_total, PRICE_SCALE, dtype), CENT, HALF_UP, signed)
+    subtotal = service + labor + materials + travel + addons
+
+    def percent_of(cents, rate):
+        return _round_div(cents * _fixed(rate, RATE_SCALE, dtype), 100 * RATE_SCALE, rule.rounding, signed)
+
+    discount = percent_of(subtotal, discount_rate)
+    if rule.taxes_everything:
+        base = subtotal - discount
+    else:
+        lines = {"service": service, "labor": labor, "materials": materials, "travel": travel, "addons": addons}
+        taxed = sum((lines[kind] for kind in rule.taxable), np.zeros_like(subtotal))
+        base = taxed - percent_of(taxed, discount_rate)
+    tax_due = percent_of(base, tax_rate)
+    taxable_amount = subtotal - discount
+    return {
+        "service_cents": service,
+        "labor_cents": labor,
+        "materials_cents": np.broadcast_to(materials, subtotal.shape),
+        "travel_cents": np.broadcast_to(travel, subtotal.shape),
+        "addon_cents": np.broadcast_to(addons, subtotal.shape),
+        "subtotal_cents": subtotal,
+        "discount_cents": discount,
+        "taxable_cents": taxable_amount,
+        "tax_cents": tax_due,
+        "total_cents": taxable_amount + tax_due,
+    }
+
+
+def _rule(name):
+    rule = tax_rule(name)
+    if rule.per_line:
+        raise ValueError(f"Tax rule {rule.name!r} rounds per line; price those quotes with calculate_quote()")
+    return rule
+
+
+def calculate_quote_arrays(units, rate_per_unit, material_cost=0.0, labor_hours=0.0, hourly_rate=0.0,
+                           travel_cost=0.0, addon_total=0.0, discount_rate=0.0, tax_rate=0.0,
+                           tax_rule="default"):
+    """Price columns of inputs in one pass; scalars and arrays broadcast together.
+
+    addon_total is each quote's add-on total in dollars (already whole cents).
+    """
+    cents = _price_cents(_rule(tax_rule), units, rate_per_unit, material_cost, labor_hours, hourly_rate,
+                         travel_cost, addon_total, discount_rate, tax_rate)
+    return QuoteArrays(**{name: values.astype(np.int64) for name, values in cents.items()})
+
+
+def sweep_totals(columns, tax_rule="default", **scenarios):
+    """Total revenue of the book under each scenario, in int cents.
+
+    columns is the output of quote_columns(). Each keyword names an input
+    column and gives one value per scenario, e.g.
+    sweep_totals(cols, rate_per_unit=np.linspace(0.90, 1.20, 31)). Scenario
+    arrays broadcast against each other, and the result has one summed
+    total_cents per scenario.
+    """
+    unknown = set(scenarios) - set(_INPUT_COLUMNS)
+    if unknown:
+        raise ValueError(f"Unknown quote columns: {', '.join(sorted(unknown))}")
+
+    values = np.broadcast_arrays(*(np.asarray(v, dtype=np.float64) for v in scenarios.values()))
+    inputs = dict(columns)
+    for name, value in zip(scenarios, values):
+        # One row per scenario, one column per quote
+        inputs[name] = value.reshape(-1, 1)
+    # Summed in cents, so a book of any size totals exactly
+    return _price_cents(_rule(tax_rule), **inputs)["total_cents"].astype(np.int64).sum(axis=-1)
@@ -0,0 +1,320 @@
+"""Background rendering of quote, intake and job packet PDFs.
+
+A JobQueue renders documents on a fixed number of worker threads. A
+submission with many photos then no longer holds the Streamlit script
+thread for the whole render, and a burst of submissions waits its turn
+instead of taking every core from the people still typing. While a job
+runs, its stats report the photos prepared and the pages laid out so far.
+Callers poll get() until the job is finished, then read its bytes.
+
+With a database path, jobs are also kept in SQLite. Finished PDFs stay
+available after a restart. Jobs that were queued or running when the
+process stopped are rendered again the next time the queue opens, provided
+they were submitted with the id of their stored intake or quote; packets
+pair two documents, so they are marked failed instead. Finished jobs, PDF
+and all, are deleted from the database once they are max_age seconds old.
+
+    REVU_JOB_WORKERS=2          renders running at once (default 2)
+    REVU_JOB_DB=jobs.db         also keep jobs in this SQLite file
+    REVU_JOB_KEEP_DAYS=7        days finished jobs stay in the database
+"""
+
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field, replace
+
+from intake_pdf import DocumentStats, render_intake_pdf
+from metrics import count, stage
+from packet_pdf import render_packet_pdf
+from pdf_cache import PDF_CACHE
+from pdf_render import pdf_to_bytes
+from quote_pdf import build_quote_pdf
+from quote_store import default_store
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+DEFAULT_WORKERS = 2
+DEFAULT_MAX_AGE = 7 * 86400
+# Old jobs are pruned when the queue opens, then at most this often
+PRUNE_EVERY = 3600
+# Stats of cached renders outlive their jobs; they are small, so keep many
+STATS_KEEP = 4096
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS render_jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    style TEXT NOT NULL,
+    key TEXT NOT NULL,
+    document_id INTEGER,
+    status TEXT NOT NULL,
+    error TEXT NOT NULL,
+    photos INTEGER NOT NULL,
+    photos_total INTEGER NOT NULL,
+    pages INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    finished_at REAL,
+    pdf BLOB
+);
+CREATE INDEX IF NOT EXISTS render_jobs_status ON render_jobs (status, created_at);
+"""
+
+
+@dataclass
+class Job:
+    """One quote or intake render; stats fill in while it runs."""
+
+    id: str
+    kind: str
+    style: str
+    key: str = ""
+    document_id: int = None
+    status: str = QUEUED
+    stats: DocumentStats = field(default_factory=DocumentStats)
+    error: str = ""
+    created_at: float = field(default_factory=time.time)
+    finished_at: float = None
+    data: bytes = field(default=None, repr=False)
+    done: threading.Event = field(default_factory=threading.Event, repr=False, compare=False)
+
+    @property
+    def finished(self):
+        return self.status in (DONE, FAILED)
+
+    @property
+    def progress(self):
+        """(photos prepared, photos in total, pages laid out) so far."""
+        return self.stats.photos, self.stats.photos_total, self.stats.pages
+
+
+class JobQueue:
+    """Render jobs on `workers` threads, remembering the last `keep` finished ones. Thread-safe."""
+
+    def __init__(self, workers=DEFAULT_WORKERS, path=None, store=None, keep=256, max_age=DEFAULT_MAX_AGE):
+        self.workers = workers
+        self.path = path
+        self.keep = keep
+        self.max_age = max_age
+        self._pruned_at = 0.0
+        self._store = store
+        self._pool = ThreadPoolExecutor(workers, thread_name_prefix="render-job")
+        self._lock = threading.Lock()
+        self._jobs = OrderedDict()
+        self._by_key = {}
+        self._stats = OrderedDict()
+        self._local = threading.local()
+        if path:
+            with self._connect() as db:
+                db.executescript(_SCHEMA)
+            self._prune()
+            self._resume()
+
+    @classmethod
+    def from_env(cls):
+        days = os.environ.get("REVU_JOB_KEEP_DAYS")
+        return cls(int(os.environ.get("REVU_JOB_WORKERS") or DEFAULT_WORKERS), os.environ.get("REVU_JOB_DB") or None,
+                   max_age=float(days) * 86400 if days else DEFAULT_MAX_AGE)
+
+    def submit(self, kind, value=None, style="cravix", key="", document_id=None):
+        """Queue a render and return the job id.
+
+        kind is "intake" (value an IntakeInput), "quote" (value a
+        QuoteInput, or a (QuoteInput, QuoteResult) pair) or "packet" (value
+        an (IntakeInput, QuoteInput) pair). value may be left out when
+        document_id names an intake or quote in the QuoteStore. A key,
+        usually the stable_key of the inputs, joins an identical submission
+        to the job already under way and files the bytes in PDF_CACHE; a job
+        served from PDF_CACHE gets the stats of the render that filled it.
+        """
+        if kind not in ("intake", "quote", "packet"):
+            raise ValueError(f"Unknown job kind: {kind!r}")
+        if value is None and (document_id is None or kind == "packet"):
+            raise ValueError("A job needs a value or a document_id")
+        with self._lock:
+            existing = self._jobs.get(self._by_key.get(key)) if key else None
+            if existing is not None and existing.status != FAILED:
+                return existing.id
+            job = Job(uuid.uuid4().hex, kind, style, key, document_id)
+            self._remember(job)
+        cached = PDF_CACHE.get(key) if key else None
+        if cached is not None:
+            job.stats = self._cached_stats(key, cached)
+            self._finish(job, cached)
+        else:
+            self._record(job)
+            self._pool.submit(self._run, job, value)
+        count("jobs_submitted_total", kind=kind, style=style)
+        return job.id
+
+    def get(self, job_id):
+        """The Job with job_id, from memory or the database; None if unknown."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None and self.path:
+            job = self._load(job_id)
+        return job
+
+    def wait(self, job_id, timeout=None):
+        """Block until the job is finished (or timeout seconds pass) and return it."""
+        job = self.get(job_id)
+        if job is not None:
+            job.done.wait(timeout)
+        return job
+
+    def pending(self):
+        """Jobs queued or running in this process."""
+        with self._lock:
+            return sum(not job.finished for job in self._jobs.values())
+
+    def shutdown(self, wait=True):
+        self._pool.shutdown(wait=wait, cancel_futures=not wait)
+
+    # Workers
+    def _run(self, job, value):
+        job.status = RUNNING
+        self._record(job)
+        try:
+            if value is None:
+                value = self._stored_value(job)
+            with stage("job", kind=job.kind, style=job.style):
+                if job.kind == "intake":
+                    data = render_intake_pdf(value, job.stats, job.style)
+                elif job.kind == "packet":
+                    intake, quote = value
+                    data = render_packet_pdf(intake, quote, stats=job.stats, style=job.style)
+                else:
+                    quote, result = value if isinstance(value, tuple) else (value, None)
+                    pdf = build_quote_pdf(quote, result, job.style)
+                    job.stats.pages = pdf.page
+                    data = pdf_to_bytes(pdf)
+                    job.stats.output_bytes = len(data)
+        except Exception as e:
+            job.error = f"{type(e).__name__}: {e}"
+            self._finish(job, None)
+        else:
+            if job.key:
+                PDF_CACHE.put(job.key, data)
+                with self._lock:
+                    self._stats[job.key] = job.stats
+                    self._stats.move_to_end(job.key)
+                    while len(self._stats) > STATS_KEEP:
+                        self._stats.popitem(last=False)
+            self._finish(job, data)
+
+    def _cached_stats(self, key, data):
+        # A copy, so the jobs sharing a key never share a photo_digests list.
+        # Bytes rendered before a restart report what the database kept
+        with self._lock:
+            stats = self._stats.get(key)
+            if stats is not None:
+                self._stats.move_to_end(key)
+        if stats is not None:
+            return replace(stats, photo_digests=list(stats.photo_digests))
+        stats = DocumentStats(output_bytes=len(data))
+        if self.path:
+            row = self._connect().execute(
+                "SELECT photos, photos_total, pages FROM render_jobs WHERE key = ? AND status = ?"
+                " ORDER BY finished_at DESC LIMIT 1",
+                (key, DONE),
+            ).fetchone()
+            if row is not None:
+                stats.photos, stats.photos_total, stats.pages = row
+        return stats
+
+    def _stored_value(self, job):
+        store = self._store or default_store()
+        if job.kind == "intake":
+            return store.get_intake(job.document_id)[0]
+        if job.kind == "quote":
+            return store.get_quote(job.document_id)[0]
+        raise ValueError(f"A {job.kind} job cannot be rendered from a stored document")
+
+    def _finish(self, job, data):
+        job.data = data
+        job.status = FAILED if data is None else DONE
+        job.finished_at = time.time()
+        self._record(job)
+        job.done.set()
+        count("jobs_total", kind=job.kind, style=job.style, status=job.status)
+        if self.path and job.finished_at - self._pruned_at > PRUNE_EVERY:
+            self._prune()
+
+    def _remember(self, job):
+        # Caller holds the lock. Finished jobs past keep are dropped oldest
+        # first; unfinished ones always stay
+        self._jobs[job.id] = job
+        if job.key:
+            self._by_key[job.key] = job.id
+        if len(self._jobs) > self.keep:
+            for old in [j for j in self._jobs.values() if j.finished][:len(self._jobs) - self.keep]:
+                del self._jobs[old.id]
+                if self._by_key.get(old.key) == old.id:
+                    del self._by_key[old.key]
+
+    # SQLite
+    def _connect(self):
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=10)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            self._local.db = db
+        return db
+
+    def _record(self, job):
+        if not self.path:
+            return
+        with self._connect() as db:
+            db.execute(
+                "INSERT OR REPLACE INTO render_jobs (id, kind, style, key, document_id, status, error, photos,"
+                " photos_total, pages, created_at, finished_at, pdf) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (job.id, job.kind, job.style, job.key, job.document_id, job.status, job.error, job.stats.photos,
+                 job.stats.photos_total, job.stats.pages, job.created_at, job.finished_at, job.data),
+            )
+
+    def _load(self, job_id):
+        row = self._connect().execute(
+            "SELECT id, kind, style, key, document_id, status, error, photos, photos_total, pages, created_at,"
+            " finished_at, pdf FROM render_jobs WHERE id = ?",
+            (job_id,),
+        ).fetchone()
+        if row is None:
+            return None
+        stats = DocumentStats(photos=row[7], photos_total=row[8], pages=row[9],
+                              output_bytes=len(row[12]) if row[12] else 0)
+        job = Job(*row[:5], status=row[5], stats=stats, error=row[6], created_at=row[10], finished_at=row[11],
+                  data=row[12])
+        if job.finished:
+            job.done.set()
+        return job
+
+    def _prune(self):
+        # Finished jobs past max_age go, PDF and all; unfinished ones never do
+        self._pruned_at = time.time()
+        with self._connect() as db:
+            pruned = db.execute("DELETE FROM render_jobs WHERE status IN (?, ?) AND created_at < ?",
+                                (DONE, FAILED, self._pruned_at - self.max_age)).rowcount
+        if pruned:
+            count("jobs_pruned_total", pruned)
+
+    def _resume(self):
+        # Jobs left unfinished by a previous process
+        ids = [job_id for (job_id,) in self._connect().execute(
+            "SELECT id FROM render_jobs WHERE status IN (?, ?) ORDER BY created_at", (QUEUED, RUNNING))]
+        for job_id in ids:
+            job = self._load(job_id)
+            job.status, job.stats = QUEUED, DocumentStats()
+            with self._lock:
+                self._remember(job)
+            if job.document_id is None:
+                job.error = "Interrupted before it finished; the input was not stored"
+                self._finish(job, None)
+            elif job.kind == "packet":
+                job.error = "Interrupted before it finished; packets are not rendered again from the store"
+                self._finish(job, None)
+            else:
+                self._pool.submit(self._run, job, None)
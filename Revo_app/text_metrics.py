@@ -0,0 +1,123 @@
+"""Fast text measurement that wraps lines exactly like FPDF's multi_cell.
+
+Glyph widths come from the font's own width table and are cached per font
+together with the widths of whole words, so measuring a long note costs one
+dict lookup per word instead of one get_string_width() call per character.
+"""
+
+from collections import OrderedDict
+
+_WORD_CACHE_SIZE = 4096
+
+
+class FontMetrics:
+    """Widths for one font in 1/1000 em units, independent of point size."""
+
+    def __init__(self, font):
+        widths = font["cw"]
+        if isinstance(widths, dict):
+            self._glyphs = dict(widths)
+            self.max_width = max(widths.values())
+        else:
+            # Unicode TTF fonts keep a list indexed by code point
+            missing = font.get("desc", {}).get("MissingWidth", 0)
+            self._glyphs = _CodePointWidths(widths, missing)
+            self.max_width = max(max(widths, default=0), missing)
+        self._words = OrderedDict()
+
+    def glyph_width(self, char):
+        return self._glyphs.get(char, 0)
+
+    def word_width(self, word):
+        words = self._words
+        width = words.get(word)
+        if width is None:
+            get = self._glyphs.get
+            width = sum(get(char, 0) for char in word)
+            words[word] = width
+            if len(words) > _WORD_CACHE_SIZE:
+                words.popitem(last=False)
+        return width
+
+
+class _CodePointWidths(dict):
+    def __init__(self, widths, missing):
+        super().__init__()
+        self._widths = widths
+        self._missing = missing
+
+    def __missing__(self, char):
+        code = ord(char)
+        width = self._widths[code] if code < len(self._widths) else self._missing
+        self[char] = width
+        return width
+
+    def get(self, char, default=None):
+        return self[char]
+
+
+_METRICS = {}
+
+
+def font_metrics(pdf):
+    """Cached FontMetrics for pdf's currently selected font."""
+    font = pdf.current_font
+    key = font.get("ttffile") or font["name"]
+    metrics = _METRICS.get(key)
+    if metrics is None:
+        metrics = _METRICS[key] = FontMetrics(font)
+    return metrics
+
+
+def _split_long_word(metrics, word, wmax):
+    # Break a word that is wider than the cell at character level, the way
+    # multi_cell does when there is no space to break at. Returns the number
+    # of extra lines and the width left on the last one.
+    lines = 0
+    width = 0
+    glyph = metrics.glyph_width
+    start = True
+    for char in word:
+        char_width = glyph(char)
+        if width + char_width > wmax and not start:
+            lines += 1
+            width = 0
+        width += char_width
+        start = False
+    return lines, width
+
+
+def count_lines(pdf, text, width):
+    """Number of lines multi_cell(width, ...) will use for text with pdf's current font."""
+    if width == 0:
+        width = pdf.w - pdf.r_margin - pdf.x
+    wmax = (width - 2 * pdf.c_margin) * 1000.0 / pdf.font_size
+    metrics = font_metrics(pdf)
+    if metrics.max_width > wmax:
+        # Cells narrower than a single glyph trip odd corner cases in
+        # multi_cell (empty lines after lone glyphs); let FPDF count those
+        return len(pdf.multi_cell(width, 0, text, split_only=True))
+
+    text = text.replace("\r", "")
+    if text.endswith("\n"):
+        text = text[:-1]
+    space = metrics.glyph_width(" ")
+    lines = 0
+    for paragraph in text.split("\n"):
+        lines += 1
+        line_width = 0
+        line_empty = True
+        for word in paragraph.split(" "):
+            word_width = metrics.word_width(word)
+            if not line_empty and line_width + space + word_width <= wmax:
+                line_width += space + word_width
+                continue
+            if not line_empty:
+                lines += 1
+            if word_width <= wmax:
+                line_width = word_width
+            else:
+                extra, line_width = _split_long_word(metrics, word, wmax)
+                lines += extra
+            line_empty = False
+    return lines
@@ -0,0 +1,6 @@
+import os
+import sys
+
+# The app modules import each other as top-level modules, as they do when
+# Streamlit runs them from Revo_app/
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Revo_app"))
@@ -0,0 +1,87 @@
+import csv
+import io
+import json
+import os
+import zipfile
+
+import pytest
+
+import batch_quotes
+from batch_quotes import quote_from_row, read_quotes, run_batch
+from money import format_cents
+from quote_engine import QuoteInput, calculate_quote
+
+
+def test_quote_from_row_parses_each_field_kind():
+    quote = quote_from_row({"client_name": "Ann", "quote_date": "2026-09-01", "units": "12", "rate_per_unit": 1.5,
+                            "addons": "Fan - 2 x 40; Bolt - 0.05", "notes": "ignored", "tax_rate": ""})
+    assert quote.client_name == "Ann"
+    assert quote.quote_date.isoformat() == "2026-09-01"
+    assert (quote.units, quote.rate_per_unit) == (12.0, 1.5)
+    assert [(item.name, item.quantity, item.unit_price) for item in quote.addons] == [("Fan", 2.0, 40.0),
+                                                                                      ("Bolt", 1.0, 0.05)]
+
+
+@pytest.mark.parametrize("row", [
+    {"units": "nan"},
+    {"units": "1e400"},
+    {"rate_per_unit": "-inf"},
+    {"tax_rate": -1},
+    {"addons": [{"name": "Fan", "quantity": 1, "unit_price": "inf"}]},
+    {"addons": [{"name": "Fan", "quantity": -2, "unit_price": 10}]},
+    {"tax_rule": "nope"},
+])
+def test_quote_from_row_rejects_bad_numbers_and_rules(row):
+    with pytest.raises(ValueError):
+        quote_from_row(row)
+
+
+def write_inputs(tmp_path, count):
+    rows = [{"client_name": f"Client {i}", "quote_number": f"Q-{i}", "units": 100 + i, "rate_per_unit": 1.5,
+             "tax_rate": 6.25, "addons": [{"name": "Fan", "quantity": 2, "unit_price": 19.99}]} for i in range(count)]
+    jsonl = tmp_path / "quotes.jsonl"
+    jsonl.write_text("\n".join(json.dumps(row) for row in rows) + "\n\n", encoding="utf-8")
+    csv_path = tmp_path / "quotes.csv"
+    with open(csv_path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, ["client_name", "quote_number", "units", "rate_per_unit", "tax_rate", "addons"])
+        writer.writeheader()
+        for row in rows:
+            writer.writerow({**row, "addons": "Fan - 2 x 19.99"})
+    return str(jsonl), str(csv_path)
+
+
+def test_csv_and_jsonl_rows_read_the_same(tmp_path):
+    jsonl, csv_path = write_inputs(tmp_path, 3)
+    assert list(read_quotes(jsonl)) == list(read_quotes(csv_path))
+
+
+@pytest.mark.parametrize("output", ["out", "out.zip"])
+def test_run_batch_writes_every_quote_and_a_summary(tmp_path, output):
+    jsonl, _ = write_inputs(tmp_path, 11)
+    output = str(tmp_path / output)
+    report = run_batch(read_quotes(jsonl), output, workers=2, chunksize=3)
+    assert report.quotes == 11
+
+    if output.endswith(".zip"):
+        with zipfile.ZipFile(output) as archive:
+            names = archive.namelist()
+            pdfs = [archive.read(name) for name in names if name.endswith(".pdf")]
+            summary = archive.read("summary.csv").decode("utf-8")
+    else:
+        names = sorted(os.listdir(output))
+        pdfs = [open(os.path.join(output, name), "rb").read() for name in names if name.endswith(".pdf")]
+        summary = open(os.path.join(output, "summary.csv"), encoding="utf-8").read()
+    assert len(pdfs) == 11 and all(pdf.startswith(b"%PDF") for pdf in pdfs)
+
+    rows = list(csv.reader(io.StringIO(summary)))[1:]
+    # Input order survives the pool
+    assert [row[0] for row in rows] == [f"{i:05d}_Client_{i - 1}_quote.pdf" for i in range(1, 12)]
+    expected = calculate_quote(QuoteInput(units=110, rate_per_unit=1.5, tax_rate=6.25,
+                                          addons=quote_from_row({"addons": "Fan - 2 x 19.99"}).addons))
+    assert rows[-1][-1] == format_cents(expected.total_cents, symbol="")
+
+
+def test_main(tmp_path, capsys):
+    _, csv_path = write_inputs(tmp_path, 2)
+    batch_quotes.main([csv_path, str(tmp_path / "out"), "--workers", "1"])
+    assert capsys.readouterr().out.startswith("Rendered 2 quotes in ")
@@ -0,0 +1,50 @@
+import io
+import random
+
+import pytest
+from PIL import Image
+
+from image_header import probe_image
+
+
+def encode(fmt, size=(64, 48), mode="RGB", **options):
+    out = io.BytesIO()
+    Image.new(mode, size, 128).save(out, fmt, **options)
+    return out.getvalue()
+
+
+def with_orientation(value):
+    exif = Image.Exif()
+    exif[0x0112] = value
+    return encode("JPEG", exif=exif.tobytes())
+
+
+def test_reads_sizes_and_coding():
+    png = probe_image(encode("PNG"))
+    assert (png.format, png.width, png.height) == ("PNG", 64, 48)
+    jpeg = probe_image(io.BytesIO(encode("JPEG", mode="L")))
+    assert (jpeg.width, jpeg.height, jpeg.components, jpeg.baseline) == (64, 48, 1, True)
+    assert probe_image(encode("JPEG", progressive=True)).progressive
+
+
+def test_exif_orientation_turns_the_upright_size():
+    info = probe_image(with_orientation(6))
+    assert info.orientation == 6
+    assert info.upright_size == (48, 64)
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_fuzzed_headers_only_raise_value_error(seed):
+    rng = random.Random(seed)
+    samples = [encode("PNG"), encode("JPEG"), encode("JPEG", progressive=True), with_orientation(8)]
+    for _ in range(2000):
+        data = bytearray(rng.choice(samples))
+        if rng.random() < 0.3:
+            del data[rng.randrange(len(data)):]
+        for _ in range(rng.randrange(1, 8) if data else 0):
+            # The header fields all sit in the first few hundred bytes
+            data[rng.randrange(min(len(data), 400))] = rng.randrange(256)
+        try:
+            probe_image(bytes(data), max_scan=rng.choice([64, 4096, 1 << 20]))
+        except ValueError:
+            pass
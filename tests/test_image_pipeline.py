@@ -0,0 +1,115 @@
+import io
+import threading
+import time
+
+import pytest
+from PIL import Image
+
+from image_header import probe_image
+from image_pipeline import MM_PER_INCH, draw_size, make_thumbnail, prepare_photo, prepare_photos
+from intake_pdf import DocumentStats
+
+
+def upload(fmt="JPEG", size=(64, 48), mode="RGB", color=128, **options):
+    out = io.BytesIO()
+    Image.new(mode, size, color).save(out, fmt, **options)
+    out.seek(0)
+    return out
+
+
+def decoded(photo):
+    return Image.open(io.BytesIO(photo.data))
+
+
+def test_draw_size_keeps_small_photos_natural_and_shrinks_big_ones():
+    assert draw_size(96, 48) == pytest.approx((MM_PER_INCH, MM_PER_INCH / 2))
+    assert draw_size(4000, 3000) == pytest.approx((160, 120))
+    assert draw_size(3000, 1000, max_w=90) == pytest.approx((90, 30))
+
+
+def test_big_photos_are_downsampled_to_print_size():
+    source = upload(size=(4000, 3000))
+    stats = DocumentStats()
+    photo = prepare_photo(source, stats=stats)
+    # 160 x 120 mm at 150 dpi
+    assert (photo.width, photo.height) == (945, 709)
+    assert (photo.draw_w, photo.draw_h) == pytest.approx((160, 120))
+    assert photo.source_bytes == len(source.getvalue())
+    assert decoded(photo).size == (945, 709)
+    assert stats.process_rss > 0
+
+
+def test_small_baseline_jpegs_are_embedded_as_is():
+    source = upload(size=(300, 200))
+    photo = prepare_photo(source)
+    assert photo.data == source.getvalue()
+    assert (photo.width, photo.height, photo.colorspace) == (300, 200, "DeviceRGB")
+
+
+def test_progressive_and_rotated_jpegs_are_re_encoded_upright():
+    progressive = prepare_photo(upload(size=(300, 200), progressive=True))
+    assert probe_image(progressive.data).baseline
+
+    exif = Image.Exif()
+    exif[0x0112] = 6
+    turned = prepare_photo(upload(size=(300, 200), exif=exif.tobytes()))
+    assert (turned.width, turned.height) == (200, 300)
+    assert probe_image(turned.data).orientation == 1
+
+
+def test_transparent_and_grey_photos():
+    png = prepare_photo(upload("PNG", mode="RGBA", color=(255, 0, 0, 0)))
+    image = decoded(png)
+    assert (image.format, image.mode, png.colorspace) == ("JPEG", "RGB", "DeviceRGB")
+    assert image.getpixel((10, 10)) == pytest.approx((255, 255, 255), abs=2)
+    grey = prepare_photo(upload("PNG", mode="L"))
+    assert grey.colorspace == "DeviceGray" and decoded(grey).mode == "L"
+
+
+def test_unreadable_uploads_raise_value_error():
+    with pytest.raises(ValueError):
+        prepare_photo(io.BytesIO(b"GIF89a not supported"))
+    with pytest.raises(ValueError):
+        prepare_photo(io.BytesIO(b"\xff\xd8\xff\xe0\x00"))
+
+
+def test_thumbnails_fit_the_longer_side():
+    thumb = make_thumbnail(prepare_photo(upload(size=(2000, 500))).data, size=100)
+    assert (thumb.width, thumb.height) == (100, 25)
+    assert decoded(thumb).size == (100, 25)
+
+
+def test_prepare_photos_keeps_order_and_bounds_work():
+    lock = threading.Lock()
+    running = peak = 0
+
+    def slow_prepare(source, stats=None, **options):
+        nonlocal running, peak
+        with lock:
+            running += 1
+            peak = max(peak, running)
+        time.sleep(0.01)
+        with lock:
+            running -= 1
+        return prepare_photo(source, stats=stats, **options)
+
+    sources = [upload(size=(100 + i, 80)) for i in range(12)]
+    photos = list(prepare_photos(sources, workers=3, prepare=slow_prepare, max_w=50))
+    assert [photo.width for photo in photos] == [prepare_photo(source, max_w=50).width for source in sources]
+    assert 1 < peak <= 3
+    assert [photo.width for photo in prepare_photos(sources[:3], workers=1)] == [100, 101, 102]
+
+
+def test_prepare_photos_reads_uploads_lazily():
+    taken = []
+
+    def sources():
+        for i in range(20):
+            taken.append(i)
+            yield upload()
+
+    photos = prepare_photos(sources(), workers=2)
+    next(photos)
+    # Two workers keep at most four photos in hand
+    assert len(taken) <= 5
+    assert len(list(photos)) == 19
@@ -0,0 +1,86 @@
+import json
+import urllib.error
+import urllib.request
+
+import pytest
+
+import metrics
+from metrics import METRICS, Metrics
+from quote_engine import QuoteInput, calculate_quote, parse_addons
+
+
+def test_disabled_metrics_do_nothing():
+    registry = Metrics()
+    assert registry.stage("calculate") is registry.stage("render")
+    with registry.stage("calculate"):
+        pass
+    registry.count("pages_total", 3)
+    assert registry.snapshot() == {"stages": {}, "counters": {}}
+
+
+def test_histograms_and_counters():
+    registry = Metrics(enabled=True)
+    for seconds in (0.0004, 0.001, 0.3, 60):
+        registry.observe("render", seconds, kind="quote")
+    registry.count("pages_total", 2, kind="quote")
+    registry.count("pages_total", 3, kind="quote")
+    registry.count("pages_total", kind='in"take\n')
+    text = registry.prometheus_text()
+    assert 'revu_stage_seconds_bucket{stage="render",kind="quote",le="0.0005"} 1' in text
+    assert 'revu_stage_seconds_bucket{stage="render",kind="quote",le="0.001"} 2' in text
+    assert 'revu_stage_seconds_bucket{stage="render",kind="quote",le="0.5"} 3' in text
+    assert 'revu_stage_seconds_bucket{stage="render",kind="quote",le="10.0"} 3' in text
+    assert 'revu_stage_seconds_bucket{stage="render",kind="quote",le="+Inf"} 4' in text
+    assert 'revu_stage_seconds_count{stage="render",kind="quote"} 4' in text
+    assert text.count("# TYPE revu_pages_total counter") == 1
+    assert 'revu_pages_total{kind="quote"} 5' in text
+    assert 'revu_pages_total{kind="in\\"take\\n"} 1' in text
+    snapshot = registry.snapshot()
+    assert snapshot["stages"]["render[kind=quote]"]["count"] == 4
+    assert snapshot["counters"]["pages_total[kind=quote]"] == 5
+
+
+def test_jsonl_log_enables_metrics(tmp_path):
+    path = tmp_path / "metrics.jsonl"
+    registry = Metrics(jsonl_path=str(path))
+    assert registry.enabled
+    with registry.stage("calculate", style="revu"):
+        pass
+    registry.count("photos_total", 2)
+    events = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [(e.get("stage"), e.get("counter"), e.get("style"), e.get("value")) for e in events] == [
+        ("calculate", None, "revu", None), (None, "photos_total", None, 2)]
+    assert all("ts" in e and "pid" in e for e in events)
+
+
+@pytest.fixture
+def enabled(monkeypatch):
+    monkeypatch.setattr(METRICS, "enabled", True)
+    monkeypatch.setattr(METRICS, "_timings", {})
+    monkeypatch.setattr(METRICS, "_counters", {})
+    return METRICS
+
+
+def test_generation_path_is_instrumented(enabled):
+    calculate_quote(QuoteInput(addons=parse_addons("Fan - 2 x 40\nBolt - 1")))
+    snapshot = enabled.snapshot()
+    assert snapshot["stages"]["calculate"]["count"] == 1
+    assert snapshot["stages"]["parse"]["count"] == 1
+    assert snapshot["counters"]["line_items_total"] == 2
+
+
+def test_metrics_endpoint(enabled, monkeypatch):
+    monkeypatch.setattr(metrics, "_server", None)
+    enabled.count("quotes_total")
+    server = metrics.serve_metrics(0, host="127.0.0.1")
+    try:
+        assert metrics.serve_metrics(0) is server
+        port = server.server_address[1]
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics") as response:
+            assert response.headers["Content-Type"] == "text/plain; version=0.0.4"
+            assert "revu_quotes_total 1" in response.read().decode("utf-8")
+        with pytest.raises(urllib.error.HTTPError):
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/other")
+    finally:
+        server.shutdown()
+        server.server_close()
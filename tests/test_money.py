@@ -0,0 +1,114 @@
+import random
+from fractions import Fraction
+
+import pytest
+
+from money import (HALF_EVEN, HALF_UP, TAX_RULES, TaxRule, format_cents, format_dollars, line_cents, percent_of,
+                   register_tax_rule, round_div, tax_rule, to_cents)
+from quote_engine import LineItem, QuoteInput, calculate_quote
+
+
+@pytest.fixture
+def half_even_rules():
+    rules = [register_tax_rule(TaxRule("test_half_even", rounding=HALF_EVEN)),
+             register_tax_rule(TaxRule("test_per_line_half_even", per_line=True, rounding=HALF_EVEN))]
+    yield
+    for rule in rules:
+        del TAX_RULES[rule.name]
+
+
+@pytest.mark.parametrize("numerator, denominator, half_up, half_even", [
+    (5, 2, 3, 2),
+    (7, 2, 4, 4),
+    (-5, 2, -3, -2),
+    (-7, 2, -4, -4),
+    (-1, 4, 0, 0),
+    (-3, 4, -1, -1),
+    (-6, 4, -2, -2),
+    (-10, 4, -3, -2),
+    (0, 3, 0, 0),
+])
+def test_round_div_ties_and_signs(numerator, denominator, half_up, half_even):
+    assert round_div(numerator, denominator, HALF_UP) == half_up
+    assert round_div(numerator, denominator, HALF_EVEN) == half_even
+
+
+def test_round_div_matches_exact_rounding():
+    rng = random.Random(1)
+    for _ in range(5000):
+        numerator, denominator = rng.randrange(-10**9, 10**9), rng.randrange(1, 10**4)
+        exact = Fraction(numerator, denominator)
+        nearest = round(exact)    # Fraction rounds halves to even
+        assert round_div(numerator, denominator, HALF_EVEN) == nearest
+        if exact - int(exact) not in (Fraction(1, 2), Fraction(-1, 2)):
+            assert round_div(numerator, denominator, HALF_UP) == nearest
+
+
+def test_round_div_rejects_unknown_modes():
+    with pytest.raises(ValueError):
+        round_div(1, 2, "half_down")
+
+
+@pytest.mark.parametrize("call, half_up, half_even", [
+    (lambda mode: to_cents(0.125, mode), 13, 12),
+    (lambda mode: to_cents(0.135, mode), 14, 14),
+    (lambda mode: to_cents(2.675, mode), 268, 268),     # 2.675 is 2.67499... as a float
+    (lambda mode: line_cents(0.5, 0.25, mode), 13, 12),
+    (lambda mode: line_cents(1.5, 0.25, mode), 38, 38),
+    (lambda mode: percent_of(1250, 1, mode), 13, 12),
+    (lambda mode: percent_of(1350, 1, mode), 14, 14),
+])
+def test_half_cent_ties(call, half_up, half_even):
+    assert call(HALF_UP) == half_up
+    assert call(HALF_EVEN) == half_even
+
+
+def small_lines_quote(rule):
+    # Three 5-cent lines: each line's discount and tax lands on half a cent
+    return QuoteInput(addons=[LineItem("Bolt", 1, "", 0.05)] * 3, discount_rate=10, tax_rate=10, tax_rule=rule)
+
+
+def test_per_line_tax_rounds_each_line():
+    invoice = calculate_quote(small_lines_quote("default"))
+    # 10% of 15 = 1.5 -> 2; 10% of 13 = 1.3 -> 1
+    assert (invoice.discount_cents, invoice.tax_cents, invoice.total_cents) == (2, 1, 14)
+
+    per_line = calculate_quote(small_lines_quote("per_line"))
+    # Per line: 10% of 5 = 0.5 -> 1 discount, 10% of 4 = 0.4 -> 0 tax
+    assert (per_line.discount_cents, per_line.tax_cents, per_line.total_cents) == (3, 0, 12)
+    assert per_line.subtotal_cents == invoice.subtotal_cents == 15
+
+
+def test_half_even_rules(half_even_rules):
+    invoice = calculate_quote(small_lines_quote("test_half_even"))
+    # 1.5 -> 2 (even); 10% of 13 = 1.3 -> 1
+    assert (invoice.discount_cents, invoice.tax_cents, invoice.total_cents) == (2, 1, 14)
+    per_line = calculate_quote(small_lines_quote("test_per_line_half_even"))
+    # Per line: 0.5 -> 0 discount, 10% of 5 = 0.5 -> 0 tax
+    assert (per_line.discount_cents, per_line.tax_cents, per_line.total_cents) == (0, 0, 15)
+
+
+def test_per_line_tax_skips_exempt_lines():
+    quote = QuoteInput(labor_hours=1, hourly_rate=100, material_cost=0.05, addons=[LineItem("Fan", 1, "", 0.05)],
+                       tax_rate=10)
+    exempt = TaxRule("test_per_line_labor_exempt", taxable=frozenset({"materials", "addons"}), per_line=True)
+    register_tax_rule(exempt)
+    try:
+        quote.tax_rule = exempt.name
+        # Only the two 5-cent lines are taxed, each 0.5 -> 1
+        assert calculate_quote(quote).tax_cents == 2
+    finally:
+        del TAX_RULES[exempt.name]
+
+
+def test_renamed_rule_still_resolves():
+    assert tax_rule("materials_only") is tax_rule("materials_and_addons")
+    assert tax_rule("") is tax_rule(None) is tax_rule("default")
+    with pytest.raises(ValueError):
+        tax_rule("nope")
+
+
+def test_format_options():
+    assert format_cents(123456789, grouping=True) == "$1,234,567.89"
+    assert format_cents(-1205, symbol="") == "-12.05"
+    assert format_dollars(0.125) == "$0.13"
@@ -0,0 +1,70 @@
+import io
+
+import pytest
+from PIL import Image
+
+import intake_pdf
+import packet_pdf
+from intake_pdf import DocumentStats, IntakeInput, render_intake_pdf
+from packet_pdf import PacketPDF, build_packet_pdf, render_packet_pdf
+from pdf_render import pdf_to_bytes
+from quote_engine import LineItem, QuoteInput
+from quote_pdf import build_quote_pdf
+from quote_store import QuoteStore
+
+
+def jpeg(color):
+    out = io.BytesIO()
+    Image.new("RGB", (640, 480), color).save(out, "JPEG")
+    return out.getvalue()
+
+
+def intake():
+    return IntakeInput(client_name="Ann Lee", notes="Back fence\n" * 20,
+                       photos=[io.BytesIO(jpeg(c)) for c in (0, 90, 180)])
+
+
+def quote():
+    return QuoteInput(client_name="Ann Lee", units=120, rate_per_unit=2.5,
+                      addons=[LineItem(f"Post {i}", 1, "", 12) for i in range(60)])
+
+
+@pytest.mark.parametrize("style", ["cravix", "revu"])
+def test_packet_has_the_pages_of_both_documents(style):
+    intake_stats = DocumentStats()
+    render_intake_pdf(intake(), intake_stats, style)
+    quote_pages = build_quote_pdf(quote(), None, style).page
+
+    stats = DocumentStats()
+    data = render_packet_pdf(intake(), quote(), stats=stats, style=style)
+    assert data.startswith(b"%PDF")
+    assert stats.pages == intake_stats.pages + quote_pages
+    assert stats.output_bytes == len(data)
+    if style == "cravix":
+        assert (stats.photos, stats.photos_total) == (3, 3)
+
+
+def test_quote_pages_drop_the_intake_header_and_footer(monkeypatch):
+    drawn = []
+    monkeypatch.setattr(intake_pdf.PDF, "header", lambda pdf: drawn.append(("header", pdf.page)))
+    monkeypatch.setattr(intake_pdf.PDF, "footer", lambda pdf: drawn.append(("footer", pdf.page)))
+    intake_stats = DocumentStats()
+    render_intake_pdf(intake(), intake_stats)
+    drawn.clear()
+
+    pdf = build_packet_pdf(intake(), quote())
+    pdf_to_bytes(pdf)
+    assert isinstance(pdf, PacketPDF) and pdf.page > intake_stats.pages
+    intake_pages = list(range(1, intake_stats.pages + 1))
+    assert sorted(page for part, page in drawn if part == "header") == intake_pages
+    assert sorted(page for part, page in drawn if part == "footer") == intake_pages
+
+
+def test_cli(tmp_path, capsys):
+    store = QuoteStore(str(tmp_path / "revu.db"))
+    intake_id, quote_id = store.save_intake(intake()), store.save_quote(quote())
+    store.close()
+    output = str(tmp_path / "packet.pdf")
+    packet_pdf.main([str(intake_id), str(quote_id), output, "--db", str(tmp_path / "revu.db")])
+    assert capsys.readouterr().out.startswith(f"Wrote {output}: ")
+    assert open(output, "rb").read(4) == b"%PDF"
@@ -0,0 +1,67 @@
+import io
+import os
+from datetime import date
+
+import pytest
+
+import pdf_cache
+from pdf_cache import LAYOUT_FINGERPRINT, PdfCache, stable_key
+from quote_engine import QuoteInput
+
+
+def test_stable_key_follows_content():
+    assert stable_key("quote", QuoteInput(units=3)) == stable_key("quote", QuoteInput(units=3))
+    assert stable_key("quote", QuoteInput(units=3)) != stable_key("quote", QuoteInput(units=4))
+    assert stable_key(0.1 + 0.2) != stable_key(0.3)
+    assert stable_key(date(2026, 9, 1)) == stable_key("2026-09-01")
+    # Uploads are keyed by their bytes, whatever holds them
+    assert stable_key([b"photo"]) == stable_key([io.BytesIO(b"photo")]) == stable_key((memoryview(b"photo"),))
+    with pytest.raises(TypeError):
+        stable_key(object())
+
+
+def test_memory_tier_is_an_lru_bounded_by_bytes():
+    cache = PdfCache(max_bytes=10)
+    cache.put("a", b"aaaa")
+    cache.put("b", b"bbbb")
+    assert cache.get("a") == b"aaaa"
+    cache.put("c", b"cccc")
+    # b was least recently used
+    assert (cache.get("b"), cache.get("a"), cache.get("c")) == (None, b"aaaa", b"cccc")
+    assert (len(cache), cache.size) == (2, 8)
+    cache.put("big", b"x" * 11)
+    assert "big" not in cache._entries and len(cache) == 2
+    assert cache.stats()["hits"] == 3 and cache.stats()["misses"] == 1
+
+
+def test_disk_tier_survives_restarts_under_the_layout_fingerprint(tmp_path):
+    PdfCache(disk_dir=str(tmp_path)).put("ab12", b"%PDF")
+    assert os.listdir(tmp_path) == [LAYOUT_FINGERPRINT]
+    assert (tmp_path / LAYOUT_FINGERPRINT / "ab" / "ab12.pdf").read_bytes() == b"%PDF"
+
+    cache = PdfCache(disk_dir=str(tmp_path))
+    assert cache.get("ab12") == b"%PDF"
+    assert cache.get("ab12") == b"%PDF"
+    assert (cache.disk_hits, cache.hits) == (1, 1)
+    # Oversized documents are still served from disk
+    small = PdfCache(max_bytes=1, disk_dir=str(tmp_path))
+    assert small.get("ab12") == b"%PDF" and len(small) == 0
+
+
+def test_get_or_render_renders_once():
+    cache = PdfCache()
+    calls = []
+    for _ in range(3):
+        assert cache.get_or_render("k", lambda: calls.append(1) or b"%PDF") == b"%PDF"
+    assert len(calls) == 1
+
+
+def test_fingerprint_covers_layout_modules_and_fonts(tmp_path, monkeypatch):
+    here = os.path.dirname(pdf_cache.__file__)
+    for name in pdf_cache._LAYOUT_MODULES:
+        assert os.path.exists(os.path.join(here, name)), name
+    for name in ("image_pipeline.py", "image_header.py", "photo_store.py", "quote_pdf.py"):
+        assert name in pdf_cache._LAYOUT_MODULES
+    assert pdf_cache._layout_fingerprint() == LAYOUT_FINGERPRINT
+    monkeypatch.setenv("REVU_FONT_DIR", str(tmp_path))
+    assert pdf_cache._layout_fingerprint() != LAYOUT_FINGERPRINT
@@ -0,0 +1,70 @@
+import tarfile
+import zipfile
+
+import pytest
+
+import pdf_export
+from intake_pdf import IntakeInput
+from quote_engine import QuoteInput
+from quote_store import QuoteStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = QuoteStore(str(tmp_path / "revu.db"))
+    for i in range(12):
+        store.save_quote(QuoteInput(client_name=f"Client {i}", quote_number=f"Q-{i}", units=100 + i,
+                                    rate_per_unit=1.5))
+    for i in range(5):
+        store.save_intake(IntakeInput(client_name=f"Client {i}", notes=f"Intake {i}"))
+    yield store
+    store.close()
+
+
+def interrupt_after(n, monkeypatch):
+    render = pdf_export.render_documents
+
+    def render_some(*args, **kwargs):
+        for done, item in enumerate(render(*args, **kwargs)):
+            if done == n:
+                raise KeyboardInterrupt
+            yield item
+
+    monkeypatch.setattr(pdf_export, "render_documents", render_some)
+
+
+def members(path):
+    if path.endswith(".zip"):
+        with zipfile.ZipFile(path) as archive:
+            assert archive.testzip() is None
+            return archive.namelist()
+    with tarfile.open(path) as archive:
+        return archive.getnames()
+
+
+# The interrupted ZipFile's finaliser fails to write a directory into the
+# archive, already closed; that is what leaves the archive resumable
+@pytest.mark.filterwarnings("ignore::pytest.PytestUnraisableExceptionWarning")
+@pytest.mark.parametrize("suffix", [".zip", ".tar"])
+@pytest.mark.parametrize("torn", [False, True])
+def test_resume_leaves_every_document_once(store, tmp_path, monkeypatch, suffix, torn):
+    output = str(tmp_path / ("export" + suffix))
+    with monkeypatch.context() as patch:
+        interrupt_after(7, patch)
+        with pytest.raises(KeyboardInterrupt):
+            pdf_export.export_documents(output, store, workers=0)
+    if torn:
+        # Killed mid-write: half a member in the archive and half a log line
+        with open(output, "ab") as f:
+            f.write(b"PK\x03\x04 half a member")
+        with open(output + ".checkpoint", "ab") as f:
+            f.write(b'{"kind":"quote","id":')
+
+    report = pdf_export.export_documents(output, store, workers=0, resume=True)
+
+    assert report.resumed == 7
+    assert report.documents == 17 - 7
+    names = members(output)
+    assert len(names) == len(set(names)) == 17 + 1
+    assert pdf_export.MANIFEST in names
+    assert not (tmp_path / ("export" + suffix + ".checkpoint")).exists()
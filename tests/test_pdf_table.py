@@ -0,0 +1,43 @@
+import random
+
+from money import format_cents
+from pdf_fonts import Document
+from quote_engine import LineItem, QuoteInput, calculate_quote
+from quote_pdf import _CRAVIX_ITEMS
+
+
+def test_format_cents():
+    assert [format_cents(c) for c in (0, 5, 100, 123456, -5)] == ["$0.00", "$0.05", "$1.00", "$1234.56", "-$0.05"]
+
+
+def test_paged_table_total_matches_quote_total():
+    rng = random.Random(3)
+    items = [LineItem(f"Item {i}", rng.choice([1, 2.5, 3.333]), "ft", rng.choice([0.1, 0.2, 19.99, 0.07]))
+             for i in range(1500)]
+    pdf = Document()
+    pdf.add_page()
+    rows = [((item.name, "", "", "", format_cents(item.cents)), item.cents) for item in items]
+    total = _CRAVIX_ITEMS.draw(pdf, rows)
+    assert pdf.page > 1
+    assert total == calculate_quote(QuoteInput(addons=items)).addon_cents
+
+
+def test_tall_first_row_starts_on_a_new_page():
+    pdf = Document()
+    pdf.add_page()
+    # Room for the header and a one-line row, not for ten lines
+    pdf.set_y(pdf.page_break_trigger - 7 - 3 * 7)
+    name = "\n".join(f"Part {i}" for i in range(10))
+    total = _CRAVIX_ITEMS.draw(pdf, [((name, "1", "", "$5.00", "$5.00"), 500)])
+    assert total == 500
+    assert pdf.page == 2
+    # Header, the ten-line row and the total, from the top of page 2
+    assert round(pdf.get_y() - pdf.t_margin, 6) == 7 + 10 * 5 + 7
+
+
+def test_one_line_first_row_still_fits_at_the_foot_of_a_page():
+    pdf = Document()
+    pdf.add_page()
+    pdf.set_y(pdf.page_break_trigger - 7 - 3 * 7)
+    _CRAVIX_ITEMS.draw(pdf, [(("Bolt", "1", "", "$5.00", "$5.00"), 500)])
+    assert pdf.page == 1
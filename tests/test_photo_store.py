@@ -0,0 +1,109 @@
+import io
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from PIL import Image
+
+import photo_store
+from image_header import probe_image
+from image_pipeline import THUMB_PX
+from photo_store import PhotoStore, photo_digest, print_variant
+
+
+def jpeg(size=(800, 600), color=128):
+    out = io.BytesIO()
+    Image.new("RGB", size, color).save(out, "JPEG")
+    return out.getvalue()
+
+
+@pytest.fixture
+def prepares(monkeypatch):
+    calls = []
+    prepare = photo_store.prepare_photo
+
+    def counting(upload, **options):
+        calls.append(photo_digest(upload))
+        return prepare(upload, **options)
+
+    monkeypatch.setattr(photo_store, "prepare_photo", counting)
+    return calls
+
+
+def test_same_photo_is_prepared_once(prepares):
+    store = PhotoStore()
+    data = jpeg()
+    first = store.prepared(io.BytesIO(data))
+    again = store.prepared(io.BytesIO(data))
+    assert not first.reused and again.reused
+    assert first.digest == again.digest == photo_digest(data)
+    assert again.data == first.data
+    assert len(prepares) == 1
+    assert (store.hits, store.misses, store.skipped_bytes) == (1, 1, len(data))
+    # Other options are another variant
+    assert not store.prepared(io.BytesIO(data), max_w=90).reused
+    assert len(prepares) == 2
+
+
+def test_concurrent_uploads_of_one_photo_share_a_prepare(prepares):
+    store = PhotoStore()
+    data = jpeg((2000, 1500))
+    with ThreadPoolExecutor(4) as pool:
+        photos = list(pool.map(lambda _: store.prepared(io.BytesIO(data)), range(8)))
+    assert len(prepares) == 1
+    assert sum(not photo.reused for photo in photos) == 1
+
+
+def test_memory_tier_is_bounded_by_bytes():
+    photos = [jpeg(color=c) for c in (0, 100, 200)]
+    sizer = PhotoStore()
+    digests = [sizer.prepared(io.BytesIO(data)).digest for data in photos]
+    # Room for one photo: its print variant and its thumbnail
+    store = PhotoStore(max_bytes=max(len(sizer._entries[digest, print_variant()].data) + len(sizer.thumbnail(digest))
+                                     for digest in digests))
+    for data in photos:
+        store.prepared(io.BytesIO(data))
+    assert store.stats()["bytes"] <= store.max_bytes
+    # The newest photo is kept, the oldest was evicted
+    assert store.prepared(io.BytesIO(photos[2])).reused
+    assert not store.prepared(io.BytesIO(photos[0])).reused
+
+
+def test_sqlite_tier_survives_restarts(tmp_path, prepares):
+    path = str(tmp_path / "photos.db")
+    data = jpeg()
+    PhotoStore(path=path).prepared(io.BytesIO(data))
+
+    store = PhotoStore(path=path)
+    photo = store.prepared(io.BytesIO(data))
+    assert photo.reused and len(prepares) == 1
+    assert (store.db_hits, store.hits) == (1, 0)
+    assert store.prepared(io.BytesIO(data)).reused and store.hits == 1
+    stats = store.stats()
+    assert (stats["originals"], stats["original_bytes"], stats["variants"]) == (1, len(data), 2)
+
+
+def test_thumbnails(tmp_path):
+    path = str(tmp_path / "photos.db")
+    data = jpeg((1200, 300))
+    digest = PhotoStore(path=path).prepared(io.BytesIO(data)).digest
+    info = probe_image(PhotoStore(path=path).thumbnail(digest))
+    assert info.format == "JPEG" and max(info.width, info.height) == THUMB_PX
+    assert PhotoStore().thumbnail(digest) is None
+
+
+def test_variant_names_follow_the_preparing_code(tmp_path):
+    assert photo_store.VARIANT_FINGERPRINT in print_variant()
+    assert photo_store.VARIANT_FINGERPRINT in photo_store.THUMBNAIL
+    assert "@96dpi" in print_variant()
+    path = str(tmp_path / "photos.db")
+    data = jpeg()
+    PhotoStore(path=path).prepared(io.BytesIO(data))
+    with sqlite3.connect(path) as db:
+        db.execute("UPDATE photo_variants SET variant = replace(variant, ?, 'stale')",
+                   (photo_store.VARIANT_FINGERPRINT,))
+    db.close()
+    # Variants prepared by other code are dropped, not served
+    store = PhotoStore(path=path)
+    assert store.stats()["variants"] == 0
+    assert not store.prepared(io.BytesIO(data)).reused
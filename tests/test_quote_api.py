@@ -0,0 +1,97 @@
+import asyncio
+import base64
+import io
+import json
+
+import pytest
+from PIL import Image
+
+import quote_api
+from pdf_cache import PDF_CACHE
+from quote_store import QuoteStore
+
+
+def photo(fmt="JPEG"):
+    out = io.BytesIO()
+    Image.new("RGB", (32, 24), 128).save(out, fmt)
+    return base64.b64encode(out.getvalue()).decode("ascii")
+
+
+async def request(port, method, path, payload=None):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    body = b"" if payload is None else json.dumps(payload).encode("utf-8")
+    writer.write(f"{method} {path} HTTP/1.1\r\nContent-Length: {len(body)}\r\nConnection: close\r\n\r\n"
+                 .encode("latin-1") + body)
+    response = await reader.read()
+    writer.close()
+    head, _, content = response.partition(b"\r\n\r\n")
+    status = int(head.split()[1])
+    return status, json.loads(content) if b"application/json" in head else content
+
+
+def call(*requests):
+    # Start a one-worker service, send the requests in order and return the responses
+    async def run():
+        service = quote_api.QuoteService(port=0, workers=1)
+        await service.start()
+        try:
+            return [await request(service.port, *args) for args in requests]
+        finally:
+            await service.close()
+    return asyncio.run(run())
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache():
+    PDF_CACHE.clear()
+    yield
+    PDF_CACHE.clear()
+
+
+def test_price_quote_returns_cents_and_saves(tmp_path, monkeypatch):
+    store = QuoteStore(str(tmp_path / "revu.db"))
+    monkeypatch.setattr(quote_api, "default_store", lambda: store)
+    (status, body), = call(("POST", "/quote", {"client_name": "Ann", "units": "2", "rate_per_unit": 1.5,
+                                               "save": True}))
+    assert status == 200
+    assert body["result"]["total_cents"] == 300
+    assert store.find_quotes(client="ann")[0].id == body["id"]
+    store.close()
+
+
+@pytest.mark.parametrize("payload", [
+    {"units": "nan"},
+    {"units": -1},
+    {"addons": [{"name": "Fan", "unit_price": "inf"}]},
+    {"tax_rule": "nope"},
+    {"quote_date": "tomorrow"},
+])
+def test_bad_quotes_are_400(payload):
+    (status, body), = call(("POST", "/quote", payload))
+    assert status == 400
+    assert body["error"].startswith("Invalid quote")
+
+
+def test_pdf_renders_are_cached():
+    quote = {"client_name": "Ann", "units": 10, "rate_per_unit": 2}
+    (first_status, first), (second_status, second) = call(("POST", "/quote/pdf", quote), ("POST", "/quote/pdf", quote))
+    assert first_status == second_status == 200
+    assert first.startswith(b"%PDF") and first == second
+    assert (PDF_CACHE.misses, PDF_CACHE.hits) == (1, 1)
+
+
+def test_intake_photos_are_probed():
+    good, not_base64, not_an_image, truncated = call(
+        ("POST", "/intake/pdf", {"client_name": "Ann", "photos": [photo(), photo("PNG")]}),
+        ("POST", "/intake/pdf", {"photos": ["not base64!"]}),
+        ("POST", "/intake/pdf", {"photos": [photo(), base64.b64encode(b"GIF89a").decode("ascii")]}),
+        ("POST", "/intake/pdf", {"photos": [base64.b64encode(b"\xff\xd8\xff\xe0\x00").decode("ascii")]}),
+    )
+    assert good[0] == 200 and good[1].startswith(b"%PDF")
+    assert [response[0] for response in (not_base64, not_an_image, truncated)] == [400, 400, 400]
+    assert not_an_image[1]["error"] == "Invalid intake: photo 2: Unsupported image format"
+
+
+def test_unknown_routes():
+    (missing, _), (wrong_method, _) = call(("GET", "/nope"), ("GET", "/quote"))
+    assert (missing, wrong_method) == (404, 405)
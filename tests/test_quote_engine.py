@@ -0,0 +1,45 @@
+import pytest
+
+from quote_engine import parse_addons, parse_line_item
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("120", (1.0, "", 120.0)),
+    ("$1,200.00", (1.0, "", 1200.0)),
+    ("12 x 15", (12.0, "", 15.0)),
+    ("12x15", (12.0, "", 15.0)),
+    ("2 boxes x 30", (2.0, "boxes", 30.0)),
+    ("12 ft @ 3.50", (12.0, "ft", 3.5)),
+    ("3 hrs * 45", (3.0, "hrs", 45.0)),
+    ("12.5 sq ft × $4", (12.5, "sq ft", 4.0)),
+])
+def test_parse_line_item(text, expected):
+    assert parse_line_item(text) == expected
+
+
+@pytest.mark.parametrize("text, message", [
+    ("x", "'x' is not a price"),
+    ("boxes", "'boxes' is not a price"),
+    ("10 x 5 ft", "'5 ft' is not a price"),
+    ("ft x 5", "'ft' does not start with a quantity"),
+])
+def test_parse_line_item_errors(text, message):
+    with pytest.raises(ValueError, match=message):
+        parse_line_item(text)
+
+
+def test_unparsed_lines_are_kept_and_reported():
+    issues = []
+    items = parse_addons("Gutter - 12 ft @ 3.50\nFan - x\nJust a note", issues=issues)
+    assert [item.name for item in items] == ["Gutter", "Fan - x", "Just a note"]
+    assert [(issue.line, issue.message) for issue in issues] == [(2, "'x' is not a price")]
+
+
+def test_only_a_spaced_dash_separates_the_price():
+    items = parse_addons("Re-seal driveway - 250\nTopsoil - 3 cu-yd x 45\nT-bar - 2 x 8\nNo-price line")
+    assert [(item.name, item.quantity, item.unit, item.unit_price) for item in items] == [
+        ("Re-seal driveway", 1.0, "", 250.0),
+        ("Topsoil", 3.0, "cu-yd", 45.0),
+        ("T-bar", 2.0, "", 8.0),
+        ("No-price line", 1.0, "", 0.0),
+    ]
@@ -0,0 +1,131 @@
+import io
+import sqlite3
+from datetime import date
+
+import pytest
+from PIL import Image
+
+import quote_store
+from intake_pdf import IntakeInput
+from quote_engine import LineItem, QuoteInput, calculate_quote
+from quote_store import QuoteStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = QuoteStore(str(tmp_path / "revu.db"))
+    yield store
+    store.close()
+
+
+def jpeg(color):
+    out = io.BytesIO()
+    Image.new("RGB", (40, 30), color).save(out, "JPEG")
+    return out.getvalue()
+
+
+def test_quotes_round_trip_and_dedupe(store):
+    quote = QuoteInput(client_name="Ann Lee", quote_number="Q-1", quote_date=date(2026, 9, 1), units=12,
+                       rate_per_unit=1.25, addons=[LineItem("Re-seal driveway", 2, "coat", 99.5)], tax_rule="per_line")
+    quote_id = store.save_quote(quote, style="cravix")
+    assert store.save_quote(quote, style="cravix") == quote_id
+    assert store.save_quote(quote, style="revu") != quote_id
+    assert store.get_quote(quote_id) == (quote, "cravix")
+    with pytest.raises(KeyError):
+        store.get_quote(999)
+    assert store.render_quote(quote_id).startswith(b"%PDF")
+
+
+def test_find_quotes_and_totals(store):
+    ids = [store.save_quote(QuoteInput(client_name=client, quote_number=f"Q-{day}", quote_date=date(2026, 9, day),
+                                       units=day, rate_per_unit=10))
+           for day, client in [(1, "Ann"), (2, "Bob"), (3, "ann"), (4, "Ann")]]
+
+    assert [r.id for r in store.find_quotes(client="ANN")] == [ids[3], ids[2], ids[0]]
+    assert [r.quote_number for r in store.find_quotes(since=date(2026, 9, 2), until=date(2026, 9, 3))] == ["Q-3", "Q-2"]
+    assert [r.total_cents for r in store.find_quotes(min_cents=2000, max_cents=3000)] == [3000, 2000]
+    assert [r.id for r in store.find_quotes(quote_number="Q-2")] == [ids[1]]
+    assert len(store.find_quotes(limit=2)) == 2
+    assert store.quote_totals(client="ann") == (3, 8000, 2667)
+    assert store.quote_totals(since=date(2026, 10, 1)) == (0, 0, 0)
+
+
+def test_document_rows_page_and_resume(store):
+    ids = [store.save_quote(QuoteInput(client_name=f"C{i}", units=i, rate_per_unit=1)) for i in range(7)]
+    rows = list(store.document_rows("quote", page=3))
+    assert [row[0] for row in rows] == ids
+    assert rows[2][1:] == ("C2", date.today().isoformat(), 200)
+    assert [row[0] for row in store.document_rows("quote", after=ids[4], page=2)] == ids[5:]
+    store.save_intake(IntakeInput(client_name="Ann"))
+    assert [row[3] for row in store.document_rows("intake")] == [None]
+
+
+def test_intake_photos_are_stored_once(store):
+    photos = [jpeg(0), jpeg(200)]
+    first = store.save_intake(IntakeInput(client_name="Ann", notes="Fence", photos=[io.BytesIO(photos[0]),
+                                                                                    photos[1], photos[0]]))
+    second = store.save_intake(IntakeInput(client_name="Ann", notes="Gate", photos=[io.BytesIO(photos[1])]))
+    assert first != second
+    intake, app = store.get_intake(first)
+    assert app == "cravix" and intake.notes == "Fence"
+    assert [photo.getvalue() for photo in intake.photos] == [photos[0], photos[1], photos[0]]
+    db = store._connect()
+    assert db.execute("SELECT COUNT(*) FROM photos").fetchone() == (2,)
+    assert [r.id for r in store.find_intakes(client="ann")] == [second, first]
+    assert store.render_intake(first).startswith(b"%PDF")
+    with pytest.raises(KeyError):
+        store.get_intake(999)
+
+
+def test_cli(store, tmp_path, capsys):
+    quote_id = store.save_quote(QuoteInput(client_name="Ann", quote_date=date(2026, 9, 1), units=1000,
+                                           rate_per_unit=12.5))
+    db = store.path
+    quote_store.main(["--db", db, "quotes", "--client", "ann"])
+    assert capsys.readouterr().out == f"{quote_id}\t2026-09-01\t\tAnn\t$12500.00\n"
+    quote_store.main(["--db", db, "totals"])
+    assert capsys.readouterr().out == "1 quotes, $12500.00 total, $12500.00 average\n"
+    output = str(tmp_path / "quote.pdf")
+    quote_store.main(["--db", db, "pdf", str(quote_id), output])
+    assert open(output, "rb").read(4) == b"%PDF"
+
+# The quotes table as stores created before totals were kept in cents have it
+OLD_QUOTES = """
+CREATE TABLE quotes (
+    id INTEGER PRIMARY KEY,
+    input_key TEXT NOT NULL UNIQUE,
+    created_at TEXT NOT NULL,
+    style TEXT NOT NULL,
+    client_name TEXT NOT NULL COLLATE NOCASE,
+    quote_number TEXT NOT NULL,
+    quote_date TEXT NOT NULL,
+    total_due REAL NOT NULL,
+    input TEXT NOT NULL
+);
+CREATE INDEX quotes_client ON quotes (client_name, quote_date, total_due);
+CREATE INDEX quotes_date ON quotes (quote_date, total_due);
+CREATE INDEX quotes_total ON quotes (total_due);
+"""
+
+
+def test_real_totals_are_migrated_to_cents(tmp_path):
+    path = str(tmp_path / "old.db")
+    with sqlite3.connect(path) as db:
+        db.executescript(OLD_QUOTES)
+        for i, total in enumerate([0.1 + 0.2, 1234.565, 19.99]):
+            db.execute("INSERT INTO quotes VALUES (?, ?, '2026-09-01T10:00:00', 'revu', ?, '', '2026-09-01', ?, '{}')",
+                       (i + 1, f"key{i}", f"Client {i}", total))
+    db.close()
+
+    store = QuoteStore(path)
+    assert sorted(record.total_cents for record in store.find_quotes()) == [30, 1999, 123457]
+    assert store.quote_totals() == (3, 125486, 41829)
+    columns = {row[1] for row in store._connect().execute("PRAGMA table_info(quotes)")}
+    assert "total_due" not in columns
+
+    quote = QuoteInput(client_name="New", units=3, rate_per_unit=19.99)
+    store.save_quote(quote)
+    assert store.find_quotes(client="new")[0].total_cents == calculate_quote(quote).total_cents
+    store.close()
+    # Opening a migrated store again changes nothing
+    assert QuoteStore(path).quote_totals()[0] == 4
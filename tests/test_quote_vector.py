@@ -0,0 +1,59 @@
+import random
+from dataclasses import fields
+
+import numpy as np
+import pytest
+
+from quote_engine import LineItem, QuoteInput, QuoteResult, calculate_quote
+from quote_vector import calculate_quote_arrays, quote_columns, sweep_totals
+
+RESULT_FIELDS = [f.name for f in fields(QuoteResult)]
+
+
+def random_quotes(n, seed, scale=1.0):
+    rng = random.Random(seed)
+    return [
+        QuoteInput(
+            units=round(rng.uniform(0, 5000) * scale, 2),
+            rate_per_unit=round(rng.uniform(0, 5), 3),
+            material_cost=round(rng.uniform(0, 2000) * scale, 2),
+            labor_hours=round(rng.uniform(0, 80), 2),
+            hourly_rate=round(rng.uniform(20, 150), 2),
+            travel_cost=round(rng.uniform(0, 200), 2),
+            addons=[LineItem("Extra", rng.choice([1, 2.5, 12]), "", round(rng.uniform(0, 99), 2))
+                    for _ in range(rng.randrange(4))],
+            discount_rate=rng.choice([0, 5, 10, 12.5, 33.333]),
+            tax_rate=rng.choice([0, 6.25, 8.875, 10]),
+        )
+        for _ in range(n)
+    ]
+
+
+@pytest.mark.parametrize("tax_rule", ["default", "labor_exempt", "materials_and_addons"])
+@pytest.mark.parametrize("scale", [1.0, 1000.0])   # 1000x takes the int64 path
+def test_arrays_match_scalar_pricing(tax_rule, scale):
+    quotes = random_quotes(500, seed=4, scale=scale)
+    for quote in quotes:
+        quote.tax_rule = tax_rule
+    arrays = calculate_quote_arrays(**quote_columns(quotes), tax_rule=tax_rule)
+    for i, quote in enumerate(quotes):
+        expected = calculate_quote(quote)
+        for name in RESULT_FIELDS:
+            assert getattr(arrays, name)[i] == getattr(expected, name), (i, name)
+
+
+def test_sweep_totals_match_repricing_each_scenario():
+    quotes = random_quotes(200, seed=7)
+    rates = np.array([0.90, 1.05, 1.20])
+    totals = sweep_totals(quote_columns(quotes), rate_per_unit=rates)
+    for rate, total in zip(rates, totals):
+        cents = 0
+        for quote in quotes:
+            quote.rate_per_unit = float(rate)
+            cents += calculate_quote(quote).total_cents
+        assert total == cents
+
+
+def test_per_line_rules_are_refused():
+    with pytest.raises(ValueError):
+        calculate_quote_arrays(1.0, 1.0, tax_rule="per_line")
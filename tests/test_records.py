@@ -0,0 +1,57 @@
+import io
+from datetime import date
+
+import pytest
+
+from intake_pdf import IntakeInput
+from quote_engine import LineItem, QuoteInput, QuoteResult
+from records import QuoteBatch, pack_intake, pack_quote, pack_result, unpack_intake, unpack_quote, unpack_result
+
+
+def sample_quote(i=0):
+    return QuoteInput(
+        company_name="Revu Exteriors", client_name=f"Zoë Łukáš {i}", client_email="z@example.com",
+        quote_number=f"Q-{i:04d}", quote_date=date(2026, 9, 1), valid_until=date(2026, 10, 1),
+        job_description="Wash \U0001F3E0 siding", unit_type="Square Ft", units=1200.5 + i, rate_per_unit=0.1,
+        material_cost=45.99, labor_hours=3.25, hourly_rate=65.0, travel_cost=20.0,
+        addons=[LineItem("Gutter guard", 12.5, "ft", 3.5), LineItem("Fan", 1.0, "", 0.3)][:i % 3],
+        discount_rate=12.5, tax_rate=8.875, tax_rule="labor_exempt",
+    )
+
+
+def test_quote_round_trip():
+    for i in range(3):
+        quote = sample_quote(i)
+        assert unpack_quote(pack_quote(quote)) == quote
+
+
+def test_result_round_trip():
+    result = QuoteResult(12005, 21125, 4599, 2000, 4375, 42004, 5251, 36753, 3262, 40015)
+    assert unpack_result(pack_result(result)) == result
+
+
+def test_intake_round_trip_keeps_photo_bytes():
+    photos = [io.BytesIO(b"\xff\xd8first"), b"second", io.BytesIO(b"")]
+    intake = IntakeInput(client_name="Ana", email="a@example.com", notes="Back door — left",
+                         preferred_date=date(2026, 11, 2), photos=photos)
+    unpacked = unpack_intake(pack_intake(intake))
+    assert [photo.getvalue() for photo in unpacked.photos] == [b"\xff\xd8first", b"second", b""]
+    unpacked.photos = intake.photos = []
+    assert unpacked == intake
+
+
+def test_quote_batch_round_trip():
+    quotes = [sample_quote(i) for i in range(10)]
+    batch = QuoteBatch.from_bytes(QuoteBatch(quotes).to_bytes())
+    assert len(batch) == 10
+    assert list(batch) == quotes
+    assert batch[-1] == quotes[-1]
+    with pytest.raises(IndexError):
+        batch[10]
+
+
+def test_unknown_version_is_refused():
+    data = bytearray(pack_quote(sample_quote()))
+    data[0] = 99
+    with pytest.raises(ValueError):
+        unpack_quote(data)
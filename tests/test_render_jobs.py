@@ -0,0 +1,119 @@
+import time
+
+import pytest
+
+import render_jobs
+from intake_pdf import IntakeInput
+from pdf_cache import PDF_CACHE, stable_key
+from quote_engine import QuoteInput
+from quote_store import QuoteStore
+from render_jobs import DONE, FAILED, RUNNING, Job, JobQueue
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = QuoteStore(str(tmp_path / "revu.db"))
+    yield store
+    store.close()
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache():
+    PDF_CACHE.clear()
+    yield
+    PDF_CACHE.clear()
+
+
+def test_renders_each_kind(store):
+    queue = JobQueue(workers=2, store=store)
+    intake = IntakeInput(client_name="Ann", notes="Back fence")
+    quote = QuoteInput(client_name="Ann", units=10, rate_per_unit=2)
+    ids = [queue.submit("intake", intake), queue.submit("quote", quote, style="revu"),
+           queue.submit("packet", (intake, quote)), queue.submit("quote", document_id=store.save_quote(quote))]
+    jobs = [queue.wait(job_id, timeout=30) for job_id in ids]
+    queue.shutdown()
+    assert [job.status for job in jobs] == [DONE] * 4
+    assert all(job.data.startswith(b"%PDF") and job.stats.pages >= 1 for job in jobs)
+
+
+def test_bad_submissions(store):
+    queue = JobQueue(workers=1, store=store)
+    with pytest.raises(ValueError):
+        queue.submit("invoice", QuoteInput())
+    with pytest.raises(ValueError):
+        queue.submit("packet", document_id=1)
+    job = queue.wait(queue.submit("quote", document_id=999, style="revu"), timeout=30)
+    queue.shutdown()
+    assert job.status == FAILED and job.error.startswith("KeyError")
+
+
+def test_same_key_joins_then_hits_the_cache_with_the_same_stats(tmp_path):
+    queue = JobQueue(workers=1, path=str(tmp_path / "jobs.db"))
+    quote = QuoteInput(units=3, rate_per_unit=5)
+    key = stable_key("quote", "revu", quote)
+    first = queue.submit("quote", quote, "revu", key)
+    assert queue.submit("quote", quote, "revu", key) == first
+    rendered = queue.wait(first, timeout=30)
+    queue.shutdown()
+
+    # After a restart the bytes come from PDF_CACHE and the stats from the database
+    again = JobQueue(workers=1, path=str(tmp_path / "jobs.db"))
+    cached = again.get(again.submit("quote", quote, "revu", key))
+    again.shutdown()
+    assert cached.id != first and cached.status == DONE
+    assert cached.data == rendered.data
+    assert cached.stats.pages == rendered.stats.pages
+
+
+def interrupted(path, jobs):
+    # Jobs as a process that stopped mid-render left them in the database
+    queue = JobQueue(workers=1, path=path)
+    for job in jobs:
+        queue._record(job)
+    queue.shutdown()
+
+
+def test_resume_renders_stored_documents_and_fails_the_rest(tmp_path, store):
+    path = str(tmp_path / "jobs.db")
+    quote_id = store.save_quote(QuoteInput(client_name="Ann", units=4, rate_per_unit=25))
+    intake_id = store.save_intake(IntakeInput(client_name="Ann", notes="Gate"))
+    interrupted(path, [
+        Job("quote", "quote", "revu", document_id=quote_id, status=RUNNING),
+        Job("intake", "intake", "cravix", document_id=intake_id),
+        Job("packet", "packet", "cravix", document_id=quote_id, status=RUNNING),
+        Job("unsaved", "quote", "revu"),
+    ])
+
+    queue = JobQueue(workers=2, path=path, store=store)
+    jobs = {job_id: queue.wait(job_id, timeout=30) for job_id in ("quote", "intake", "packet", "unsaved")}
+    queue.shutdown()
+    assert {job_id: job.status for job_id, job in jobs.items()} == {
+        "quote": DONE, "intake": DONE, "packet": FAILED, "unsaved": FAILED}
+    assert jobs["quote"].data.startswith(b"%PDF") and jobs["intake"].data.startswith(b"%PDF")
+    assert "packets are not rendered again" in jobs["packet"].error
+    assert "not stored" in jobs["unsaved"].error
+    # Nothing is left to resume, and finished jobs are read back from the database
+    reopened = JobQueue(workers=1, path=path, store=store)
+    assert reopened.pending() == 0
+    assert reopened.get("quote").data == jobs["quote"].data
+    reopened.shutdown()
+
+
+def test_old_finished_jobs_are_pruned(tmp_path, monkeypatch):
+    path = str(tmp_path / "jobs.db")
+    old = time.time() - 8 * 86400
+    interrupted(path, [
+        Job("old", "quote", "revu", status=DONE, created_at=old, finished_at=old, data=b"%PDF old"),
+        Job("old-failed", "quote", "revu", status=FAILED, created_at=old, finished_at=old),
+        Job("recent", "quote", "revu", status=DONE, finished_at=time.time(), data=b"%PDF new"),
+    ])
+    queue = JobQueue(workers=1, path=path)
+    assert queue.get("old") is None and queue.get("old-failed") is None
+    assert queue.get("recent").data == b"%PDF new"
+
+    # A long-running queue prunes again once PRUNE_EVERY has passed
+    monkeypatch.setattr(render_jobs, "PRUNE_EVERY", 0)
+    queue.max_age = 0
+    queue.wait(queue.submit("quote", QuoteInput(units=1, rate_per_unit=1), "revu"), timeout=30)
+    queue.shutdown()
+    assert queue.get("recent") is None
@@ -0,0 +1,37 @@
+import random
+
+import pytest
+
+from pdf_fonts import SANS, Document
+from text_metrics import count_lines
+
+WORDS = ["a", "gutter", "cleaning", "Supercalifragilisticexpialidocious", "12.5", "sq", "ft", "-", "(north",
+         "side)", "W", "iii", "été"]
+
+
+def random_texts(n, seed):
+    rng = random.Random(seed)
+    for _ in range(n):
+        words = [rng.choice(WORDS) for _ in range(rng.randrange(30))]
+        text = ""
+        for word in words:
+            text += word + rng.choice([" ", " ", "  ", "\n", ""])
+        yield text
+
+
+def multi_cell_lines(pdf, text, width):
+    # What multi_cell really does, counted from how far it moves down the page
+    pdf.set_xy(pdf.l_margin, pdf.t_margin)
+    pdf.multi_cell(width, 1, text, border=0)
+    return round(pdf.get_y() - pdf.t_margin)
+
+
+@pytest.mark.parametrize("unicode", [False, True])
+@pytest.mark.parametrize("width", [0, 3, 20, 61.5, 140])
+def test_count_lines_matches_multi_cell(unicode, width):
+    pdf = Document(unicode=unicode)
+    pdf.set_auto_page_break(False)
+    pdf.add_page()
+    pdf.set_font(SANS, "", 11)
+    for text in random_texts(150, seed=int(width * 10)):
+        assert count_lines(pdf, text, width) == multi_cell_lines(pdf, text, width), repr(text)